@@ -24,6 +24,29 @@ import { EventMap } from '../common/eventmap';
 
 class FileExistsError extends Error { }
 
+// results elements marked unchanged are replaced with the same
+// elements from the results the delta is relative to
+const mergeResults = function(base, delta) {
+    if (delta.unchanged)
+        return base;
+
+    for (const kind of [ 'group', 'array' ]) {
+        if ( ! delta[kind] || ! base[kind])
+            continue;
+
+        const baseChildren = new Map();
+        for (const child of base[kind].elements)
+            baseChildren.set(child.name, child);
+
+        delta[kind].elements = delta[kind].elements.map((child) => {
+            const childBase = baseChildren.get(child.name);
+            return childBase ? mergeResults(childBase, child) : child;
+        });
+    }
+
+    return delta;
+};
+
 interface CreateAnalysisOptions {
     readonly name: string;
     readonly ns: string;
@@ -127,6 +150,8 @@ export class Instance extends EventMap<IInstanceModel> implements IBackstageSupp
     seqNo: number = 0;
     command: string = '';
     _analyses: Analyses;
+    _resultsReceived = new Map<number, { sequence: number, results: any }>();
+    _resyncing = new Set<number>();
 
     constructor(coms: Coms) {
         super({
@@ -673,6 +698,66 @@ export class Instance extends EventMap<IInstanceModel> implements IBackstageSupp
         return coms.sendP(request);
     }
 
+    setAnalysesInView(visible: number[], editing: number) {
+
+        let coms = this.attributes.coms;
+
+        let viewRequest = new coms.Messages.AnalysisViewRequest();
+        viewRequest.visible = visible;
+        viewRequest.editing = editing;
+
+        let request = new coms.Messages.ComsMessage();
+        request.payload = viewRequest.toArrayBuffer();
+        request.payloadType = 'AnalysisViewRequest';
+        request.instanceId = this._instanceId;
+
+        coms.sendP(request);
+    }
+
+    _resolveResults(response) {
+
+        // results sent as a delta are merged with the results they're
+        // relative to. if we don't have those, we're out of step, and
+        // need the results in full
+
+        let id = response.analysisId;
+        let results = response.results;
+
+        if (response.deltaBase) {
+            let base = this._resultsReceived.get(id);
+            if (base === undefined || base.sequence !== response.deltaBase) {
+                this._resyncResults(id);
+                return null;
+            }
+            results = mergeResults(base.results, results);
+        }
+        else {
+            this._resyncing.delete(id);
+        }
+
+        this._resultsReceived.set(id, { sequence: response.sequence, results: results });
+        return results;
+    }
+
+    _resyncResults(id: number) {
+
+        if (this._resyncing.has(id))
+            return;
+        this._resyncing.add(id);
+
+        let coms = this.attributes.coms;
+
+        let resyncRequest = new coms.Messages.ResultsResyncRequest();
+        resyncRequest.analysisIds = [ id ];
+
+        let request = new coms.Messages.ComsMessage();
+        request.payload = resyncRequest.toArrayBuffer();
+        request.payloadType = 'ResultsResyncRequest';
+        request.instanceId = this._instanceId;
+
+        coms.sendP(request);
+    }
+
     retrieveAvailableModules() {
 
         let coms = this.attributes.coms;
@@ -1001,15 +1086,25 @@ export class Instance extends EventMap<IInstanceModel> implements IBackstageSupp
 
         if (payloadType === 'AnalysisRequest') {
             if (response.perform === 6)  { // deleted
-                if (response.analysisId === 0)
+                if (response.analysisId === 0) {
                     this._analyses.onDeleteAll();
-                else
+                    this._resultsReceived.clear();
+                }
+                else {
                     this._analyses.deleteAnalysis(response.analysisId);
+                    this._resultsReceived.delete(response.analysisId);
+                }
                 return;
             }
         }
         else if (payloadType === 'AnalysisResponse') {
 
+            if (response.sequence) {
+                response.results = this._resolveResults(response);
+                if ( ! response.results)
+                    return;  // discarded, until the full results arrive
+            }
+
             if (complete && response.results) {
                 for (const resultsItem of response.results.group.elements) {
                     if ( ! resultsItem.array)
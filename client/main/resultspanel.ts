@@ -55,6 +55,9 @@ class ResultsPanel extends EventDistributor {
     mode: string;
     iframeUrl: string;
     loop: FocusLoop;
+    _visible: Set<number> = new Set();
+    _viewObserver: IntersectionObserver;
+    _viewTimeout: ReturnType<typeof setTimeout> | null = null;
 
 
     constructor(model: Instance, iframeUrl: string, mode: string) {
@@ -123,6 +126,9 @@ class ResultsPanel extends EventDistributor {
 
         this.model.on('change:selectedAnalysis', this._selectedChanged, this);
 
+        // the server runs the analyses in view before the others
+        this._viewObserver = new IntersectionObserver((entries) => this._viewChanged(entries));
+
         window.addEventListener('message', event => this._messageEvent(event));
 
         this.addEventListener('click', () => {
@@ -279,6 +285,9 @@ class ResultsPanel extends EventDistributor {
 
         this.resources[analysis.id] = resources;
 
+        $container.dataset.analysisId = analysis.id.toString();
+        this._viewObserver.observe($container);
+
         iframe.addEventListener('load', () => {
             this._sendI18nDef(resources);
             this._sendResults(resources);
@@ -333,6 +342,8 @@ class ResultsPanel extends EventDistributor {
         this._updateRefs();
         let resources = this.resources[analysis.id];
         let $container = resources.$container;
+        this._viewObserver.unobserve($container);
+        this._visible.delete(analysis.id);
         $container.style.height = '0px';
         if (analysis.name === 'empty')
             $container.remove();
@@ -1200,6 +1211,34 @@ class ResultsPanel extends EventDistributor {
             this._sendSelected(null);
             this.removeAttribute('data-analysis-selected');
         }
+
+        this._sendView();
+    }
+
+    _viewChanged(entries: IntersectionObserverEntry[]) {
+        for (let entry of entries) {
+            let id = parseInt((entry.target as HTMLElement).dataset.analysisId);
+            if (entry.isIntersecting)
+                this._visible.add(id);
+            else
+                this._visible.delete(id);
+        }
+
+        // wait for scrolling to settle
+        if (this._viewTimeout !== null)
+            clearTimeout(this._viewTimeout);
+        this._viewTimeout = setTimeout(() => {
+            this._viewTimeout = null;
+            this._sendView();
+        }, 200);
+    }
+
+    _sendView() {
+        let selected = this.model.get('selectedAnalysis');
+        let editing = 0;
+        if (selected !== null && selected instanceof Analysis)
+            editing = selected.id;
+        this.model.setAnalysesInView(Array.from(this._visible), editing);
     }
 
     _sendSelected(resourceId: number) {
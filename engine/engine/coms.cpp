@@ -43,9 +43,14 @@ AnalysisRequest Coms::parse(char* buffer, size_t nbytes)
     return request;
 }
 
-void Coms::stringify(const string &results, bool complete, string &dest)
+void Coms::stringify(const AnalysisRequest &request, const string &results, bool complete, string &dest)
 {
     ComsMessage message;
+    // identifies the results, so the server can discard stale ones
+    // without parsing them
+    message.set_instanceid(request.instanceid());
+    message.set_analysisid(request.analysisid());
+    message.set_revision(request.revision());
     message.set_payload(results);
     message.set_payloadtype("AnalysisResponse");
     message.set_status(complete ? Status::COMPLETE : Status::IN_PROGRESS);
@@ -71,10 +76,10 @@ void ComsNN::connect(const string &path)
         throw runtime_error("Unable to connect : could not connect to endpoint");
 }
 
-void ComsNN::send(const string &results, bool complete)
+void ComsNN::send(const AnalysisRequest &request, const string &results, bool complete)
 {
     string data;
-    stringify(results, complete, data);
+    stringify(request, results, complete, data);
     nn_send(_socket, data.data(), data.size(), 0);
 }
 
@@ -122,10 +127,10 @@ void ComsDS::connect(const string &path)
     }
 }
 
-void ComsDS::send(const string &results, bool complete)
+void ComsDS::send(const AnalysisRequest &request, const string &results, bool complete)
 {
     string data;
-    stringify(results, complete, data);
+    stringify(request, results, complete, data);
 
     uint32_t n = data.size();
     _stream.write((char*)&n, 4);
@@ -15,12 +15,12 @@ public:
     Coms() { GOOGLE_PROTOBUF_VERIFY_VERSION; }
     virtual void connect(const std::string &path) = 0;
     virtual jamovi::coms::AnalysisRequest read() = 0;
-    virtual void send(const std::string &results, bool complete) = 0;
+    virtual void send(const jamovi::coms::AnalysisRequest &request, const std::string &results, bool complete) = 0;
     virtual void close() = 0;
 
 protected:
     jamovi::coms::AnalysisRequest parse(char* buffer, size_t nbytes);
-    void stringify(const std::string &results, bool complete, std::string &dest);
+    void stringify(const jamovi::coms::AnalysisRequest &request, const std::string &results, bool complete, std::string &dest);
 };
 
 class ComsNN: public Coms
@@ -28,7 +28,7 @@ class ComsNN: public Coms
 public:
     void connect(const std::string &path);
     jamovi::coms::AnalysisRequest read();
-    void send(const std::string &results, bool complete);
+    void send(const jamovi::coms::AnalysisRequest &request, const std::string &results, bool complete);
     void close();
 
 private:
@@ -44,7 +44,7 @@ class ComsDS: public Coms
 public:
     void connect(const std::string &path);
     jamovi::coms::AnalysisRequest read();
-    void send(const std::string &results, bool complete);
+    void send(const jamovi::coms::AnalysisRequest &request, const std::string &results, bool complete);
     void close();
 
 private:
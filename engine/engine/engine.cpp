@@ -27,6 +27,7 @@ Engine::Engine()
 {
     _exiting = false;
     _headless = false;
+    _cancelRequested = false;
 
     char *headless = std::getenv("JAMOVI_ENGINE_HEADLESS");
     if (headless != NULL && strcmp(headless, "1") == 0)
@@ -91,13 +92,13 @@ void Engine::start()
     unique_lock<mutex> lock(_mutex, std::defer_lock);
 
     std::function<bool()> checkForAbort;
-    checkForAbort = std::bind(&Engine::isNewAnalysisWaiting, this);
+    checkForAbort = std::bind(&Engine::isAbortRequested, this);
     _R->setCheckForAbortCB(checkForAbort);
 
+    lock.lock(); // lock to access _waitingRequest
+
     while (true)
     {
-        lock.lock(); // lock to access _waitingRequest
-
         while (_waitingRequest.analysisid() == 0)
         {
             // wait for notification from message loop
@@ -111,10 +112,13 @@ void Engine::start()
 
         _runningRequest.Clear();
         _reflection->Swap(&_runningRequest, &_waitingRequest);
+        _cancelRequested = false;
 
         lock.unlock();
 
         _R->run(_runningRequest);
+
+        lock.lock(); // lock to access _runningRequest
         _runningRequest.Clear();
     }
 
@@ -135,16 +139,17 @@ void Engine::terminate()
     std::exit(0);
 }
 
-bool Engine::isNewAnalysisWaiting()
+bool Engine::isAbortRequested()
 {
     // called from the main loop
     lock_guard<mutex> lock(_mutex);
-    return _waitingRequest.analysisid() != 0;
+    return _waitingRequest.analysisid() != 0 || _cancelRequested;
 }
 
 void Engine::resultsReceived(const string &results, bool complete)
 {
-    _coms->send(results, complete);
+    // results are only produced for the running request
+    _coms->send(_runningRequest, results, complete);
 }
 
 void Engine::messageLoop()
@@ -173,6 +178,17 @@ void Engine::messageLoop()
         {
             terminate();
         }
+        else if (request.cancel())
+        {
+            // the running analysis aborts at its next checkpoint, and the
+            // engine waits for the next request. a cancel for an analysis
+            // which isn't running (it may have just finished) is ignored
+            lock_guard<mutex> lock(_mutex);
+            if (request.instanceid() == _runningRequest.instanceid()
+                    && request.analysisid() == _runningRequest.analysisid()
+                    && request.revision() == _runningRequest.revision())
+                _cancelRequested = true;
+        }
         else
         {
             lock_guard<mutex> lock(_mutex);
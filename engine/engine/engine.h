@@ -30,7 +30,7 @@ private:
     void resultsReceived(const std::string &results, bool complete);
     void periodicChecks();
     void terminate();
-    bool isNewAnalysisWaiting();
+    bool isAbortRequested();
 
     Coms *_coms;
     EngineR *_R;
@@ -43,6 +43,7 @@ private:
 
     jamovi::coms::AnalysisRequest _waitingRequest;
     jamovi::coms::AnalysisRequest _runningRequest;
+    bool _cancelRequested;
     const google::protobuf::Reflection *_reflection;
 
     std::mutex _mutex;
@@ -131,6 +131,7 @@ void EngineR::run(AnalysisRequest &analysis)
         this,
         analysis.sessionid(),
         analysis.instanceid(),
+        analysis.snapshot(),
         std::placeholders::_1,
         true,
         requiresMissings);
@@ -141,6 +142,7 @@ void EngineR::run(AnalysisRequest &analysis)
         this,
         analysis.sessionid(),
         analysis.instanceid(),
+        analysis.snapshot(),
         std::placeholders::_1,
         false,
         requiresMissings);
@@ -173,8 +175,7 @@ void EngineR::run(AnalysisRequest &analysis)
     if (analysis.ns() == "Rj")
     {
         // Rj needs special access to this
-        string datasetPath = _path + PATH_SEP + analysis.sessionid() + PATH_SEP + analysis.instanceid() + PATH_SEP + "buffer";
-        rInside[".datasetPath"] = datasetPath;
+        rInside[".datasetPath"] = datasetPath(analysis.sessionid(), analysis.instanceid(), analysis.snapshot());
     }
 
     Rcpp::Function setOptions = rInside.parseEvalNT("base::options");
@@ -355,6 +356,7 @@ SEXP EngineR::checkpoint(SEXP results)
 Rcpp::DataFrame EngineR::readDataset(
     const string &sessionId,
     const string &instanceId,
+    int snapshot,
     Rcpp::List columnsRequired,
     bool headerOnly,
     bool requiresMissings)
@@ -362,7 +364,7 @@ Rcpp::DataFrame EngineR::readDataset(
     if (_rInside == NULL)
         initR();
 
-    string path = _path + PATH_SEP + sessionId + PATH_SEP + instanceId + PATH_SEP + "buffer";
+    string path = datasetPath(sessionId, instanceId, snapshot);
 
     Rcpp::StringVector req(columnsRequired.size());
     int count = 0;
@@ -372,6 +374,21 @@ Rcpp::DataFrame EngineR::readDataset(
     return readDF(path, req, headerOnly, requiresMissings);
 }
 
+string EngineR::datasetPath(
+    const string &sessionId,
+    const string &instanceId,
+    int snapshot)
+{
+    string path = _path + PATH_SEP + sessionId + PATH_SEP + instanceId + PATH_SEP;
+
+    // a frozen copy of the data set, if the server has made one, so it
+    // can carry on being edited while the analysis reads it
+    if (snapshot != 0)
+        return path + "snapshots" + PATH_SEP + std::to_string(snapshot);
+
+    return path + "buffer";
+}
+
 void EngineR::setCheckForAbortCB(std::function<bool()> check)
 {
     _checkForAbort = check;
@@ -41,10 +41,16 @@ private:
     Rcpp::DataFrame readDataset(
         const std::string &sessionId,
         const std::string &instanceId,
+        int snapshot,
         Rcpp::List columns,
         bool headerOnly,
         bool requiresMissings);
 
+    std::string datasetPath(
+        const std::string &sessionId,
+        const std::string &instanceId,
+        int snapshot);
+
     std::string analysisDirPath(
         const std::string &sessionId,
         const std::string &instanceId,
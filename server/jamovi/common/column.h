@@ -13,6 +13,9 @@
 #include <vector>
 #include <utility>
 #include <cmath>
+#include <cstring>
+#include <algorithm>
+#include <stdexcept>
 
 #ifdef _WIN32
 #define ALIGN_8 alignas(8)
@@ -162,6 +165,28 @@ public:
         return cellAt<T>(rowIndex);
     }
 
+    template<typename T> void rawValues(int rowStart, int count, T *dest)
+    {
+        ColumnStruct *cs = _mm->resolve<ColumnStruct>(_rel);
+
+        if (rowStart < 0 || count < 0 || rowStart + count > cs->rowCount)
+            throw std::out_of_range("index out of bounds");
+
+        Block **blocks = _mm->resolve<Block*>(cs->blocks);
+        int perBlock = VALUES_SPACE / sizeof(T);
+
+        while (count > 0)
+        {
+            int index = rowStart % perBlock;
+            int n = std::min(count, perBlock - index);
+            Block *block = _mm->resolve<Block>(blocks[rowStart / perBlock]);
+            memcpy(dest, &block->values[index * sizeof(T)], n * sizeof(T));
+            dest += n;
+            rowStart += n;
+            count -= n;
+        }
+    }
+
 protected:
 
     ColumnStruct *struc() const;
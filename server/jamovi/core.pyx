@@ -12,10 +12,13 @@ from cython.operator cimport dereference as deref, postincrement as inc
 
 from jamovi.server.utils import is_int32
 
+import array
 import math
 import os
 import os.path
 
+import numpy as np
+
 from enum import Enum
 
 cdef extern from "column.h":
@@ -229,9 +232,12 @@ cdef extern from "columnw.h":
         bool autoMeasure() const
         void append[T](const T &value)
         T raw[T](int index)
+        void rawValues[T](int start, int count, T *dest) except +
         const char *raws(int index);
         void setIValue(int index, int value, bool init)
         void setDValue(int index, double value, bool init)
+        void setIValues(int start, int count, const int *values, bool init) except +
+        void setDValues(int start, int count, const double *values, bool init) except +
         void setSValue(int index, const char *value, bool init)
         const char *getLabel(int value) const
         const char *getLabel(const char* value) const
@@ -582,14 +588,102 @@ cdef class Column:
             self._this.setIValue(index, value, initing)
 
     def set_values(self, index, values, initing=False):
-        for i, value in enumerate(values):
-            self.set_value(index + i, value, initing=initing)
+        if (self.data_type is DataType.DECIMAL
+                or self.data_type is DataType.INTEGER):
+            self.set_raw_values(index, values, initing)
+        elif self.measure_type is MeasureType.ID:
+            row_count = self.row_count
+            for i, value in enumerate(values):
+                if isinstance(value, str) and index + i < row_count:
+                    self._this.setSValue(index + i, value.encode(), initing)
+                else:
+                    self.set_value(index + i, value, initing=initing)
+        elif isinstance(values, np.ndarray):
+            # level values
+            self.set_raw_values(index, values, initing)
+        else:
+            for i, value in enumerate(values):
+                self.set_value(index + i, value, initing=initing)
 
     def get_values(self, index, n):
-        values = [None] * n
-        for i in range(n):
-            values[i] = self.get_value(index + i)
-        return values
+        if self.data_type is not DataType.TEXT:
+            return self.get_raw_values(index, n).tolist()
+        elif self.measure_type is not MeasureType.ID:
+            labels = { }
+            values = self.get_raw_values(index, n).tolist()
+            for i, raw in enumerate(values):
+                label = labels.get(raw)
+                if label is None:
+                    label = self._this.getLabel(<int>raw).decode()
+                    labels[raw] = label
+                values[i] = label
+            return values
+        else:
+            if index < 0 or index + n > self.row_count:
+                raise IndexError()
+            values = [None] * n
+            for i in range(n):
+                values[i] = self._this.raws(index + i).decode()
+            return values
+
+    def set_raw_values(self, index, values, initing=False):
+        ''' writes a contiguous run of raw values, starting at row `index`
+
+        values is a buffer (or a sequence) of float64s for decimal
+        columns, and of int32s otherwise (level values for text columns) '''
+
+        cdef const double[::1] doubles
+        cdef const int[::1] ints
+
+        if self.data_type is DataType.TEXT and self.measure_type is MeasureType.ID:
+            raise TypeError('ID columns have no raw values')
+
+        if self.data_type is DataType.DECIMAL:
+            if isinstance(values, np.ndarray):
+                doubles = np.ascontiguousarray(values, dtype=np.float64)
+            else:
+                doubles = array.array('d', values)
+            if doubles.shape[0] > 0:
+                self._this.setDValues(index, doubles.shape[0], &doubles[0], False)
+        else:
+            if isinstance(values, np.ndarray):
+                ints = np.ascontiguousarray(values, dtype=np.int32)
+            else:
+                ints = array.array('i', values)
+            if ints.shape[0] > 0:
+                self._this.setIValues(index, ints.shape[0], &ints[0], initing)
+
+    def get_raw_values(self, index, n, out=None):
+        ''' reads a contiguous run of n raw values, starting at row `index`
+
+        returns a float64 array for decimal columns, and an int32 array
+        otherwise (level values for text columns). `out` may be provided
+        as a buffer of the appropriate type to read into '''
+
+        cdef double[::1] doubles
+        cdef int[::1] ints
+
+        if self.data_type is DataType.TEXT and self.measure_type is MeasureType.ID:
+            raise TypeError('ID columns have no raw values')
+
+        if self.data_type is DataType.DECIMAL:
+            if out is None:
+                out = np.empty(n, dtype=np.float64)
+            doubles = out
+            if doubles.shape[0] < n:
+                raise ValueError('buffer too small')
+            if n > 0:
+                self._this.rawValues[double](index, n, &doubles[0])
+        else:
+            if out is None:
+                out = np.empty(n, dtype=np.int32)
+            ints = out
+            if ints.shape[0] < n:
+                raise ValueError('buffer too small')
+            if n > 0:
+                self._this.rawValues[int](index, n, &ints[0])
+
+        return out
 
     def get_value(self, index):
         cdef int raw
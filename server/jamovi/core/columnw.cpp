@@ -195,6 +195,33 @@ void ColumnW::setDValue(int rowIndex, double value, bool initing)
     cellAt<double>(rowIndex) = value;
 }
 
+void ColumnW::setDValues(int rowStart, int count, const double *values, bool initing)
+{
+    if ( ! initing)
+        _discardScratchColumn();
+
+    _setRawValues<double>(rowStart, count, values);
+}
+
+void ColumnW::setIValues(int rowStart, int count, const int *values, bool initing)
+{
+    if (rowStart < 0 || count < 0 || rowStart + count > rowCount())
+        throw out_of_range("index out of bounds");
+
+    if (hasLevels())
+    {
+        // level counts need maintaining, so these go one at a time
+        for (int i = 0; i < count; i++)
+            setIValue(rowStart + i, values[i], initing);
+        return;
+    }
+
+    if ( ! initing)
+        _discardScratchColumn();
+
+    _setRawValues<int>(rowStart, count, values);
+}
+
 void ColumnW::setSValue(int rowIndex, const char *value, bool initing)
 {
     if ( ! initing)
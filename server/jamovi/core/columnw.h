@@ -47,6 +47,8 @@ public:
     void setDValue(int rowIndex, double value, bool initing = false);
     void setIValue(int rowIndex, int value, bool initing = false);
     void setSValue(int rowIndex, const char *value, bool initing = false);
+    void setDValues(int rowStart, int count, const double *values, bool initing = false);
+    void setIValues(int rowStart, int count, const int *values, bool initing = false);
     void changeDMType(DataType::Type dataType, MeasureType::Type measureType);
     void setLevels(const std::vector<LevelData> &levels);
     void setMissingValues(const std::vector<MissingValue> &missingValues);
@@ -82,6 +84,28 @@ private:
     static void _transferLevels(ColumnW &dest, ColumnW &src);
     void _discardScratchColumn();
 
+    template<typename T> void _setRawValues(int rowStart, int count, const T *values)
+    {
+        ColumnStruct *cs = _mm->resolve<ColumnStruct>(_rel);
+
+        if (rowStart < 0 || count < 0 || rowStart + count > cs->rowCount)
+            throw std::out_of_range("index out of bounds");
+
+        Block **blocks = _mm->resolve<Block*>(cs->blocks);
+        int perBlock = VALUES_SPACE / sizeof(T);
+
+        while (count > 0)
+        {
+            int index = rowStart % perBlock;
+            int n = std::min(count, perBlock - index);
+            Block *block = _mm->resolve<Block>(blocks[rowStart / perBlock]);
+            memcpy(&block->values[index * sizeof(T)], values, n * sizeof(T));
+            values += n;
+            rowStart += n;
+            count -= n;
+        }
+    }
+
     template<typename T> void _setRowCount(size_t count)
     {
         ColumnStruct *cs = _mm->resolve<ColumnStruct>(_rel);
@@ -59,9 +59,9 @@ class Analyses:
             analysis_meta = module_meta.get(name)
 
             analysis_name = analysis_meta.name
-            option_defs = analysis_meta.defn['options']
 
             analysis_meta.translate_defaults(module_meta, i18n.get_language())
+            option_defs = analysis_meta.defn['options']
 
             arbitrary_code = (analysis_meta.defn.get('arbitraryCode', False)
                               or analysis_meta.defn.get('arbitraryCode2', False))
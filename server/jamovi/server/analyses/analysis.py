@@ -2,9 +2,10 @@
 from enum import Enum
 from collections import namedtuple
 from asyncio import Future
-from itertools import islice
 from copy import deepcopy
 
+import numpy as np
+
 from jamovi.core import MeasureType
 from jamovi.server import jamovi_pb2 as jcoms
 
@@ -208,16 +209,20 @@ class Analysis:
 
                     self._outputs_synced[option_name] = keys_synced
 
+                    row_nums = None
+                    if element.outputs.rowNums:
+                        row_nums = np.array(element.outputs.rowNums, dtype=np.int64)
+
                     for output in element.outputs.outputs:
 
-                        n_rows = max(len(output.d), len(output.i))
+                        n_values = max(len(output.d), len(output.i))
 
-                        if element.outputs.rowNums:
-                            row_nums = element.outputs.rowNums
-                            n_rows = row_nums[n_rows - 1] + 1
-                            row_nums = islice(row_nums, 0, n_rows)
-                        else:
-                            row_nums = range(n_rows)
+                        # the rows the values go in, None if they go in order
+                        dest_rows = None
+                        n_rows = n_values
+                        if row_nums is not None and n_values > 0:
+                            dest_rows = row_nums[:n_values]
+                            n_rows = int(dest_rows[-1]) + 1
 
                         values = None
                         levels = None
@@ -229,18 +234,24 @@ class Analysis:
                                 keys_synced[output.name] = True
 
                             if len(output.d) > 0:
-                                values = [float('nan')] * n_rows
-                                for source_row_no, dest_row_no in enumerate(row_nums):
-                                    values[dest_row_no] = output.d[source_row_no]
+                                data = np.fromiter(output.d, dtype=np.float64, count=len(output.d))
+                                if dest_rows is None:
+                                    values = data
+                                else:
+                                    values = np.full(n_rows, np.nan)
+                                    values[dest_rows] = data
                                 measure_type = MeasureType.CONTINUOUS
                                 # clear these, no need to send to client or store
                                 output.ClearField('d')
                                 output.incData = False
                             elif len(output.i) > 0:
                                 levels = output.levels
-                                values = [-2147483648] * n_rows
-                                for source_row_no, dest_row_no in enumerate(row_nums):
-                                    values[dest_row_no] = output.i[source_row_no]
+                                data = np.fromiter(output.i, dtype=np.int32, count=len(output.i))
+                                if dest_rows is None:
+                                    values = data
+                                else:
+                                    values = np.full(n_rows, -2147483648, dtype=np.int32)
+                                    values[dest_rows] = data
                                 # clear these, no need to send to client or store
                                 output.ClearField('i')
                                 output.incData = False
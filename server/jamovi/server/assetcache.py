@@ -0,0 +1,220 @@
+
+import os
+import gzip
+import mimetypes
+
+from stat import S_ISREG
+from asyncio import get_event_loop
+from collections import OrderedDict
+from email.utils import formatdate
+from email.utils import parsedate_to_datetime
+
+from aiohttp import web
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# smaller files aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+COMPRESSIBLE = (
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+
+
+class Asset:
+
+    def __init__(self, path, mtime, size, body, content_type, encoding):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.body = body
+        self.content_type = content_type
+        self.encoding = encoding
+        self.etag = f'"{mtime:x}-{size:x}"'
+        self.last_modified = formatdate(mtime / 1e9, usegmt=True)
+        self.variants = { }  # compressed bodies, by content encoding
+
+    def variant_etag(self, encoding):
+        # each variant is a different representation, so has its own etag
+        if encoding is None:
+            return self.etag
+        return f'"{self.mtime:x}-{self.size:x}-{encoding}"'
+
+    @property
+    def cost(self):
+        return len(self.body) + sum(map(len, self.variants.values()))
+
+
+class AssetCache:
+
+    # the contents of static files (and compressed copies of them), kept in
+    # least recently used order until their total exceeds max_size. entries
+    # are reloaded when the file's mtime or size changes
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    async def get(self, path, content_type=None):
+        # raises FileNotFoundError if there's no file at path
+        return await self._get(path, _stat(path), content_type)
+
+    async def serve(self, request, path, content_type=None, headers=None):
+
+        # a response for the file at path; 304 if the client's copy is
+        # current, and compressed if the client accepts it. raises
+        # FileNotFoundError if there's no file at path
+
+        headers = dict(headers) if headers else { }
+        stat = _stat(path)
+
+        if stat.st_size > self._max_size // 4:
+            # too large to keep around
+            response = web.FileResponse(path, headers=headers)
+            if content_type is not None:
+                response.content_type = content_type
+            return response
+
+        asset = await self._get(path, stat, content_type)
+
+        body = asset.body
+        variant = None
+        if asset.encoding:
+            headers['Content-Encoding'] = asset.encoding
+        elif asset.variants:
+            # the response depends on Accept-Encoding, 304s included
+            headers['Vary'] = 'Accept-Encoding'
+            accepted = _accepted_encodings(request)
+            for encoding, compressed in asset.variants.items():
+                if encoding in accepted:
+                    variant = encoding
+                    body = compressed
+                    break
+
+        etag = asset.variant_etag(variant)
+        headers['ETag'] = etag
+        headers['Last-Modified'] = asset.last_modified
+
+        if _not_modified(request, asset, etag):
+            headers.pop('Content-Encoding', None)
+            return web.Response(status=304, headers=headers)
+
+        if variant is not None:
+            headers['Content-Encoding'] = variant
+
+        return web.Response(body=body, content_type=asset.content_type, headers=headers)
+
+    async def _get(self, path, stat, content_type):
+        asset = self._entries.get(path)
+        if (asset is not None
+                and asset.mtime == stat.st_mtime_ns
+                and asset.size == stat.st_size
+                and (content_type is None or asset.content_type == content_type)):
+            self._entries.move_to_end(path)
+            return asset
+
+        asset = await get_event_loop().run_in_executor(None, self._load, path, stat, content_type)
+        self._put(asset)
+        return asset
+
+    def _load(self, path, stat, content_type):
+
+        with open(path, 'rb') as file:
+            body = file.read()
+
+        guessed_type, encoding = mimetypes.guess_type(path)
+        if content_type is None:
+            content_type = guessed_type or 'application/octet-stream'
+
+        asset = Asset(path, stat.st_mtime_ns, stat.st_size, body, content_type, encoding)
+
+        if encoding is None and len(body) >= MIN_COMPRESS_SIZE and content_type.startswith(COMPRESSIBLE):
+            # brotli is preferred where it's available
+            if brotli is not None:
+                asset.variants['br'] = _precompressed(path, '.br') or brotli.compress(body)
+            asset.variants['gzip'] = _precompressed(path, '.gz') or gzip.compress(body, mtime=0)
+
+        return asset
+
+    def _put(self, asset):
+        self._remove(asset.path)
+        cost = asset.cost
+        if cost > self._max_size:
+            return
+        self._entries[asset.path] = asset
+        self._size += cost
+        self._evict()
+
+    def _remove(self, path):
+        asset = self._entries.pop(path, None)
+        if asset is not None:
+            self._size -= asset.cost
+
+    def _evict(self):
+        while self._size > self._max_size and self._entries:
+            _, asset = self._entries.popitem(last=False)
+            self._size -= asset.cost
+
+
+def _stat(path):
+    stat = os.stat(path)
+    if not S_ISREG(stat.st_mode):
+        raise FileNotFoundError(path)
+    return stat
+
+
+def _precompressed(path, ext):
+    # a compressed copy shipped alongside the file, if it's up to date
+    try:
+        if os.stat(path + ext).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            with open(path + ext, 'rb') as file:
+                return file.read()
+    except OSError:
+        pass
+    return None
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        encoding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def _not_modified(request, asset, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etags = [ tag.strip().removeprefix('W/') for tag in if_none_match.split(',') ]
+        return etag in etags or '*' in etags
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return asset.mtime // 1_000_000_000 <= since
+    return False
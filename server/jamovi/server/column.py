@@ -4,6 +4,8 @@ import re
 from collections import namedtuple
 from typing import Iterable
 
+import numpy as np
+
 from jamovi.core import ColumnType
 from jamovi.core import MeasureType
 from jamovi.core import DataType
@@ -21,6 +23,8 @@ from .compute import Messages
 from .compute import FValues
 from .compute import convert
 from .compute import is_missing
+from .compute import Vectoriser
+from .compute import NotVectorisable
 
 from .i18n import _
 
@@ -104,9 +108,23 @@ class Column:
         assert self._child is not None
         return self._child.set_values(index, values, initing)
 
+    def get_raw_values(self, index: int, n_rows: int, out=None):
+        assert self._child is not None
+        return self._child.get_raw_values(index, n_rows, out)
+
+    def set_raw_values(self, index: int, values, initing=False):
+        if self._child is None:
+            self._create_child()
+        return self._child.set_raw_values(index, values, initing)
+
     def is_row_filtered(self, index):
         return self._parent.is_row_filtered(index)
 
+    def should_treat_as_missing(self, index):
+        if self._child is not None:
+            return self._child.should_treat_as_missing(index)
+        return False
+
     @property
     def cell_tracker(self):
         return self._cell_tracker
@@ -608,6 +626,8 @@ class Column:
                 v = 1
             for row_no in range(start, end):
                 self._child.set_value(row_no, v, True)
+        elif self.data_type is not DataType.TEXT and self._recalc_vectorised(start, end):
+            self.determine_dps()
         else:
             for row_no in range(start, end):
                 try:
@@ -629,6 +649,38 @@ class Column:
 
         self._needs_recalc = False
 
+    def _recalc_vectorised(self, start, end):
+        # evaluates the formula a column at a time, returns False if
+        # the formula must instead be evaluated row by row
+
+        filt = self.uses_column_formula and not self.is_filter
+        vectoriser = Vectoriser(self._parent, self.row_count, start, end)
+
+        try:
+            values, errors = vectoriser.evaluate(self._node, filt)
+        except NotVectorisable:
+            return False
+
+        if filt:
+            values[vectoriser.filtered] = NaN
+            if errors is not None:
+                errors = errors & ~vectoriser.filtered
+
+        if self.data_type is DataType.DECIMAL:
+            if errors is not None:
+                values[errors] = NaN
+        else:
+            with np.errstate(all='ignore'):
+                values = np.trunc(values)
+            out_of_range = ~((values >= -2147483647) & (values <= 2147483647))
+            values[out_of_range] = -2147483648
+            if errors is not None:
+                values[errors] = 1 if self.is_filter else -2147483648
+            values = values.astype(np.int32)
+
+        self._child.set_raw_values(start, values, True)
+        return True
+
     def parse_formula(self):
 
         if not self.needs_parse:
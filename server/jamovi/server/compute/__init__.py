@@ -15,6 +15,8 @@ from .transfilterifier import Transfilterifier
 from .transfudgifier import Transfudgifier
 from .checker import Checker
 from .messages import Messages
+from .vectoriser import Vectoriser
+from .vectoriser import NotVectorisable
 
 
 class FormulaStatus(Enum):
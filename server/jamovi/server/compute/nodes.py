@@ -91,8 +91,11 @@ class SplitValues:
             value = self._split_by.fvalue(index, row_count, filt)
             if is_missing(value):
                 return (-2147483648, '')
-            else:
-                return self._cache[convert(value, str)]
+            value = self._cache[convert(value, str)]
+            if isinstance(value, list):
+                # a value for each row can't be split across the groups
+                raise ValueError('A column of values cannot be grouped')
+            return value
 
 
 class Node:
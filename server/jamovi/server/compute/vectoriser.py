@@ -0,0 +1,469 @@
+
+import ast
+
+import numpy as np
+
+from jamovi.core import DataType
+
+from .typevalues import convert
+from .typevalues import is_missing
+from . import vfunctions
+
+NaN = float('nan')
+
+
+class NotVectorisable(Exception):
+    pass
+
+
+def _merge(errors, more):
+    if more is None:
+        return errors
+    if errors is None:
+        return more
+    return errors | more
+
+
+def _where(errors, mask):
+    if errors is None:
+        return None
+    errors = errors & mask
+    return errors if errors.any() else None
+
+
+def _to_int(values):
+    # equivalent to convert(value, int) for each value
+    values = np.trunc(values)
+    values[~np.isfinite(values)] = NaN
+    return values
+
+
+def _as_list(values, arg_type):
+    if arg_type is int:
+        values = np.where(np.isnan(values), -2147483648, values)
+        return values.astype(np.int64).tolist()
+    return values.tolist()
+
+
+class Vectoriser:
+    '''Evaluates a formula a column at a time
+
+    Values are float64 arrays with NaN standing in for missing values.
+    Alongside each array of values is an array flagging the rows where
+    evaluating the formula row by row would have raised an exception
+    (or None, where no rows would have), so these rows can be handled the
+    same way Column.recalc() handles them.
+
+    Nodes producing numeric values which have no vector form are
+    evaluated row by row. Nodes producing text raise NotVectorisable.
+
+    Only the rows from start to end are evaluated, except where a node
+    needs the whole column (column functions and OFFSET).'''
+
+    def __init__(self, dataset, row_count, start=0, end=None):
+        if end is None:
+            end = row_count
+        self._dataset = dataset
+        self._row_count = row_count
+        self._start = start
+        self._end = end
+        self._size = end - start
+        self._rows = np.arange(start, end)
+        self._filtered = None
+        self._whole = None
+        self._cache = { }
+
+    def evaluate(self, node, filt):
+        key = (id(node), filt)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        visitor = getattr(self, 'visit_' + type(node).__name__, None)
+        try:
+            if visitor is None:
+                raise NotVectorisable()
+            with np.errstate(all='ignore'):
+                result = visitor(node, filt)
+        except NotVectorisable:
+            if node.data_type is DataType.TEXT:
+                raise
+            result = self._evaluate_row_wise(node, filt)
+
+        self._cache[key] = result
+        return result
+
+    @property
+    def filtered(self):
+        # a row is filtered if any of the (active) filters leading the
+        # data set exclude it
+        if self._filtered is None:
+            filtered = np.zeros(self._size, dtype=bool)
+            for column in self._dataset:
+                if not column.is_filter or column.is_virtual:
+                    break
+                if column.active:
+                    filtered |= column.get_raw_values(self._start, self._size) != 1
+            self._filtered = filtered
+        return self._filtered
+
+    def _whole_column(self):
+        # a vectoriser for all the rows, for nodes which need them
+        if self._start == 0 and self._end == self._row_count:
+            return self
+        if self._whole is None:
+            self._whole = Vectoriser(self._dataset, self._row_count)
+        return self._whole
+
+    def _evaluate_row_wise(self, node, filt):
+        n = self._row_count
+        values = np.empty(self._size)
+        errors = np.zeros(self._size, dtype=bool)
+        for i, index in enumerate(range(self._start, self._end)):
+            try:
+                values[i] = convert(node.fvalue(index, n, filt), float)
+            except Exception:
+                values[i] = NaN
+                errors[i] = True
+        return values, _where(errors, True)
+
+    def _may_be_tuple(self, node):
+        # levelled integer columns produce (value, label) tuples, which
+        # some row functions treat differently to numbers
+        if isinstance(node, ast.Tuple):
+            return True
+        elif isinstance(node, ast.Call):
+            return any(map(self._may_be_tuple, node.args))
+        elif isinstance(node, ast.keyword):
+            return self._may_be_tuple(node.value)
+        elif isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, ast.Invert) and self._may_be_tuple(node.operand)
+        elif isinstance(node, ast.AST):
+            return False
+        else:
+            return node.data_type is DataType.INTEGER and node.has_levels
+
+    def _evaluate_arg(self, node, arg_type, filt):
+        if arg_type is str:
+            raise NotVectorisable()
+        if arg_type is None and self._may_be_tuple(node):
+            raise NotVectorisable()
+        values, errors = self.evaluate(node, filt)
+        if arg_type is int:
+            values = _to_int(values)
+        return values, errors
+
+    def visit_Column(self, column, filt):
+        if column.is_virtual:
+            return np.full(self._size, NaN), None
+        if column.data_type is DataType.TEXT:
+            raise NotVectorisable()
+
+        raw = column.get_raw_values(self._start, self._size)
+        values = raw.astype(np.float64)
+        if column.data_type is DataType.INTEGER:
+            values[raw == -2147483648] = NaN
+        if column.missing_values:
+            # whether a value is treated as missing depends only on the
+            # value, so each distinct value need only be checked once
+            distinct, first = np.unique(raw, return_index=True)
+            treated = [ column.should_treat_as_missing(self._start + int(index)) for index in first ]
+            values[np.isin(raw, distinct[treated])] = NaN
+        if filt:
+            values[self.filtered] = NaN
+        return values, None
+
+    def visit_Constant(self, node, filt):
+        if isinstance(node.value, str):
+            raise NotVectorisable()
+        return np.full(self._size, convert(node.value, float)), None
+
+    def visit_keyword(self, node, filt):
+        return self.evaluate(node.value, filt)
+
+    def visit_UnaryOp(self, node, filt):
+        op = node.op
+        if isinstance(op, ast.UAdd) and node.operand.data_type is DataType.TEXT:
+            raise NotVectorisable()
+
+        values, errors = self.evaluate(node.operand, filt)
+        missing = np.isnan(values)
+
+        if isinstance(op, ast.USub):
+            values = -values
+        elif isinstance(op, ast.UAdd):
+            pass
+        elif isinstance(op, ast.Not):
+            values = np.where(missing, NaN, values == 0)
+        elif isinstance(op, ast.Invert):
+            values = np.where(missing, 0, values)
+        else:
+            raise RuntimeError("Shouldn't get here")
+
+        return values, errors
+
+    def visit_BinOp(self, node, filt):
+        dt = node.data_type
+        if dt is DataType.TEXT:
+            raise NotVectorisable()
+
+        lv, l_errors = self.evaluate(node.left, filt)
+        rv, r_errors = self.evaluate(node.right, filt)
+        errors = _merge(l_errors, r_errors)
+
+        if dt is DataType.INTEGER:
+            lv = _to_int(lv)
+            rv = _to_int(rv)
+
+        missing = np.isnan(lv) | np.isnan(rv)
+        op = node.op
+
+        if isinstance(op, ast.Add):
+            values = lv + rv
+        elif isinstance(op, ast.Sub):
+            values = lv - rv
+        elif isinstance(op, ast.Mult):
+            values = lv * rv
+        elif isinstance(op, ast.Div):
+            values = lv / rv
+            values[rv == 0] = NaN
+        elif isinstance(op, ast.FloorDiv):
+            values = np.floor_divide(lv, rv)
+            values[rv == 0] = NaN
+        elif isinstance(op, ast.Mod):
+            values = np.mod(lv, rv)
+            errors = _merge(errors, (rv == 0) & ~missing)
+        elif isinstance(op, (ast.Pow, ast.BitXor)):
+            values = np.power(lv, rv)
+            # raised to a negative power is a ZeroDivisionError, and
+            # overflow is an OverflowError
+            finite = np.isfinite(lv) & np.isfinite(rv)
+            raises = ((lv == 0) & (rv < 0) & finite) | (np.isinf(values) & finite)
+            errors = _merge(errors, raises & ~missing)
+        else:
+            values = np.full(self._size, NaN)
+
+        values[missing] = NaN
+        return values, errors
+
+    def visit_Compare(self, node, filt):
+        v1, errors = self.evaluate(node.left, filt)
+        t1 = node.left.data_type
+
+        values = np.ones(self._size)
+        decided = np.isnan(v1)
+        values[decided] = NaN
+
+        for op, comparator in zip(node.ops, node.comparators):
+            # comparisons short circuit, so later comparators are only
+            # evaluated (and can only raise) where undecided
+            v2, more = self.evaluate(comparator, filt)
+            errors = _merge(errors, _where(more, ~decided))
+            missing = np.isnan(v2) & ~decided
+            values[missing] = NaN
+            decided |= missing
+
+            t2 = comparator.data_type
+            failed = ~Vectoriser._test(v1, op, v2, t1, t2) & ~decided
+            values[failed] = 0
+            decided |= failed
+
+            v1, t1 = v2, t2
+
+        return values, errors
+
+    @staticmethod
+    def _test(v1, op, v2, t1, t2):
+        if isinstance(op, ast.Lt):
+            return v1 < v2
+        elif isinstance(op, ast.Gt):
+            return v1 > v2
+        elif isinstance(op, ast.GtE):
+            return v1 >= v2
+        elif isinstance(op, ast.LtE):
+            return v1 <= v2
+
+        # math.isclose() with its default tolerances
+        close = (v1 == v2) | (np.abs(v1 - v2) <= 1e-09 * np.maximum(np.abs(v1), np.abs(v2)))
+
+        if isinstance(op, ast.Eq):
+            if t1 is DataType.DECIMAL or t2 is DataType.DECIMAL:
+                return close
+            else:
+                return v1 == v2
+        elif isinstance(op, ast.NotEq):
+            return ~close
+        else:
+            raise RuntimeError("Shouldn't get here")
+
+    def visit_BoolOp(self, node, filt):
+        is_and = isinstance(node.op, ast.And)
+        if is_and:
+            values = np.ones(self._size)
+        else:
+            values = np.zeros(self._size)
+        decided = np.zeros(self._size, dtype=bool)
+        errors = None
+
+        for value in node.values:
+            v, more = self.evaluate(value, filt)
+            errors = _merge(errors, _where(more, ~decided))
+            missing = np.isnan(v)
+            values[missing & ~decided] = NaN
+            if is_and:
+                done = ~missing & (v == 0) & ~decided
+                values[done] = 0
+            else:
+                done = ~missing & (v != 0) & ~decided
+                values[done] = 1
+            decided |= done
+
+        return values, errors
+
+    def visit_Call(self, node, filt):
+        function = node._function
+        name = function.__name__
+
+        if name == 'OFFSET':
+            return self._offset(node)
+        elif function.meta.is_column_wise:
+            return self._column_wise(node, filt)
+
+        vfunction = getattr(vfunctions, name, None)
+        if vfunction is None:
+            raise NotVectorisable()
+
+        arg_types = node._arg_types
+        errors = None
+
+        args = [ ]
+        for i, arg in enumerate(node.args):
+            arg_type = arg_types[min(i, len(arg_types) - 1)]
+            values, more = self._evaluate_arg(arg, arg_type, filt)
+            errors = _merge(errors, more)
+            args.append(values)
+
+        if len(node.keywords) > len(node._kw_types):
+            raise NotVectorisable()
+
+        kwargs = { }
+        for i, kwarg in enumerate(node.keywords):
+            values, more = self._evaluate_arg(kwarg, node._kw_types[i], filt)
+            errors = _merge(errors, more)
+            kwargs[kwarg.arg] = values
+
+        values, more = vfunction(self._rows, *args, **kwargs)
+        return np.asarray(values, dtype=np.float64), _merge(errors, more)
+
+    def _offset(self, node):
+        n = self._row_count
+        values, x_errors = self._whole_column().evaluate(node.args[0], False)
+        offset, errors = self.evaluate(node.args[1], False)
+
+        dest = self._rows - _to_int(offset)
+        valid = (dest >= 0) & (dest < n)
+        source = dest[valid].astype(np.int64)
+
+        result = np.full(self._size, NaN)
+        result[valid] = values[source]
+        if x_errors is not None:
+            more = np.zeros(self._size, dtype=bool)
+            more[valid] = x_errors[source]
+            errors = _merge(errors, _where(more, True))
+        return result, errors
+
+    def _column_wise(self, node, filt):
+        # column functions need the whole column, the rows asked for are
+        # taken from the result
+        whole = self._whole_column()
+        if whole is not self:
+            values, errors = whole.evaluate(node, filt)
+            rows = slice(self._start, self._end)
+            return values[rows], (_where(errors[rows], True) if errors is not None else None)
+
+        function = node._function
+        arg_types = node._arg_types
+        n = self._row_count
+
+        if function.meta.has_group_by and len(node.args) > 1:
+            raise NotVectorisable()
+
+        # errors in the arguments of column functions become missing values
+        args = [ ]
+        for i, arg in enumerate(node.args):
+            arg_type = arg_types[min(i, len(arg_types) - 1)]
+            values, errors = self._evaluate_arg(arg, arg_type, filt)
+            if errors is not None:
+                values = np.where(errors, NaN, values)
+            args.append((values, arg_type))
+
+        # group_by isn't a parameter of the function, so has no type
+        group_by = None
+        keywords = [ ]
+        for kwarg in node.keywords:
+            if kwarg.arg == 'group_by':
+                group_by = kwarg.value
+            else:
+                keywords.append(kwarg)
+
+        if len(keywords) > len(node._kw_types):
+            raise NotVectorisable()
+
+        kwargs = { }
+        for kwarg, kw_type in zip(keywords, node._kw_types):
+            values, errors = self._evaluate_arg(kwarg, kw_type, filt)
+            if errors is not None:
+                values = np.where(errors, NaN, values)
+            kwargs[kwarg.arg] = (values, kw_type)
+
+        def call(mask=None):
+            if mask is None:
+                a = [ _as_list(v, t) for v, t in args ]
+                k = { name: _as_list(v, t) for name, (v, t) in kwargs.items() }
+            else:
+                a = [ _as_list(v[mask], t) for v, t in args ]
+                k = { name: _as_list(v[mask], t) for name, (v, t) in kwargs.items() }
+            return function(*a, **k)
+
+        if group_by is None:
+            try:
+                value = call()
+            except Exception:
+                return np.full(n, NaN), np.ones(n, dtype=bool)
+            if not isinstance(value, list):
+                return np.full(n, convert(value, float)), None
+            values = np.full(n, NaN)
+            errors = np.zeros(n, dtype=bool)
+            count = min(n, len(value))
+            values[:count] = [ convert(v, float) for v in value[:count] ]
+            errors[count:] = True
+            return values, _where(errors, True)
+
+        codes = np.full(n, -1)
+        errors = np.zeros(n, dtype=bool)
+        keys = { }
+        for index in range(n):
+            try:
+                value = group_by.fvalue(index, n, filt)
+            except Exception:
+                errors[index] = True
+                continue
+            if not is_missing(value):
+                codes[index] = keys.setdefault(convert(value, str), len(keys))
+
+        values = np.full(n, NaN)
+        for code in range(len(keys)):
+            mask = codes == code
+            try:
+                value = call(mask)
+            except Exception:
+                continue
+            if isinstance(value, list):
+                # a list of values can't be converted to each of the
+                # group's rows, so (as row by row) they're errors
+                errors[mask] = True
+            else:
+                values[mask] = convert(value, float)
+
+        return values, _where(errors, True)
@@ -0,0 +1,203 @@
+
+# column-at-a-time forms of the row functions in functions.py
+#
+# each takes an array of row numbers in place of the `index`, and its
+# arguments as float64 arrays (or scalars for the defaults) with NaN
+# representing missing values. arguments annotated as int in functions.py
+# arrive already truncated. each returns a tuple of the values, and a
+# boolean array marking the rows where the row function would have raised
+# an exception (or None if there are no such rows).
+
+import numpy as np
+
+NaN = float('nan')
+
+
+def _errors(mask):
+    if mask is None or not np.any(mask):
+        return None
+    return mask
+
+
+def _ints(values):
+    # int arguments which are missing arrive as NaN, but the row functions
+    # receive them as -2147483648
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), -2147483648.0, values)
+
+
+def _stack(arg0, args):
+    return np.vstack(np.broadcast_arrays(arg0, *args))
+
+
+def _stats(arg0, args, ignore_missing):
+    values = _stack(arg0, args)
+    filtering = _ints(ignore_missing) != 0
+    valid = np.where(filtering, ~np.isnan(values), True)
+    count = valid.sum(axis=0)
+    mean = np.where(valid, values, 0).sum(axis=0) / count
+    ss = np.where(valid, (values - mean) ** 2, 0).sum(axis=0)
+    variance = ss / (count - 1)
+    return variance, count
+
+
+def MAX(rows, arg0, *args):
+    values = _stack(arg0, args)
+    all_missing = np.isnan(values).all(axis=0)
+    return np.fmax.reduce(values, axis=0), _errors(all_missing)
+
+
+def MIN(rows, arg0, *args):
+    values = _stack(arg0, args)
+    all_missing = np.isnan(values).all(axis=0)
+    return np.fmin.reduce(values, axis=0), _errors(all_missing)
+
+
+def MEAN(rows, arg0, *args, ignore_missing=0, min_valid=0):
+    values = _stack(arg0, args)
+    min_valid = _ints(min_valid)
+    filtering = (min_valid > 0) | (_ints(ignore_missing) != 0)
+    valid = np.where(filtering, ~np.isnan(values), True)
+    count = valid.sum(axis=0)
+    result = np.where(valid, values, 0).sum(axis=0) / count
+    too_few = count < min_valid
+    result[too_few] = NaN
+    return result, _errors((count == 0) & ~too_few)
+
+
+def SUM(rows, arg0, *args, ignore_missing=0, min_valid=0):
+    values = _stack(arg0, args)
+    min_valid = _ints(min_valid)
+    filtering = (min_valid > 0) | (_ints(ignore_missing) != 0)
+    valid = np.where(filtering, ~np.isnan(values), True)
+    count = valid.sum(axis=0)
+    terms = np.where(valid, values, 0)
+    result = terms.sum(axis=0)
+    # math.fsum() raises for inf - inf, and for intermediate overflow
+    pos_inf = (terms == np.inf).any(axis=0)
+    neg_inf = (terms == -np.inf).any(axis=0)
+    errors = (pos_inf & neg_inf) | (np.isinf(result) & ~pos_inf & ~neg_inf)
+    too_few = count < min_valid
+    result[too_few] = NaN
+    return result, _errors(errors & ~too_few)
+
+
+def STDEV(rows, arg0, *args, ignore_missing=0):
+    variance, count = _stats(arg0, args, ignore_missing)
+    # statistics.stdev() raises for fewer than two values, and for NaNs
+    return np.sqrt(variance), _errors((count < 2) | np.isnan(variance))
+
+
+def VAR(rows, arg0, *args, ignore_missing=0):
+    variance, count = _stats(arg0, args, ignore_missing)
+    return variance, _errors(count < 2)
+
+
+def ABS(rows, value):
+    return np.abs(value), None
+
+
+def ROUND(rows, value, digits=0):
+    digits = np.broadcast_to(_ints(digits), value.shape)
+    result = np.array(value, dtype=np.float64)
+    for d in np.unique(digits):
+        mask = digits == d
+        if d > 300:
+            continue  # beyond the precision of a double
+        elif d < -300:
+            finite = mask & np.isfinite(value)
+            result[finite] = value[finite] * 0.0
+        else:
+            result[mask] = np.round(value[mask], int(d))
+    return result, None
+
+
+def FLOOR(rows, value):
+    return np.floor(value), _errors(np.isinf(value))
+
+
+def CEILING(rows, value):
+    return np.ceil(value), _errors(np.isinf(value))
+
+
+def EXP(rows, value):
+    result = np.exp(value)
+    return result, _errors(np.isinf(result) & np.isfinite(value))
+
+
+def LN(rows, value):
+    return np.log(value), _errors(value <= 0)
+
+
+def LOG10(rows, value):
+    return np.log10(value), _errors(value <= 0)
+
+
+def SQRT(rows, value):
+    return np.sqrt(value), _errors(value < 0)
+
+
+def IIQR(rows, value, q1, q3):
+    width = q3 - q1
+    below = value < q1
+    above = value > q3
+    result = np.zeros(len(rows))
+    result = np.where(below, (value - q1) / width, result)
+    result = np.where(above, (value - q3) / width, result)
+    return result, _errors((below | above) & (width == 0))
+
+
+def BOXCOX(rows, x, lmbda):
+    x, lmbda = np.broadcast_arrays(x, lmbda)
+    powered = x ** lmbda
+    result = (powered - 1) / lmbda
+    errors = np.isinf(powered) & np.isfinite(x) & (x >= 0)
+    is_log = lmbda == 0
+    result = np.where(is_log, np.log(x), result)
+    errors = np.where(is_log, x == 0, errors)
+    neg_inf = (x == 0) & (lmbda < 0)
+    result = np.where(neg_inf, -np.inf, result)
+    result = np.where(x < 0, NaN, result)
+    return result, _errors(errors & ~neg_inf & ~(x < 0))
+
+
+def IF(rows, cond, x=1, y=NaN):
+    result = np.where(cond != 0, x, y)
+    return np.where(np.isnan(cond), NaN, result), None
+
+
+def IFMISS(rows, cond, x=1, y=NaN):
+    return np.where(np.isnan(cond), x, y).astype(np.float64), None
+
+
+def _FILTER(rows, cond):
+    return np.where(np.isnan(cond), 0, cond), None
+
+
+def NOT(rows, x):
+    return np.where(np.isnan(x), NaN, x == 0), None
+
+
+def FILTER(rows, x, *conds):
+    keep = np.ones(len(rows), dtype=bool)
+    for cond in conds:
+        keep &= ~np.isnan(cond) & (cond != 0)
+    return np.where(keep, x, NaN), None
+
+
+def COUNT(rows, *args):
+    if len(args) == 0:
+        return np.zeros(len(rows)), None
+    return (~np.isnan(_stack(args[0], args[1:]))).sum(axis=0).astype(np.float64), None
+
+
+def ROW(rows):
+    return rows + 1.0, None
+
+
+def NOTROW(rows, arg0, *args):
+    row = rows + 1
+    result = np.where(row == arg0, 0.0, 1.0)
+    for arg in args:
+        result[row == arg] = 0
+    return result, None
@@ -233,6 +233,14 @@ class Column(Protocol):
     def get_values(self, index: int, n_rows: int) -> Iterable[CellValue]:
         raise NotImplementedError
 
+    @abstractmethod
+    def set_raw_values(self, index: int, values, initing=False):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_raw_values(self, index: int, n_rows: int, out=None):
+        raise NotImplementedError
+
     @abstractmethod
     def __getitem__(self, index):
         return self.get_value(index)
@@ -9,11 +9,12 @@ import logging
 
 CACHE_AREA_ROWS = 100
 CACHE_AREA_COLUMNS = 50
+CACHE_AREA_COUNT = 9
 
 
 @dataclass(frozen=True)
 class CellRange:
-    """Cell range representing a rectangular selection"""
+    """Cell range representing a rectangular selection (ends inclusive)"""
 
     row_start: int
     column_start: int
@@ -23,6 +24,8 @@ class CellRange:
 
 CellValue: TypeAlias = str | int | float | None
 
+TileIndex: TypeAlias = tuple[int, int]
+
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
@@ -45,41 +48,161 @@ class LRUCache:
 
     def __setitem__(self, key, value):
         self._cache[key] = value
+        self._cache.move_to_end(key)
         while len(self._cache) > self._maxitems:
             self._cache.popitem(last=False)
 
+    def __contains__(self, key) -> bool:
+        return key in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def keys(self) -> list:
+        """The keys, least recently used first"""
+        return list(self._cache.keys())
+
+    def discard(self, key):
+        """Remove an item, if present"""
+        self._cache.pop(key, None)
+
     def clear(self):
         """Clear the cache"""
         self._cache.clear()
 
 
 class DataCache:
-    """A cache for spreadsheet cell values"""
+    """A cache for spreadsheet cell values, held in tiles
+
+    get_values() is called with the (inclusive) range of the tiles to
+    retrieve. With prefetch, moving into a tile that isn't cached retrieves
+    the next tile in the same direction along with it.
+    """
 
     _cache: LRUCache
     _get_values: Callable[[int, int, int, int], tuple[tuple]]
-
-    def __init__(self, get_values: Callable[[int, int, int, int], tuple[tuple]]):
-        self._cache = LRUCache(maxitems=9)
+    _tile_rows: int
+    _tile_columns: int
+    _prefetch: bool
+    _last_tile: TileIndex | None
+
+    def __init__(
+        self,
+        get_values: Callable[[int, int, int, int], tuple[tuple]],
+        *,
+        tile_rows: int = CACHE_AREA_ROWS,
+        tile_columns: int = CACHE_AREA_COLUMNS,
+        max_tiles: int = CACHE_AREA_COUNT,
+        prefetch: bool = True,
+    ):
+        if tile_rows < 1 or tile_columns < 1:
+            raise ValueError("Tiles must have at least one row and column")
+        # a prefetch inserts up to four tiles
+        if max_tiles < (4 if prefetch else 1):
+            raise ValueError("Too few tiles")
+        self._cache = LRUCache(maxitems=max_tiles)
         self._get_values = get_values
+        self._tile_rows = tile_rows
+        self._tile_columns = tile_columns
+        self._prefetch = prefetch
+        self._last_tile = None
 
     def clear(self):
         """Clears the cache"""
         self._cache.clear()
+        self._last_tile = None
+
+    def invalidate(self, cell_range: CellRange):
+        """Discards the tiles which overlap the cell range"""
+        for tile in self._cache.keys():
+            tile_range = self._tile_range(tile)
+            if (
+                tile_range.row_start <= cell_range.row_end
+                and tile_range.row_end >= cell_range.row_start
+                and tile_range.column_start <= cell_range.column_end
+                and tile_range.column_end >= cell_range.column_start
+            ):
+                self._cache.discard(tile)
+
+    def invalidate_rows(self, row_start: int):
+        """Discards the tiles containing the row, and all after it"""
+        first = row_start // self._tile_rows
+        for tile in self._cache.keys():
+            if tile[0] >= first:
+                self._cache.discard(tile)
+
+    def invalidate_columns(self, column_start: int):
+        """Discards the tiles containing the column, and all after it"""
+        first = column_start // self._tile_columns
+        for tile in self._cache.keys():
+            if tile[1] >= first:
+                self._cache.discard(tile)
 
     def get_value(self, row: int, column: int) -> CellValue:
         """Retrieves a value from the cache"""
-        row_start = (row // CACHE_AREA_ROWS) * CACHE_AREA_ROWS
-        row_end = row_start + CACHE_AREA_ROWS
-        column_start = (column // CACHE_AREA_COLUMNS) * CACHE_AREA_COLUMNS
-        column_end = column_start + CACHE_AREA_COLUMNS
-        cell_range = CellRange(row_start, column_start, row_end, column_end)
+        tile = (row // self._tile_rows, column // self._tile_columns)
         try:
-            values = self._cache[cell_range]
-            # log.info('cache hit %s', cell_range)
+            values = self._cache[tile]
+            # log.info('cache hit %s', tile)
         except KeyError:
-            log.info("cache miss %s", cell_range)
-            values = self._get_values(row_start, column_start, row_end, column_end)
-            self._cache[cell_range] = values
-        value = values[row - row_start][column - column_start]
+            log.info("cache miss %s", self._tile_range(tile))
+            values = self._retrieve(tile)
+        self._last_tile = tile
+        value = values[row % self._tile_rows][column % self._tile_columns]
         return value
+
+    def _retrieve(self, tile: TileIndex) -> tuple[tuple]:
+        # retrieves the tile, and the next one along if scrolling
+        tiles = [tile]
+        last = self._last_tile
+        if self._prefetch and last is not None:
+            row_step = tile[0] - last[0]
+            column_step = tile[1] - last[1]
+            moved = (row_step, column_step) != (0, 0)
+            if moved and abs(row_step) <= 1 and abs(column_step) <= 1:
+                ahead = (tile[0] + row_step, tile[1] + column_step)
+                if ahead[0] >= 0 and ahead[1] >= 0 and ahead not in self._cache:
+                    tiles.append(ahead)
+
+        first = (min(t[0] for t in tiles), min(t[1] for t in tiles))
+        last = (max(t[0] for t in tiles), max(t[1] for t in tiles))
+        area = self._get_values(
+            first[0] * self._tile_rows,
+            first[1] * self._tile_columns,
+            (last[0] + 1) * self._tile_rows - 1,
+            (last[1] + 1) * self._tile_columns - 1,
+        )
+
+        # split the area into its tiles; the tile requested is added last,
+        # so it's the last to be evicted
+        for row_tile in range(first[0], last[0] + 1):
+            for column_tile in range(first[1], last[1] + 1):
+                if (row_tile, column_tile) != tile:
+                    values = self._split(
+                        area, row_tile - first[0], column_tile - first[1]
+                    )
+                    self._cache[(row_tile, column_tile)] = values
+
+        values = self._split(area, tile[0] - first[0], tile[1] - first[1])
+        self._cache[tile] = values
+        return values
+
+    def _split(
+        self, area: tuple[tuple], row_tile: int, column_tile: int
+    ) -> tuple[tuple]:
+        # the values of a tile, from an area of several tiles
+        row_start = row_tile * self._tile_rows
+        column_start = column_tile * self._tile_columns
+        column_end = column_start + self._tile_columns
+        rows = area[row_start : row_start + self._tile_rows]
+        return tuple(row[column_start:column_end] for row in rows)
+
+    def _tile_range(self, tile: TileIndex) -> CellRange:
+        row_start = tile[0] * self._tile_rows
+        column_start = tile[1] * self._tile_columns
+        return CellRange(
+            row_start,
+            column_start,
+            row_start + self._tile_rows - 1,
+            column_start + self._tile_columns - 1,
+        )
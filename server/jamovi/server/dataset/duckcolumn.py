@@ -169,6 +169,12 @@ class DuckColumn(Column):
     def get_value(self, index: int):
         return self._dataset.get_value(index, self)
 
+    def set_values(self, index, values, initing=False):
+        self._dataset.set_values(self.index, index, [values])
+
+    def get_values(self, index, n_rows):
+        return [self.get_value(row_no) for row_no in range(index, index + n_rows)]
+
     @property
     def trim_levels(self) -> bool:
         return self._trim_levels
@@ -278,6 +284,12 @@ class DuckColumn(Column):
     def raw(self, index):
         raise NotImplementedError
 
+    def get_raw_values(self, index, n_rows, out=None):
+        raise NotImplementedError
+
+    def set_raw_values(self, index, values, initing=False):
+        self._dataset.set_values(self.index, index, [values])
+
     def set_levels(self, levels):
         # TODO
         pass
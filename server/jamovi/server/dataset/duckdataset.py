@@ -4,19 +4,23 @@ from typing import Iterator
 from typing import Iterable
 from typing import Union
 from typing import TYPE_CHECKING
-from typing import cast
 
 from collections import OrderedDict
 
 import itertools
 from uuid import uuid4
 
+import numpy as np
+
 from .core import DataType
 from .core import MeasureType
 
 from .dataset import DataSet
+from .dataset import ColumnRef
+from .dataset import CellValueArea
 from .duckcolumn import DuckColumn
 from .datacache import DataCache
+from .datacache import CellRange
 
 if TYPE_CHECKING:
     from .duckstore import DuckStore
@@ -144,7 +148,7 @@ class DuckDataSet(DataSet):
         self._column_count = 0
         self._row_count = 0
         self._row_count_ex_filtered = 0
-        self._cache = DataCache(self.get_values)
+        self._cache = DataCache(self._get_cached_values)
 
     def attach(self, read_only: bool = False) -> None:
         self._store.attach(read_only)
@@ -191,7 +195,122 @@ class DuckDataSet(DataSet):
             """,
             {"value": value, "index": row},
         )
-        self._cache.clear()
+        self._invalidate_cells(row, column, row, column)
+
+    def set_values(self, columns: ColumnRef, row_offset: int, values: CellValueArea):
+        """set a block of values (a sequence of values for each column) in
+        the data set, in a single transaction"""
+
+        if isinstance(columns, (int, str)):
+            columns = [columns]
+
+        cols = [self[index_or_name] for index_or_name in columns]
+        arrays = [
+            self._as_array(col, column_values)
+            for col, column_values in zip(cols, values)
+        ]
+
+        # columns of the same length are updated together
+        by_length: dict[int, list[int]] = {}
+        for i, array in enumerate(arrays):
+            if len(array) > 0:
+                by_length.setdefault(len(array), []).append(i)
+
+        self._execute("BEGIN TRANSACTION")
+        try:
+            for n_rows, indices in by_length.items():
+                new_values = {
+                    "index": np.arange(row_offset, row_offset + n_rows, dtype=np.int32)
+                }
+                assignments = []
+                for i in indices:
+                    col = cols[i]
+                    null_value = NULL_VALUES[col.data_type][col.measure_type]
+                    new_values[f"v{ i }"] = arrays[i]
+                    assignments.append(
+                        f'"{ col.iid }" = COALESCE(new_values.v{ i }, { null_value })'
+                    )
+                self._store.execute_with_values(
+                    f"""
+                    UPDATE "sheet_data_{ self._id }" AS data
+                    SET { ', '.join(assignments) }
+                    FROM new_values
+                    WHERE data.index = new_values.index
+                    """,
+                    new_values,
+                )
+        except BaseException:
+            self._execute("ROLLBACK")
+            raise
+        else:
+            self._execute("COMMIT")
+        finally:
+            for col, array in zip(cols, arrays):
+                self._invalidate_cells(
+                    row_offset, col.index, row_offset + len(array) - 1, col.index
+                )
+
+    def _as_array(self, col: DuckColumn, values) -> np.ndarray:
+        # converts a column's values to an array of what's stored in the
+        # database; labels are converted to their level values (adding
+        # levels as needed), and missing values to NULLs or NaNs
+
+        if col.data_type is DataType.DECIMAL:
+            return np.asarray(values, dtype=np.float64)
+
+        if col.data_type is DataType.TEXT and col.measure_type is MeasureType.ID:
+            return np.array(
+                ["" if value is None else str(value) for value in values], dtype=str
+            )
+
+        if isinstance(values, np.ndarray):
+            return values.astype(np.int32, copy=False)
+
+        if col.data_type is DataType.TEXT:
+            raws = {}
+
+            def to_raw(value):
+                if not isinstance(value, str):
+                    return value
+                if value == "":
+                    return -2147483648
+                raw = raws.get(value)
+                if raw is None:
+                    try:
+                        raw = col.get_value_for_label(value)
+                    except KeyError:
+                        raw = self.column_add_level(col, value)
+                    raws[value] = raw
+                return raw
+
+            values = map(to_raw, values)
+
+        return np.fromiter(values, dtype=np.int32)
+
+    def _invalidate_cells(
+        self, row_start: int, column_start: int, row_end: int, column_end: int
+    ):
+        # the cache holds the index and the filter state as columns 0 and 1
+        self._cache.invalidate(
+            CellRange(row_start, 2 + column_start, row_end, 2 + column_end)
+        )
+
+    def _invalidate_column(self, column: DuckColumn):
+        self._invalidate_cells(0, column.index, self._row_count, column.index)
+
+    def _get_cached_values(
+        self, row_start: int, column_start: int, row_end: int, column_end: int
+    ) -> tuple[tuple]:
+        # retrieves values for the cache, where the index and filter state
+        # are columns 0 and 1, and the data set's columns follow
+        values = self.get_values(
+            row_start, max(0, column_start - 2), row_end, column_end - 2
+        )
+        if column_start > 2:
+            values = tuple(row[2:] for row in values)
+        elif column_start > 0:
+            values = tuple(row[column_start:] for row in values)
+        return values
 
     def get_value(self, row: int, column: int | DuckColumn):
         """retrieve a value from the data set"""
@@ -229,6 +348,7 @@ class DuckDataSet(DataSet):
                 ALTER TABLE "sheet_data_{ self._id }"
                 ADD COLUMN "{ column.iid }" { sql_type } DEFAULT { null_value };
                 """)
+            self._invalidate_column(column)
 
         self._execute(
             f"""
@@ -263,36 +383,26 @@ class DuckDataSet(DataSet):
         index_name: str,
     ) -> tuple[tuple]:
         column_end = min(column_end, self._column_count - 1)
+        columns = self._columns_by_index[column_start : column_end + 1]
 
-        queries = [
-            f"""
-            SELECT { index_name }, filter FROM "sheet_data_{ self._id }"
+        projection = [index_name, "filter"]
+        projection.extend(f'"{ column.iid }"' for column in columns)
+
+        query = self._execute(f"""
+            SELECT { ', '.join(projection) }
+            FROM "sheet_data_{ self._id }"
             WHERE { index_name } >= { row_start } AND { index_name } <= { row_end }
             ORDER BY { index_name }
-            """,
-        ]
+            """)
+        values = [array.tolist() for array in query.fetchnumpy().values()]
 
-        for column_no in range(column_start, column_end + 1):
-            column = self._columns_by_index[column_no]
+        # level labels are resolved here, rather than joined in the query
+        for i, column in enumerate(columns, 2):
             if column.data_type is DataType.TEXT and column.has_levels:
-                queries.append(f"""
-                    SELECT levels.label
-                    FROM "sheet_levels_{ self._id }" levels
-                    LEFT JOIN "sheet_data_{ self._id }" data ON levels.value == data."{ column.iid }"
-                    WHERE data.{ index_name } >= { row_start } AND data.{ index_name } <= { row_end } AND levels.piid = { column.iid }
-                    ORDER BY data.{ index_name }
-                """)
-            else:
-                queries.append(f"""
-                    SELECT "{ column.iid }"
-                    FROM "sheet_data_{ self._id }" data
-                    WHERE data.{ index_name } >= { row_start } AND data.{ index_name } <= { row_end }
-                    ORDER BY data.{ index_name }
-                """)
+                labels = {level[0]: level[1] for level in column.levels}
+                values[i] = [labels.get(raw, "") for raw in values[i]]
 
-        sql = f"""SELECT * FROM ({ ') POSITIONAL JOIN ('.join(queries) })"""
-        query = self._execute(sql)
-        return cast(tuple[tuple], query.fetchall())
+        return tuple(zip(*values))
 
     def append_column(self, name: str, import_name: str = "") -> DuckColumn:
         return self.insert_column(self.column_count, name, import_name)
@@ -372,6 +482,7 @@ class DuckDataSet(DataSet):
             ALTER TABLE "sheet_data_{ self._id }" DROP COLUMN temp;
             COMMIT;
             """)
+        self._invalidate_column(column)
 
     def column_add_level(self, column, value):
         """add a new level to the column"""
@@ -392,7 +503,7 @@ class DuckDataSet(DataSet):
             f"""
             INSERT INTO "sheet_levels_{ self._id }" BY NAME (
                 SELECT { column.iid } AS piid, $value AS value, $label AS label, $import_value AS import_value, $pinned AS pinned,
-                    (SELECT count(*) FROM "sheet_levels_{ self._id }") AS index)
+                    (SELECT count(*) FROM "sheet_levels_{ self._id }" WHERE piid = { column.iid }) AS index)
             """,
             {
                 "value": raw,
@@ -402,6 +513,7 @@ class DuckDataSet(DataSet):
             },
         )
         self._column_refresh_levels(column)
+        self._invalidate_column(column)
 
     def _column_refresh_levels(self, column):
         query = self._execute(f"""
@@ -468,6 +580,7 @@ class DuckDataSet(DataSet):
             COMMIT ;
             """,
         )
+        self._cache.invalidate_columns(2 + col_start)
 
     @property
     def column_count(self) -> int:
@@ -488,6 +601,7 @@ class DuckDataSet(DataSet):
                 DELETE FROM "sheet_data_{ self._id }"
                 WHERE index >= { count }
             """)
+        self._cache.invalidate_rows(min(count, row_count))
         self._row_count = count
 
     def insert_rows(self, row_start: int, row_end: int) -> None:
@@ -505,6 +619,7 @@ class DuckDataSet(DataSet):
                 f"""INSERT INTO "sheet_data_{ self._id }" VALUES { joined }"""
             )
         self._store.execute("COMMIT")
+        self._cache.invalidate_rows(row_start)
         self._row_count += n
 
     def delete_rows(self, row_start: int, row_end: int) -> None:
@@ -521,6 +636,7 @@ class DuckDataSet(DataSet):
 
             COMMIT ;
             """)
+        self._cache.invalidate_rows(row_start)
         self._row_count -= n
 
     @property
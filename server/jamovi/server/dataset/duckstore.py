@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+from threading import Lock
+from threading import get_ident
+from threading import enumerate as threads
+
+import numpy as np
+
 from duckdb import connect
 from duckdb import DuckDBPyConnection
 
@@ -8,10 +14,18 @@ from .duckdataset import DuckDataSet
 
 
 class DuckStore(Store):
-    """a store for data sets based on a duckdb database"""
+    """a store for data sets based on a duckdb database
+
+    the store keeps a single read-write connection to the database, opened
+    on first use and kept until the store is closed. other threads (e.g.
+    executors reading the data set to save or export it) are each given a
+    cursor of this connection, which is closed once the thread has ended"""
 
     _db: DuckDBPyConnection | None
     _attached: bool
+    _thread: int | None
+    _cursors: dict[int, DuckDBPyConnection]
+    _lock: Lock
 
     @staticmethod
     def create(path: str) -> DuckStore:
@@ -22,40 +36,89 @@ class DuckStore(Store):
         self._path = path
         self._db = None
         self._attached = False
-        self._attached_read_only = False
+        self._thread = None
+        self._cursors = {}
+        self._lock = Lock()
 
     def attach(self, read_only: bool = False):
         """attach to the database to make changes"""
         if self._attached:
             raise ValueError("Store already attached")
         self._attached = True
-        # we don't actually attach to the db until we need to
-        self._attached_read_only = read_only
+        # we don't actually connect to the db until we need to. read-only
+        # attachments use the same (read-write) connection
 
     def detach(self):
-        """detach from the database (and flush to disk)"""
+        """detach from the database (the connection is kept open)"""
         if not self._attached:
             raise ValueError("Store not attached")
-        if self._db:
-            self._db.close()
-            self._db = None
         self._attached = False
 
+    def checkpoint(self):
+        """write any changes in the write-ahead log to the database file"""
+        if self._db is not None:
+            self._cursor().execute("CHECKPOINT")
+
     def create_dataset(self) -> "DuckDataSet":
         return DuckDataSet.create(self)
 
     def retrieve_dataset(self) -> "DuckDataSet":
         raise NotImplementedError
 
+    def _connection(self) -> DuckDBPyConnection:
+        if not self._attached:
+            raise ValueError("Store not attached")
+        return self._cursor()
+
+    def _cursor(self) -> DuckDBPyConnection:
+        # the connection for the calling thread
+        thread = get_ident()
+        if self._db is not None and thread == self._thread:
+            return self._db
+
+        with self._lock:
+            if self._db is None:
+                self._db = connect(self._path)
+                self._thread = thread
+                return self._db
+            try:
+                return self._cursors[thread]
+            except KeyError:
+                self._release_cursors()
+                cursor = self._db.cursor()
+                self._cursors[thread] = cursor
+                return cursor
+
+    def _release_cursors(self):
+        # closes the cursors of threads which have ended
+        alive = { thread.ident for thread in threads() }
+        for thread in list(self._cursors):
+            if thread not in alive:
+                self._cursors.pop(thread).close()
+
     def execute(
         self, query: object, params: object = None, multiple_parameter_sets=False
     ):
         """execute SQL in the duckdb database"""
-        if not self._attached:
-            raise ValueError("Store not attached")
-        if self._db is None:
-            self._db = connect(self._path, read_only=self._attached_read_only)
-        return self._db.execute(query, params, multiple_parameter_sets)
+        return self._connection().execute(query, params, multiple_parameter_sets)
+
+    def execute_with_values(self, query: str, values: dict[str, np.ndarray]):
+        """execute SQL which reads from a table of values named new_values
+
+        values is a dict of equal length numpy arrays (one per table column).
+        numeric and unicode ('U') arrays are read directly, with NaNs read as
+        NULLs"""
+        db = self._connection()
+        # duckdb resolves new_values by name, from the caller's variables
+        new_values = values  # noqa: F841
+        return db.execute(query)
 
     def close(self) -> None:
-        pass
+        with self._lock:
+            for cursor in self._cursors.values():
+                cursor.close()
+            self._cursors.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                self._thread = None
@@ -14,6 +14,10 @@ class Store(Protocol):
     def retrieve_dataset(self) -> DataSet:
         raise NotImplementedError
 
+    def checkpoint(self) -> None:
+        # stores which log their changes write them to their file here
+        pass
+
     @abstractmethod
     def close(self) -> None:
         raise NotImplementedError
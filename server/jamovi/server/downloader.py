@@ -1,13 +1,12 @@
 
-import ssl
 from asyncio import create_task
 from functools import partial
 from tempfile import TemporaryFile
 
 import aiohttp
-import certifi
 
 from .utils.stream import ProgressStream
+from . import httpclient
 from .i18n import _
 
 
@@ -42,9 +41,6 @@ class _DownloadInfo:
 
 
 class Download:
-    def __init__(self):
-        self._ssl_context = ssl.create_default_context(cafile=certifi.where())
-
     def download(self, url, io=None):
         info = _DownloadInfo(io, ProgressStream())
         info.stream.write((0, 1))
@@ -60,22 +56,21 @@ class Download:
 
     async def _download(self, url, info):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url,
-                    ssl=self._ssl_context,
-                    timeout=aiohttp.ClientTimeout(total=24 * 60 * 60),
-                ) as response:
-                    response.raise_for_status()
-                    content_length = response.headers.get('Content-Length')
-                    if content_length is not None:
-                        info.size = int(content_length)
-                    async for chunk in response.content.iter_chunked(64 * 1024):
-                        if info.file is None:
-                            info.file = TemporaryFile()
-                        info.file.write(chunk)
-                        info.progress += len(chunk)
-                        info.stream.write((info.progress, info.size))
+            session = httpclient.get_client()
+            async with session.get(
+                url,
+                timeout=aiohttp.ClientTimeout(total=24 * 60 * 60),
+            ) as response:
+                response.raise_for_status()
+                content_length = response.headers.get('Content-Length')
+                if content_length is not None:
+                    info.size = int(content_length)
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    if info.file is None:
+                        info.file = TemporaryFile()
+                    info.file.write(chunk)
+                    info.progress += len(chunk)
+                    info.stream.write((info.progress, info.size))
             if info.file is not None:
                 info.file.flush()
                 info.file.seek(0)
@@ -84,14 +79,14 @@ class Download:
             raise DownloadError(status=e.status) from e
         except aiohttp.ClientSSLError as e:
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        'http://clients3.google.com/generate_204'
-                    ) as response:
-                        if response.status != 204:
-                            raise CaptivePortalError from e
-                        else:
-                            raise DownloadError from e
+                session = httpclient.get_client()
+                async with session.get(
+                    'http://clients3.google.com/generate_204'
+                ) as response:
+                    if response.status != 204:
+                        raise CaptivePortalError from e
+                    else:
+                        raise DownloadError from e
             except (aiohttp.ClientConnectorError, OSError):
                 raise NoNetworkError from e
         except (aiohttp.ClientConnectorError, OSError):
@@ -58,12 +58,13 @@ class Engine:
         RUNNING = 2
         OPPING = 3  # performing operation
 
-    def __init__(self, parent, data_path, conn_root, config, monitor=None):
+    def __init__(self, parent, data_path, conn_root, config, monitor=None, request_log=None):
         self._parent = parent
         self._data_path = data_path
         self._conn_root = conn_root
         self._config = config
         self._monitor = monitor
+        self._request_log = request_log
 
         allow_arbitrary_code = config.get('allow_arbitrary_code', 'true')
         self._allow_arbitrary_code = not (allow_arbitrary_code == 'false' or allow_arbitrary_code == '0')
@@ -103,7 +104,7 @@ class Engine:
 
         if self._socket is not None:
             try:
-                self._socket.close()
+                self._close_socket(self._socket)
             except Exception as e:
                 log.exception(e)
             self._socket = None
@@ -177,17 +178,30 @@ class Engine:
             self._socket = nanomsg.Socket(nanomsg.PAIR)
             self._socket._set_recv_timeout(500)
 
-            # max size of nanomsg messages ... default was 1Mb under macOS
-            self._socket.set_int_option(nanomsg.SOL_SOCKET, nanomsg.RCVMAXSIZE, 4 * 1024 * 1024)
+            # no limit on the size of nanomsg messages (the default was 1Mb
+            # under macOS). the ipc transport frames them by length, so large
+            # results arrive whole
+            self._socket.set_int_option(nanomsg.SOL_SOCKET, nanomsg.RCVMAXSIZE, -1)
             self._socket.bind(self._conn_path)
 
-            # need a separate thread for nanomsg :/
-            self._thread = threading.Thread(target=self._run_loop, args=(
-                self._socket,
-                self._process,
-                self._process_stopping,
-                self._process_abandoned))
-            self._thread.start()
+            try:
+                # messages are received from the event loop, when the
+                # socket's file descriptor becomes readable
+                self._ioloop.add_reader(self._socket.recv_fd, self._on_readable, self._socket)
+                create_task(self._watch_process(
+                    self._socket,
+                    self._process,
+                    self._process_stopping,
+                    self._process_abandoned))
+            except NotImplementedError:
+                # the proactor event loop (windows) can't watch file
+                # descriptors, so a separate thread is needed :/
+                self._thread = threading.Thread(target=self._run_loop, args=(
+                    self._socket,
+                    self._process,
+                    self._process_stopping,
+                    self._process_abandoned))
+                self._thread.start()
 
             self._stopped.clear()
             self._running.set()
@@ -200,6 +214,10 @@ class Engine:
                 'cause': str(e),
             })
 
+    @property
+    def is_running(self):
+        return self._running.is_set()
+
     async def stop(self):
 
         log.debug('Stopping engine (2)')
@@ -248,7 +266,7 @@ class Engine:
 
         try:
             log.debug('Trying socket close')
-            self._socket.close()
+            self._close_socket(self._socket)
             log.debug('Socket closed')
         except Exception as e:
             log.debug('Socket close failed')
@@ -284,12 +302,16 @@ class Engine:
         await self._running.wait()
 
         request.restartEngines = False  # unset in case of malicious actor
+        request.cancel = False
 
         message = ComsMessage()
         message.id = self._message_id
         message.payload = request.SerializeToString()
         message.payloadType = 'AnalysisRequest'
 
+        if self._request_log is not None:
+            self._request_log.sent(request, self._process.pid)
+
         self._socket.send(message.SerializeToString())
         self._message_id += 1
 
@@ -315,11 +337,18 @@ class Engine:
 
                 if results_received in done:
 
-                    results, complete = results_received.result()
+                    message, complete = results_received.result()
+
+                    if (request.instanceId == message.instanceId
+                            and request.analysisId == message.analysisId
+                            and request.revision == message.revision):
 
-                    if (request.instanceId == results.instanceId
-                            and request.analysisId == results.analysisId
-                            and request.revision == results.revision):
+                        if self._request_log is not None:
+                            self._request_log.received(request, len(message.payload), self._process.pid)
+
+                        # only results for this request are parsed
+                        results = AnalysisResponse()
+                        results.ParseFromString(message.payload)
 
                         if complete:
                             results_stream.set_result(results)
@@ -339,9 +368,13 @@ class Engine:
                     error = self._create_error_response(
                         request,
                         _('This analysis has exceeded the current time limits and has been terminated.'))
-                    await self.stop()
-                    results_stream.set_result(error)
-                    await self.restart()
+                    if self._parent._swap_engine(self):
+                        # this engine is stopped and restarted in the background
+                        results_stream.set_result(error)
+                    else:
+                        await self.stop()
+                        results_stream.set_result(error)
+                        await self.restart()
                     break
 
                 elif engine_stopped in done:
@@ -352,10 +385,14 @@ class Engine:
                         request,
                         _('This analysis has terminated, likely due to hitting a resource limit.'))
                     results_stream.set_result(error)
-                    await self.restart()
+                    if not self._parent._swap_engine(self):
+                        await self.restart()
                     break
 
                 elif results_stream in done:
+                    # the request has been superseded or cancelled, so the
+                    # engine needn't carry on with it
+                    self._cancel(request)
                     break
 
         except CancelledError:
@@ -368,6 +405,28 @@ class Engine:
             if timeout is not None:
                 timeout.cancel()
 
+    def _cancel(self, request):
+        # aborts the running analysis at its next checkpoint, without
+        # restarting the engine process
+        if not self._running.is_set():
+            return
+
+        log.debug('%s %s', 'cancelling', req_str(request))
+
+        cancel = AnalysisRequest()
+        cancel.instanceId = request.instanceId
+        cancel.analysisId = request.analysisId
+        cancel.revision = request.revision
+        cancel.cancel = True
+
+        message = ComsMessage()
+        message.id = self._message_id
+        message.payload = cancel.SerializeToString()
+        message.payloadType = 'AnalysisRequest'
+
+        self._socket.send(message.SerializeToString())
+        self._message_id += 1
+
     async def restart(self):
         if self._running.is_set():
             log.info('Stopping engine')
@@ -379,6 +438,45 @@ class Engine:
         self._running.clear()
         self._stopped.set()
 
+    def _on_message(self, bytes):
+        message = ComsMessage()
+        message.ParseFromString(bytes)
+        complete = (message.status != MESSAGE_IN_PROGRESS)
+        self._results_queue.put_nowait((message, complete))
+
+    def _on_readable(self, socket):
+        # receives the messages waiting, without blocking
+        while socket.is_open():
+            try:
+                bytes = socket.recv(flags=nanomsg.DONTWAIT)
+            except nanomsg.NanoMsgAPIError as e:
+                if e.errno != nanomsg.EAGAIN and not self._process_stopping.is_set():
+                    log.exception(e)
+                break
+            self._on_message(bytes)
+
+    async def _watch_process(self, socket, process, stopping_flag, abandoned_flag):
+        try:
+            if isinstance(process, subprocess.Popen):
+                await self._ioloop.run_in_executor(None, process.wait)
+            else:
+                await process.wait()
+            if socket.is_open():
+                # any results sent before the process ended
+                self._on_readable(socket)
+        finally:
+            self._on_terminated(process.returncode, stopping_flag, abandoned_flag)
+            try:
+                self._close_socket(socket)
+            except nanomsg.NanoMsgAPIError:
+                # socket may already be closed (e.g. by stop())
+                pass
+
+    def _close_socket(self, socket):
+        if self._thread is None and socket.is_open():
+            self._ioloop.remove_reader(socket.recv_fd)
+        socket.close()
+
     def _run_loop(self, socket, process, stopping_flag, abandoned_flag):
         parent = threading.main_thread()
 
@@ -387,15 +485,8 @@ class Engine:
                 try:
                     bytes = socket.recv()
 
-                    message = ComsMessage()
-                    message.ParseFromString(bytes)
-                    complete = (message.status != MESSAGE_IN_PROGRESS)
-
-                    results = AnalysisResponse()
-                    results.ParseFromString(message.payload)
-
                     try:
-                        self._ioloop.call_soon_threadsafe(self._results_queue.put_nowait, (results, complete))
+                        self._ioloop.call_soon_threadsafe(self._on_message, bytes)
                     except RuntimeError:
                         # loop already closed during shutdown -- nothing to deliver
                         break
@@ -446,7 +537,8 @@ class Engine:
                 else:
                     # crash while analysis not running
                     # unusual, but recoverable -- perform a restart
-                    create_task(self.restart())
+                    if not self._parent._swap_engine(self):
+                        create_task(self.restart())
             else:
                 # intentional stop
                 pass
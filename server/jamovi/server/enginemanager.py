@@ -14,6 +14,8 @@ from asyncio import FIRST_EXCEPTION
 
 from .utils import req_str
 from .engine import Engine
+from .scheduler import engine_limit
+from . import snapshots
 
 import logging
 
@@ -22,17 +24,31 @@ log = logging.getLogger(__name__)
 
 class EngineManager:
 
-    def __init__(self, data_path, queue, config, monitor=None):
+    def __init__(self, data_path, queue, config, monitor=None, request_log=None, limit=None):
 
         self._data_path = data_path
         self._queue = queue
         self._config = config
         self._monitor = monitor
+        self._request_log = request_log
 
         self._requests = [ None ] * queue.qsize
         self._engines = [ None ] * queue.qsize
         self._next_conn_index = 0
 
+        # standby engines are started ahead of time, so a slot whose
+        # engine crashes or times out can be given one straight away. they
+        # count against the engine limit like any other, so there may be
+        # fewer than asked for if the limit is reached
+        self._limit = limit if limit is not None else engine_limit()
+        n_standby = 0
+        for _ in range(int(self._config.get('engine_standby_count', '1'))):
+            if not self._limit.acquire():
+                break
+            n_standby += 1
+        self._standby = [ None ] * n_standby
+        self._warming = set()
+
         self._message_id = 1
         self._listeners = [ ]
         self._notifications = Queue(maxsize=0)
@@ -44,13 +60,12 @@ class EngineManager:
             self._conn_root = "ipc://{}/conn".format(self._dir.name)
 
         for index in range(queue.qsize):
-            engine = Engine(
-                parent=self,
-                data_path=data_path,
-                conn_root=self._conn_root,
-                config=self._config,
-                monitor=self._monitor)
-            self._engines[index] = engine
+            self._engines[index] = self._create_engine()
+
+        for index in range(n_standby):
+            self._standby[index] = self._create_engine()
+
+        self._queue.resized += self._on_resized
 
         self._run_loop_task = create_task(self._run_loop())
 
@@ -58,6 +73,15 @@ class EngineManager:
         if mem_limit and platform.uname().system == 'Linux':
             log.info('Applying engine memory limit %s Mb', mem_limit)
 
+    def _create_engine(self):
+        return Engine(
+            parent=self,
+            data_path=self._data_path,
+            conn_root=self._conn_root,
+            config=self._config,
+            monitor=self._monitor,
+            request_log=self._request_log)
+
     def notifications(self):
         return self._notifications
 
@@ -105,6 +129,7 @@ class EngineManager:
         try:
             log.debug('%s %s on %s', 'running', req_str(request), index)
             self._requests[index] = (request, stream)
+            await snapshots.ready(request)
             await self._engines[index].run(request, stream)
             log.debug('%s %s', 'completed', req_str(request))
         except CancelledError:
@@ -113,17 +138,93 @@ class EngineManager:
         except Exception as e:
             log.exception(e)
         finally:
-            if self._requests[index] == (request, stream):
-                self._requests[index] = None
+            # the slots may have been removed from in the meantime
+            for index, value in enumerate(self._requests):
+                if value == (request, stream):
+                    self._requests[index] = None
+            self._remove_engines()
+
+    def _on_resized(self, n_slots):
+        while len(self._engines) < n_slots:
+            self._add_engine()
+        self._remove_engines()
+
+    def _add_engine(self):
+        # a standby engine that's running is used if there is one
+        for index, standby in enumerate(self._standby):
+            if standby.is_running and standby not in self._warming:
+                engine = self._create_engine()
+                self._standby[index] = engine
+                self._warming.add(engine)
+                create_task(self._warm(engine.start(), engine))
+                break
+        else:
+            standby = self._create_engine()
+            create_task(standby.start())
+        self._engines.append(standby)
+        self._requests.append(None)
+        log.debug('added engine, now %s', len(self._engines))
+
+    def _remove_engines(self):
+        # removes idle engines beyond the number of slots
+        n_remove = len(self._engines) - self._queue.n_slots
+        for index in reversed(range(len(self._engines))):
+            if n_remove <= 0:
+                break
+            if self._requests[index] is None:
+                engine = self._engines.pop(index)
+                del self._requests[index]
+                create_task(engine.stop())
+                n_remove -= 1
+                log.debug('removed engine, now %s', len(self._engines))
+
+    def _swap_engine(self, engine):
+        # swaps an engine which has crashed or timed out for a standby one
+        # that's running, and restarts it in the background to become a
+        # standby itself. returns False if the engine can't be swapped
+        if engine not in self._engines:
+            return False
+        for standby in self._standby:
+            if standby.is_running and standby not in self._warming:
+                break
+        else:
+            return False
+
+        index = self._engines.index(engine)
+        self._engines[index] = standby
+        self._standby[self._standby.index(standby)] = engine
+        log.debug('swapped in standby engine on %s', index)
+
+        self._warming.add(engine)
+        create_task(self._warm(engine.restart(), engine))
+        return True
+
+    async def _warm(self, starting, engine):
+        # a standby engine isn't swapped in until it has (re)started
+        try:
+            await starting
+        finally:
+            self._warming.discard(engine)
 
     async def start(self):
         await wait(map(lambda e: create_task(e.start()), self._engines), return_when=FIRST_EXCEPTION)
+        # the standby engines start once the others are up
+        for engine in self._standby:
+            self._warming.add(engine)
+            create_task(self._warm(engine.start(), engine))
 
     async def stop(self):
-        await wait(map(lambda e: create_task(e.stop()), self._engines), return_when=FIRST_EXCEPTION)
+        engines = self._engines + self._standby
+        self._limit.release(len(self._standby))
+        self._standby = [ ]
+        await wait(map(lambda e: create_task(e.stop()), engines), return_when=FIRST_EXCEPTION)
 
     async def restart_engines(self):
-        await wait(map(lambda e: create_task(e.restart()), self._engines), return_when=FIRST_EXCEPTION)
+        restarts = [ create_task(e.restart()) for e in self._engines ]
+        for engine in self._standby:
+            self._warming.add(engine)
+            restarts.append(create_task(self._warm(engine.restart(), engine)))
+        await wait(restarts, return_when=FIRST_EXCEPTION)
 
     def add_engine_listener(self, listener):
         self._listeners.append(('engine-event', listener))
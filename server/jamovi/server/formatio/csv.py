@@ -4,17 +4,31 @@
 
 import os
 import csv
+import codecs
 import math
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from io import StringIO
 from io import TextIOWrapper
 import chardet
 import logging
 
+from jamovi.core import ColumnType
+from jamovi.core import DataType
+
 from .reader import Reader
+from .reader import ColumnReader
 from .jsonlines import JSONLinesReader
 
 
 log = logging.getLogger('jamovi')
 
+# files are read in chunks of (about) this many bytes, in parallel
+# worker processes when there's more than one chunk
+CHUNK_SIZE = 32 * 1024 * 1024
+
 
 def get_readers():
     return [ ( 'csv', read ), ( 'tsv', read ), ( 'txt', read ), ( 'json', read ) ]
@@ -93,6 +107,8 @@ class CSVReader(Reader):
             if encoding == 'ascii':
                 encoding = 'utf-8-sig'
 
+            self._path = path
+            self._encoding = encoding
             self._text_stream = TextIOWrapper(self._file, encoding=encoding, errors='replace')
 
             try:
@@ -110,6 +126,143 @@ class CSVReader(Reader):
                 self._file.close()
             raise e
 
+    def read_into(self, data, path, prog_cb):
+
+        self.open(path)
+
+        try:
+            chunks = self._find_chunks()
+        except Exception:
+            self.close()
+            raise
+
+        if chunks is None:
+            # this file can't be split up, so it's read a row at a time
+            self.close()
+            super().read_into(data, path, prog_cb)
+            return
+
+        try:
+            column_names = next(iter(self))
+        finally:
+            self.close()
+
+        if len(column_names) == 0:
+            column_names = ['A']
+
+        column_readers = [ ]
+        for i, column_name in enumerate(column_names):
+            if column_name is None:
+                column_name = ''
+            data.append_column(column_name)
+            column = data[i]
+            column.column_type = ColumnType.DATA
+            column_readers.append(ColumnReader(column, i, self._settings))
+
+        column_count = len(column_readers)
+        settings = { 'missings': self._settings.get('missings', 'NA') }
+        fmtparams = {
+            'delimiter': self._dialect.delimiter,
+            'quotechar': self._dialect.quotechar,
+            'doublequote': self._dialect.doublequote,
+            'skipinitialspace': self._dialect.skipinitialspace,
+            'quoting': self._dialect.quoting,
+            'escapechar': self._dialect.escapechar,
+            'lineterminator': self._dialect.lineterminator,
+        }
+
+        def job(start, end, as_text=None):
+            return (path, self._encoding, fmtparams, start, end, column_count, settings, as_text)
+
+        n_workers = min(len(chunks), os.cpu_count() or 1)
+        if n_workers > 1:
+            context = multiprocessing.get_context('spawn')
+            pool = ProcessPoolExecutor(n_workers, mp_context=context)
+        else:
+            pool = None
+
+        try:
+            jobs = [ job(start, end) for start, end in chunks ]
+            results = _run(pool, jobs, lambda p: prog_cb(0.9 * p))
+
+            for i, column_reader in enumerate(column_readers):
+                for result in results:
+                    column_reader.merge(result.readers[i])
+                column_reader.ruminate()
+
+            # chunks with values of text columns which looked like numbers
+            # are read again, for the values as they appear in the file
+            jobs = [ ]
+            reread = [ ]
+            for chunk_no, result in enumerate(results):
+                as_text = [ ]
+                for i, column_reader in enumerate(column_readers):
+                    if (column_reader.data_type is DataType.TEXT
+                            and not isinstance(result.columns[i], list)):
+                        as_text.append(i)
+                if as_text:
+                    jobs.append(job(*chunks[chunk_no], as_text))
+                    reread.append(chunk_no)
+
+            for chunk_no, result in zip(reread, _run(pool, jobs, lambda p: prog_cb(0.9 + 0.05 * p))):
+                for i, values in enumerate(result.columns):
+                    if values is not None:
+                        results[chunk_no].columns[i] = values
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # empty rows at the end of the data set are excluded
+        row_count = sum(map(lambda result: result.row_count, results))
+        for result in reversed(results):
+            row_count -= result.trailing_empty
+            if result.trailing_empty < result.row_count:
+                break
+
+        data.set_row_count(row_count)
+
+        row_offset = 0
+        for result in results:
+            n = min(result.row_count, row_count - row_offset)
+            if n <= 0:
+                break
+            values = [ column[:n] for column in result.columns ]
+            self._write_values(data, column_readers, row_offset, values)
+            row_offset += n
+            prog_cb(0.95 + 0.05 * row_offset / row_count)
+
+    def _find_chunks(self):
+        # splits the file (after the header) into byte ranges of whole rows.
+        # returns None if the file can't be split this way
+
+        dialect = self._dialect
+        if (self._encoding is None
+                or self._total == 0
+                or dialect.quoting == csv.QUOTE_NONE
+                or dialect.escapechar is not None):
+            return None
+
+        # the file can be split at newlines if the encoding represents
+        # them, and quotes, as a single byte that can't appear elsewhere
+        try:
+            special = '\n' + dialect.quotechar
+            encoder = codecs.getincrementalencoder(self._encoding)()
+            encoder.encode(' ')  # skip past any BOM
+            if encoder.encode(special) != special.encode('ascii'):
+                return None
+        except (UnicodeError, LookupError):
+            return None
+
+        with open(self._path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                bounds = _find_row_bounds(mapped, dialect.quotechar.encode('ascii'), CHUNK_SIZE)
+
+        if bounds is None:
+            return None
+
+        # the first chunk is the header
+        return list(zip(bounds[1:-1], bounds[2:]))
+
     def progress(self):
         return self._file.tell()
 
@@ -137,3 +290,111 @@ def trim_after_last_newline(text):
         text = text[:index]
 
     return text
+
+
+def _find_row_bounds(mapped, quote, chunk_size):
+    # returns the offsets at which the file is split into chunks; the
+    # first chunk is the header row, the rest about chunk_size bytes long.
+    # rows end at newlines preceded by an even number of quotes, which
+    # skips over newlines inside quoted values. returns None if the file
+    # has no newlines (it may use '\r' alone)
+
+    size = len(mapped)
+    bounds = [ 0 ]
+    pos = 0
+    quotes = 0
+    target = 0
+
+    while target < size:
+        end = mapped.find(b'\n', target)
+        while end != -1:
+            quotes += mapped[pos:end].count(quote)
+            pos = end + 1
+            if quotes % 2 == 0:
+                break
+            end = mapped.find(b'\n', pos)
+        if end == -1:
+            if len(bounds) == 1 and size > 0:
+                return None
+            break
+        bounds.append(pos)
+        target = pos + chunk_size
+
+    if bounds[-1] != size:
+        bounds.append(size)
+    return bounds
+
+
+class _ChunkResult:
+
+    def __init__(self, row_count, trailing_empty, readers, columns):
+        self.row_count = row_count
+        self.trailing_empty = trailing_empty
+        self.readers = readers
+        self.columns = columns
+
+
+def _run(pool, jobs, prog_cb):
+    # reads the chunks described by jobs, in the pool if there is one,
+    # returns the results in order
+
+    if pool is None:
+        results = [ ]
+        for i, job in enumerate(jobs):
+            results.append(_read_chunk(*job))
+            prog_cb((i + 1) / len(jobs))
+        return results
+
+    futures = [ pool.submit(_read_chunk, *job) for job in jobs ]
+    for i, _ in enumerate(as_completed(futures)):
+        prog_cb((i + 1) / len(futures))
+    return [ future.result() for future in futures ]
+
+
+def _read_chunk(path, encoding, fmtparams, start, end, column_count, settings, as_text=None):
+    # reads the rows between the byte offsets start and end. each column's
+    # values are examined, and returned as an array of what they look like,
+    # or as a list of text. if as_text is specified, only those columns are
+    # read, and always as text
+
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding, errors='replace')
+
+    missings = (None, settings.get('missings', 'NA'), '', ' ')
+    stream = StringIO(text, newline=None)  # universal newlines, as with TextIOWrapper
+    values = [ [ ] for i in range(column_count) ]
+
+    row_count = 0
+    trailing_empty = 0
+
+    for row in csv.reader(stream, **fmtparams):
+        empty = True
+        n = len(row)
+        for i in range(column_count):
+            value = row[i] if i < n else None
+            if value in missings:
+                value = None
+            else:
+                empty = False
+            values[i].append(value)
+        row_count += 1
+        trailing_empty = trailing_empty + 1 if empty else 0
+
+    if as_text is not None:
+        columns = [ values[i] if i in as_text else None for i in range(column_count) ]
+        return _ChunkResult(row_count, trailing_empty, None, columns)
+
+    readers = [ ]
+    columns = [ ]
+
+    for i in range(column_count):
+        reader = ColumnReader(None, i, settings)
+        for value in values[i]:
+            reader.examine_value(value)
+        array = reader.values_as_array(values[i])
+        readers.append(reader)
+        columns.append(values[i] if array is None else array)
+        values[i] = None
+
+    return _ChunkResult(row_count, trailing_empty, readers, columns)
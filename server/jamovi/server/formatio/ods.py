@@ -139,6 +139,16 @@ class ODSReader(Reader):
     def progress(self):
         return self._row_no
 
+    def row_count(self):
+        return self._row_count
+
+    def read_block(self, start, count):
+        rows = [ ]
+        for row_no in range(self._first_row + start, self._first_row + start + count):
+            values = self._sheet.row(row_no)[self._first_col:self._last_col + 1]
+            rows.append(list(map(to_string, values)))
+        return rows
+
     def __iter__(self):
         self._row_no = 0
         rows = self._sheet.rows()
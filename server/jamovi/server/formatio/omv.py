@@ -1,15 +1,18 @@
 
 import zipfile
 from zipfile import ZipFile
+from contextlib import contextmanager
 import io
 import json
-from tempfile import NamedTemporaryFile
+import mmap
 from tempfile import TemporaryDirectory
 import struct
 import os
 import os.path
 import re
 
+import numpy as np
+
 from .exceptions import FileCorruptError
 from .exceptions import FileFormatNotSupportedError
 
@@ -27,6 +30,9 @@ from logging import getLogger
 
 log = getLogger(__name__)
 
+# the number of rows written to data.bin at a time
+WRITE_CHUNK_ROWS = 1 << 20
+
 
 def write(data: InstanceModel, path, prog_cb, html=None, is_template=False):
 
@@ -153,65 +159,58 @@ def write(data: InstanceModel, path, prog_cb, html=None, is_template=False):
         zip.writestr('xdata.json', json.dumps(xdata), zipfile.ZIP_DEFLATED)
         xdata = None
 
-        required_bytes = 0
-        for column in data:
-            if column.is_virtual is True:
-                continue
-            if column.data_type == DataType.DECIMAL:
-                required_bytes += (8 * row_count)
-            else:
-                required_bytes += (4 * row_count)
+        columns = [ column for column in data if not column.is_virtual ]
+        ncols = len(columns)
+
+        # the string table (strings.bin) is built first, so the offsets
+        # into it are known when the ID columns are written to data.bin
+
+        string_table = [ ]
+        string_offsets = { }
+        cursor = 0
 
         if string_table_required:
-            cursor = 0
-            string_file = NamedTemporaryFile(delete=False)
+            for column in columns:
+                if column.data_type == DataType.TEXT and column.measure_type == MeasureType.ID:
+                    offsets, strings = _build_strings(column, row_count, cursor)
+                    string_offsets[column.id] = offsets
+                    string_table.append(strings)
+                    cursor += len(strings)
 
-        temp_file = NamedTemporaryFile(delete=False)
-        temp_file.truncate(required_bytes)
+            with zip.open('strings.bin', 'w', force_zip64=(cursor >= zipfile.ZIP64_LIMIT)) as file:
+                for strings in string_table:
+                    file.write(strings)
 
-        for col_no in range(data.column_count):
-            column = data[col_no]
-            if column.is_virtual is True:
-                continue
+            string_table = None
+
+        required_bytes = 0
+        for column in columns:
             if column.data_type == DataType.DECIMAL:
-                for i in range(0, row_count):
-                    value = column.raw(i)
-                    byts = struct.pack('<d', value)
-                    temp_file.write(byts)
-                    if i % 100000 == 0:
-                        prog_cb((col_no + i / row_count) / data.column_count)
-            elif column.data_type == DataType.TEXT and column.measure_type == MeasureType.ID:
-                for i in range(0, row_count):
-                    value = column[i]
-                    if value != '':
-                        byts = value.encode('utf-8')
-                        string_file.write(byts)
-                        string_file.write(bytes(1))
-                        n = len(byts) + 1
-                        byts = struct.pack('<i', cursor)
-                        temp_file.write(byts)
-                        cursor += n
-                    else:
-                        byts = struct.pack('<i', -2147483648)
-                        temp_file.write(byts)
-                    if i % 100000 == 0:
-                        prog_cb((col_no + i / row_count) / data.column_count)
+                required_bytes += (8 * row_count)
             else:
-                for i in range(0, row_count):
-                    value = column.raw(i)
-                    byts = struct.pack('<i', value)
-                    temp_file.write(byts)
-                    if i % 100000 == 0:
-                        prog_cb((col_no + i / row_count) / data.column_count)
+                required_bytes += (4 * row_count)
 
-        temp_file.close()
-        zip.write(temp_file.name, 'data.bin')
-        os.remove(temp_file.name)
+        with zip.open('data.bin', 'w', force_zip64=(required_bytes >= zipfile.ZIP64_LIMIT)) as file:
+            for col_no, column in enumerate(columns):
+                if column.data_type == DataType.DECIMAL:
+                    dtype = '<f8'
+                    values = None
+                elif column.data_type == DataType.TEXT and column.measure_type == MeasureType.ID:
+                    dtype = '<i4'
+                    values = string_offsets.pop(column.id)
+                else:
+                    dtype = '<i4'
+                    values = None
 
-        if string_table_required:
-            string_file.close()
-            zip.write(string_file.name, 'strings.bin')
-            os.remove(string_file.name)
+                for row_offset in range(0, row_count, WRITE_CHUNK_ROWS):
+                    n = min(WRITE_CHUNK_ROWS, row_count - row_offset)
+                    if values is None:
+                        chunk = column.get_raw_values(row_offset, n)
+                    else:
+                        chunk = values[row_offset:row_offset + n]
+                    chunk = chunk.astype(dtype, copy=False)
+                    file.write(chunk.data.cast('B'))
+                    prog_cb((col_no + row_offset / row_count) / ncols)
 
         resources = [ ]
 
@@ -237,19 +236,102 @@ def write(data: InstanceModel, path, prog_cb, html=None, is_template=False):
         #         pass
 
 
-_buffer = bytearray(512)
+@contextmanager
+def _map_entry(zip, name, dir):
+    # maps an archive entry into memory. entries stored uncompressed are
+    # mapped in place, otherwise they're extracted to dir first
 
+    info = zip.getinfo(name)
+
+    if info.compress_type == zipfile.ZIP_STORED and zip.filename is not None:
+        path = zip.filename
+        with open(path, 'rb') as file:
+            file.seek(info.header_offset)
+            header = file.read(30)
+        name_len, extra_len = struct.unpack('<HH', header[26:30])
+        start = info.header_offset + 30 + name_len + extra_len
+    else:
+        path = zip.extract(info, dir)
+        start = 0
+
+    if info.file_size == 0:
+        yield memoryview(b'')
+        return
+
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    buff = memoryview(mapped)[start:start + info.file_size]
+    try:
+        yield buff
+    finally:
+        try:
+            buff.release()
+            mapped.close()
+        except BufferError:
+            pass  # still referenced from a traceback, unmapped once collected
+
+
+def _read_string_table(table):
+    # decodes the whole string table, returns a dict of the strings keyed
+    # by their position in the table
+    strings = { }
+    pos = 0
+    for byts in table.split(b'\x00'):
+        strings[pos] = byts.decode('utf-8', errors='ignore')
+        pos += len(byts) + 1
+    return strings
+
+
+def _read_column(column, buff, offset, row_count, strings, repair_levels):
+    # copies a column's values out of data.bin in one go, returns the
+    # offset of the following column
+
+    if column.data_type == DataType.DECIMAL:
+        dtype, elem_width = '<f8', 8
+    else:
+        dtype, elem_width = '<i4', 4
 
-def _read_string_from_table(stream, pos):
-    final_pos = stream.seek(pos)
-    if pos != final_pos:
-        return ''
-    stream.readinto(_buffer)
     try:
-        end = _buffer.index(bytes(1))  # find string terminator
-        return _buffer[0:end].decode('utf-8', errors='ignore')
-    except ValueError:
-        return _buffer.decode('utf-8', errors='ignore')
+        values = np.frombuffer(buff, dtype=dtype, count=row_count, offset=offset)
+    except ValueError as e:
+        raise FileCorruptError(_('File is corrupt (data is truncated)')) from e
+
+    if column.data_type == DataType.TEXT and column.measure_type == MeasureType.ID:
+        values = values.tolist()
+        if strings is not None:
+            values = [ strings.get(v, '') for v in values ]
+        else:
+            values = [ str(v) if v != -2147483648 else '' for v in values ]
+        column.set_values(0, values)
+    else:
+        if repair_levels:
+            present = values[values != -2147483648]
+            present, first = np.unique(present, return_index=True)
+            for v in present[np.argsort(first)].tolist():
+                column.append_level(v, str(v))
+        column.set_values(0, values)
+
+    return offset + elem_width * row_count
+
+
+def _build_strings(column, row_count, cursor):
+    # returns the offsets of an ID column's values in the string table,
+    # and the null terminated strings to append to it. the table is
+    # currently cursor bytes long
+
+    values = [ value.encode('utf-8') for value in column.get_values(0, row_count) ]
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=row_count)
+    present = lengths > 0
+    ends = cursor + np.cumsum(np.where(present, lengths + 1, 0))
+    if row_count > 0 and ends[-1] > 2147483647:
+        raise ValueError('String table too large')
+    offsets = np.where(present, ends - lengths - 1, -2147483648).astype('<i4')
+
+    values = [ value for value in values if value ]
+    if values:
+        values.append(b'')
+    return offsets, b'\x00'.join(values)
 
 
 def replace_single_equals(formula):
@@ -459,87 +541,21 @@ def read(data, path, prog_cb, **kwargs):
         prog_cb(0.03)
 
         with TemporaryDirectory() as dir:
-            zip.extract('data.bin', dir)
-            data_path = os.path.join(dir, 'data.bin')
-            data_file = open(data_path, 'rb')
 
             try:
-                zip.extract('strings.bin', dir)
-                string_table_present = True
-                string_table_path = os.path.join(dir, 'strings.bin')
-                string_table = open(string_table_path, 'rb')
-            except Exception:
-                string_table_present = False
+                strings = _read_string_table(zip.read('strings.bin'))
+            except KeyError:
+                strings = None
 
-            BUFF_SIZE = 65536
-            buff = memoryview(bytearray(BUFF_SIZE))
+            with _map_entry(zip, 'data.bin', dir) as buff:
 
-            ncols = data.dataset.column_count
-            col_no = 0
+                ncols = data.dataset.column_count
+                offset = 0
 
-            for column in data.dataset:
-
-                if column.data_type == DataType.DECIMAL:
-                    elem_fmt = '<d'
-                    elem_width = 8
-                    repair_levels = False
-                    transform = None
-                elif column.data_type == DataType.TEXT and column.measure_type == MeasureType.ID:
-                    elem_fmt = '<i'
-                    elem_width = 4
-                    repair_levels = False
-                    if string_table_present:
-                        def transform(x):
-                            if x == -2147483648:
-                                return ''
-                            else:
-                                return _read_string_from_table(string_table, x)
-                    else:
-                        def transform(x):
-                            if x == -2147483648:
-                                return ''
-                            else:
-                                return str(x)
-                else:
-                    elem_fmt = '<i'
-                    elem_width = 4
+                for col_no, column in enumerate(data.dataset):
                     repair_levels = column.id in columns_w_bad_levels
-                    transform = None
-
-                for row_offset in range(0, row_count, int(BUFF_SIZE / elem_width)):
-                    n_bytes_to_read = min(elem_width * (row_count - row_offset), BUFF_SIZE)
-                    buff_view = buff[0:n_bytes_to_read]
-                    data_file.readinto(buff_view)
-
-                    # 'if' surrounding loops, rather than an 'if' inside one loop
-                    # gives a performance improvement (i expect)
-                    if repair_levels:
-                        i = 0
-                        for values in struct.iter_unpack(elem_fmt, buff_view):
-                            v = values[0]
-                            if v != -2147483648:  # missing value
-                                column.append_level(v, str(v))
-                            column.set_value(row_offset + i, v)
-                            i += 1
-                    elif transform:
-                        i = 0
-                        for values in struct.iter_unpack(elem_fmt, buff_view):
-                            value = transform(values[0])
-                            column.set_value(row_offset + i, value)
-                            i += 1
-                    else:
-                        i = 0
-                        for values in struct.iter_unpack(elem_fmt, buff_view):
-                            column.set_value(row_offset + i, values[0])
-                            i += 1
-
-                    prog_cb(0.1 + 0.85 * (col_no + row_offset / row_count) / ncols)
-
-                col_no += 1
-
-            data_file.close()
-            if string_table_present:
-                string_table.close()
+                    offset = _read_column(column, buff, offset, row_count, strings, repair_levels)
+                    prog_cb(0.1 + 0.85 * (col_no + 1) / ncols)
 
         for column in data:
             column.determine_dps()
@@ -6,6 +6,10 @@ from jamovi.core import MeasureType
 
 import re
 import math
+import random
+from itertools import islice
+
+import numpy as np
 
 
 def calc_dps(value, max_dp=3):
@@ -28,6 +32,17 @@ def calc_dps(value, max_dp=3):
     return max_dp_required
 
 
+# rows are added to the data set this many at a time, when the row count
+# isn't known in advance
+ROW_ALLOCATION = 1000
+
+# the number of consecutive rows in each of the random blocks of a sample
+SAMPLE_BLOCK_SIZE = 100
+
+# rows are written to the data set this many at a time
+WRITE_BLOCK_SIZE = 10000
+
+
 class Reader:
 
     def __init__(self, settings):
@@ -49,8 +64,22 @@ class Reader:
     def __iter__(self):
         raise NotImplementedError
 
+    def row_count(self):
+        # the number of rows (including the header), for readers which can
+        # read blocks of rows out of order with read_block()
+        return None
+
+    def read_block(self, start, count):
+        # returns count rows, starting at row start (the header is row 0)
+        raise NotImplementedError
+
     def read_into(self, data, path, prog_cb):
 
+        sample_size = self._settings.get('importSampleSize', 0)
+        if sample_size > 0:
+            self._read_sampled(data, path, prog_cb, sample_size)
+            return
+
         self.open(path)
 
         column_names = next(iter(self))
@@ -103,6 +132,7 @@ class Reader:
         first = True
 
         row_no = 0
+        block = [ ]
 
         for row in self:
             if first:
@@ -110,15 +140,149 @@ class Reader:
             else:
                 if row_no >= row_count:
                     break
-                for i in range(column_count):
-                    column_readers[i].parse_row(row, row_no)
+                block.append(row)
                 row_no += 1
+                if len(block) == WRITE_BLOCK_SIZE:
+                    self._write_rows(data, column_readers, row_no - len(block), block)
+                    block.clear()
 
             if row_no % 1000 == 0:
                 prog_cb(.33333 + .66666 * self.progress() / self._total)
 
+        self._write_rows(data, column_readers, row_no - len(block), block)
+
+        self.close()
+
+    def _read_sampled(self, data, path, prog_cb, sample_size):
+
+        # infers the column types from a sample of the rows, then reads the
+        # rows in a single pass. columns with values which contradict what
+        # was inferred are ruminated again once all the rows have been
+        # examined, and read again
+
+        self.open(path)
+
+        column_names = next(iter(self))
+
+        column_readers = [ ]
+
+        if len(column_names) == 0:
+            column_names = ['A']
+
+        for i, column_name in enumerate(column_names):
+            if column_name is None:
+                column_name = ''
+            data.append_column(column_name)
+            column = data[i]
+            column.column_type = ColumnType.DATA
+            column_readers.append(ColumnReader(column, i, self._settings))
+
+        for row in self._sample(sample_size):
+            for column_reader in column_readers:
+                column_reader.examine_row(row)
+
+        for column_reader in column_readers:
+            column_reader.ruminate()
+
+        row_count = 0
+        empty_count = 0  # we exclude empty rows at the end of the data set
+        allocated = 0
+        row_no = 0
+
+        block = [ ]
+
+        for row in islice(self, 1, None):
+            if row_no >= allocated:
+                allocated += ROW_ALLOCATION
+                data.set_row_count(allocated)
+
+            empty_row = True
+            for column_reader in column_readers:
+                if column_reader.examine_row(row):
+                    empty_row = False
+            block.append(row)
+            row_no += 1
+
+            if len(block) == WRITE_BLOCK_SIZE:
+                fresh = [ cr for cr in column_readers if not cr.stale ]
+                self._write_rows(data, fresh, row_no - len(block), block)
+                block.clear()
+
+            if empty_row:
+                empty_count += 1
+            else:
+                row_count += empty_count + 1
+                empty_count = 0
+
+            if row_no % 1000 == 0:
+                prog_cb(0.9 * self.progress() / self._total)
+
+        fresh = [ cr for cr in column_readers if not cr.stale ]
+        self._write_rows(data, fresh, row_no - len(block), block)
+        block.clear()
+
+        data.set_row_count(row_count)
+
+        for column_reader in column_readers:
+            column_reader.update_dps()
+
+        stale = list(filter(lambda column_reader: column_reader.stale, column_readers))
+
+        if stale:
+            for column_reader in stale:
+                column_reader.ruminate()
+
+            row_no = 0
+            for row in islice(self, 1, row_count + 1):
+                block.append(row)
+                row_no += 1
+                if len(block) == WRITE_BLOCK_SIZE:
+                    self._write_rows(data, stale, row_no - len(block), block)
+                    block.clear()
+
+                if row_no % 1000 == 0:
+                    prog_cb(0.9 + 0.1 * self.progress() / self._total)
+
+            self._write_rows(data, stale, row_no - len(block), block)
+
         self.close()
 
+    def _write_rows(self, data, column_readers, row_offset, rows):
+        # writes the values of the rows, for each of the column readers
+        values = [ column_reader.extract(rows) for column_reader in column_readers ]
+        self._write_values(data, column_readers, row_offset, values)
+
+    def _write_values(self, data, column_readers, row_offset, values):
+        # writes a block of (examined) values, a list for each of the column
+        # readers, into the data set in one go
+        if len(column_readers) == 0 or len(values[0]) == 0:
+            return
+        data.set_values(
+            [ column_reader.column.index for column_reader in column_readers ],
+            row_offset,
+            [ column_reader.convert(v) for column_reader, v in zip(column_readers, values) ])
+
+    def _sample(self, sample_size):
+        # the rows from which the column types are inferred; the first rows,
+        # and (for readers which support it) blocks of rows from random
+        # positions throughout the rest
+
+        n_rows = self.row_count()
+
+        if n_rows is None or n_rows - 1 <= sample_size:
+            yield from islice(self, 1, sample_size + 1)
+            return
+
+        head = sample_size // 2
+        yield from islice(self, 1, head + 1)
+
+        n_blocks = max(1, (sample_size - head) // SAMPLE_BLOCK_SIZE)
+        starts = range(head + 1, max(head + 2, n_rows - SAMPLE_BLOCK_SIZE + 1))
+        starts = random.sample(starts, min(n_blocks, len(starts)))
+
+        for start in sorted(starts):
+            yield from self.read_block(start, min(SAMPLE_BLOCK_SIZE, n_rows - start))
+
 
 euro_float_pattern = re.compile(r'^(-)?([0-9]*),([0-9]+)$')
 EURO_FLOAT_REPL = r'\1\2.\3'
@@ -153,26 +317,47 @@ class ColumnReader:
         self._measure_type = None
         self._data_type = None
         self._ruminated = False
+        self._decision = None
+        self._stale = False
+        self._level_indices = None
         self._dps = 0
 
+    @property
+    def data_type(self):
+        return self._data_type
+
+    @property
+    def column(self):
+        return self._column
+
+    @property
+    def stale(self):
+        # whether values have been examined since ruminating which would
+        # change what the column is (or its levels)
+        return self._stale
+
     def examine_row(self, row) -> bool:
 
         if self._column_index >= len(row):
             return False
 
-        value = row[self._column_index]
+        return self.examine_value(row[self._column_index])
+
+    def examine_value(self, value) -> bool:
 
         if value in (None, self._missings, '', ' '):
             return False
 
         self._is_empty = False
 
+        if value in self._unique_values:
+            return True  # already examined
+
         if not self._many_uniques:
-            if value not in self._unique_values:
-                self._unique_values.add(value)
-                self._n_uniques += 1
-                if self._n_uniques > 49:
-                    self._many_uniques = True
+            self._unique_values.add(value)
+            self._n_uniques += 1
+            if self._n_uniques > 49:
+                self._many_uniques = True
 
         try:
             i = int(value)
@@ -197,33 +382,151 @@ class ColumnReader:
                 else:
                     self._only_euro_floats = False
 
+        if self._ruminated and not self._stale:
+            self._stale = self._decide() != self._decision
+
         return True
 
-    def ruminate(self):
+    def merge(self, other):
+        # combines what another reader has examined (of other rows of the
+        # same column) with what this one has
+
+        self._only_integers = self._only_integers and other._only_integers
+        self._only_floats = self._only_floats and other._only_floats
+        self._only_euro_floats = self._only_euro_floats and other._only_euro_floats
+        self._is_empty = self._is_empty and other._is_empty
+        self._dps = max(self._dps, other._dps)
+
+        if not self._many_uniques:
+            if other._many_uniques:
+                self._many_uniques = True
+            else:
+                self._unique_values |= other._unique_values
+                self._n_uniques = len(self._unique_values)
+                if self._n_uniques > 49:
+                    self._many_uniques = True
+
+    def values_as_array(self, values):
+        # converts the (examined) values to an array of what they have been
+        # found to be so far; int32s or float64s. missing values should be
+        # None. returns None if the values are text
+
+        n = len(values)
+
+        if self._only_integers:
+            return np.fromiter(
+                (-2147483648 if v is None else int(v) for v in values),
+                dtype=np.int32,
+                count=n)
+        elif self._only_floats:
+            return np.fromiter(
+                (math.nan if v is None else float(v) for v in values),
+                dtype=np.float64,
+                count=n)
+        elif self._only_euro_floats:
+            return np.fromiter(
+                (math.nan if v is None else self._parse_euro_float(v) for v in values),
+                dtype=np.float64,
+                count=n)
+        else:
+            return None
+
+    def extract(self, rows):
+        # the column's values from the rows, with missing values as None
+        index = self._column_index
+        missings = (self._missings, '', ' ')
+        return [
+            None if index >= len(row) or row[index] in missings else row[index]
+            for row in rows ]
+
+    def convert(self, values):
+        # converts values to what is written into the column once ruminated;
+        # raw values (level values for text columns), or text for ID
+        # columns. values is either an array from values_as_array(), or a
+        # list of the (examined) values, with missing values as None
+
+        if self._ruminated is False:
+            self.ruminate()
+
+        if self._data_type == DataType.INTEGER:
+            if isinstance(values, list):
+                values = self.values_as_array(values)
+            return values
+
+        elif self._data_type == DataType.DECIMAL:
+            if isinstance(values, list):
+                values = self.values_as_array(values)
+            if values.dtype == np.int32:
+                missing = values == -2147483648
+                values = values.astype(np.float64)
+                values[missing] = math.nan
+            return values
+
+        elif self._measure_type != MeasureType.ID:
+            indices = self._level_indices
+            return np.fromiter(
+                (-2147483648 if v is None else indices[v] for v in values),
+                dtype=np.int32,
+                count=len(values))
+
+        else:
+            return [ '' if v is None else str(v) for v in values ]
+
+    def update_dps(self):
+        self._column.dps = self._dps
+
+    def _decide(self):
+        # what ruminate() would make of the column; its data type and
+        # measure type, and the number of levels for nominal columns
 
         if self._only_integers:
             if self._many_uniques is False:
-                self._data_type = DataType.INTEGER
-                self._measure_type = MeasureType.NOMINAL
+                return (DataType.INTEGER, MeasureType.NOMINAL, self._n_uniques)
+            else:
+                return (DataType.INTEGER, MeasureType.CONTINUOUS, 0)
+        elif self._only_floats or self._only_euro_floats:
+            return (DataType.DECIMAL, MeasureType.CONTINUOUS, 0)
+        else:
+            if self._many_uniques is False:
+                return (DataType.TEXT, MeasureType.NOMINAL, self._n_uniques)
+            else:
+                return (DataType.TEXT, MeasureType.ID, 0)
+
+    def _reset_column(self):
+        # returns a ruminated column to having no levels, and its values
+        # all missing, so it can be ruminated again
+        self._column.change(
+            data_type=DataType.INTEGER,
+            measure_type=MeasureType.CONTINUOUS)
+        self._column.clear_levels()
+        missing = np.full(self._column.row_count, -2147483648, dtype=np.int32)
+        self._column.set_values(0, missing)
+
+    def ruminate(self):
+
+        if self._ruminated:
+            self._reset_column()
+
+        self._decision = self._decide()
+        self._data_type, self._measure_type, _ = self._decision
+        self._stale = False
+
+        if self._data_type == DataType.INTEGER:
+            if self._measure_type == MeasureType.NOMINAL:
                 self._column.change(
                     data_type=DataType.INTEGER,
                     measure_type=MeasureType.NOMINAL)
 
-                self._unique_values = list(self._unique_values)
-                self._unique_values = list(map(int, self._unique_values))
-                self._unique_values.sort()
-                for level in self._unique_values:
+                levels = list(map(int, self._unique_values))
+                levels.sort()
+                for level in levels:
                     self._column.append_level(level, str(level))
             else:
-                self._data_type = DataType.INTEGER
-                self._measure_type = MeasureType.CONTINUOUS
                 self._column.change(
                     data_type=DataType.INTEGER,
                     measure_type=MeasureType.CONTINUOUS)
 
-        elif self._only_floats or self._only_euro_floats:
-            self._data_type = DataType.DECIMAL
-            self._measure_type = MeasureType.CONTINUOUS
+        elif self._data_type == DataType.DECIMAL:
             self._column.change(
                 data_type=DataType.DECIMAL,
                 measure_type=MeasureType.CONTINUOUS)
@@ -232,71 +535,21 @@ class ColumnReader:
                 self._only_euro_floats = False
 
         else:
-            if self._many_uniques is False:
-                self._data_type = DataType.TEXT
-                self._measure_type = MeasureType.NOMINAL
+            if self._measure_type == MeasureType.NOMINAL:
                 self._column.change(
                     data_type=DataType.TEXT,
                     measure_type=MeasureType.NOMINAL)
 
-                self._unique_values = list(self._unique_values)
-                self._unique_values.sort()
-                for i, label in enumerate(self._unique_values):
+                levels = list(self._unique_values)
+                levels.sort()
+                self._level_indices = { }
+                for i, label in enumerate(levels):
                     self._column.append_level(i, label)
+                    self._level_indices[label] = i
             else:
-                self._data_type = DataType.TEXT
-                self._measure_type = MeasureType.ID
                 self._column.change(
                     data_type=DataType.TEXT,
                     measure_type=MeasureType.ID)
 
         self._column.dps = self._dps
         self._ruminated = True
-
-    def parse_row(self, row, row_no):
-
-        if self._ruminated is False:
-            self.ruminate()
-
-        if self._column_index >= len(row):
-            value = None
-        else:
-            value = row[self._column_index]
-
-            if value in (self._missings, '', ' '):
-                value = None
-
-        if self._data_type == DataType.INTEGER:
-            if value is None:
-                self._column.clear_at(row_no)
-            else:
-                self._column.set_value(row_no, int(value))
-
-        elif self._data_type == DataType.DECIMAL:
-
-            if value is None:
-                self._column.set_value(row_no, float('nan'))
-            else:
-                if self._only_euro_floats:
-                    value = re.sub(
-                        euro_float_pattern,
-                        EURO_FLOAT_REPL,
-                        value)
-                self._column.set_value(row_no, float(value))
-
-        elif self._data_type == DataType.TEXT:
-
-            if self._measure_type != MeasureType.ID:
-                if value is None:
-                    self._column.set_value(row_no, -2147483648)
-                else:
-                    index = self._unique_values.index(value)
-                    self._column.set_value(row_no, index)
-            elif self._measure_type is MeasureType.ID:
-                if value is None:
-                    self._column.set_value(row_no, '')
-                else:
-                    self._column.set_value(row_no, str(value))
-
-        else:
-            self._column.clear_at(row_no)
@@ -0,0 +1,101 @@
+
+from asyncio import get_running_loop
+from ipaddress import ip_address
+
+from aiohttp import ClientSession
+from aiohttp import TCPConnector
+from aiohttp import DummyCookieJar
+
+from .utils import ssl_context
+from .utils import conf
+
+
+# one pool of connections for the process, so connections (and their dns
+# lookups and tls handshakes) are reused across instances, sessions and
+# downloads. by default there's no limit on the connections to each host
+# (as with the client each instance used to have), so users opening files
+# from the same host don't queue behind each other
+
+DNS_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+
+class BlockLocalConnector(TCPConnector):
+    # block connections to the local network (security!)
+    async def _resolve_host(self, host: str, port: int, traces=None):
+        resolved_list = await super()._resolve_host(host, port, traces)
+        for resolved in resolved_list:
+            if not ip_address(resolved['host']).is_global:
+                raise PermissionError
+        return resolved_list
+
+
+_connectors: dict = { }
+_client = None
+
+
+def get_connector(*, block_local: bool = False) -> TCPConnector:
+
+    loop = get_running_loop()
+    entry = _connectors.get(block_local)
+    if entry is not None:
+        connector_loop, connector = entry
+        if connector_loop is loop and not connector.closed:
+            return connector
+
+    Connector = BlockLocalConnector if block_local else TCPConnector
+    connector = Connector(
+        ssl=ssl_context(),
+        limit=int(conf.get('http_connection_limit', '256')),
+        limit_per_host=int(conf.get('http_connection_limit_per_host', '0')),
+        ttl_dns_cache=DNS_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT)
+    _connectors[block_local] = (loop, connector)
+    return connector
+
+
+def create_client(*, block_local: bool = False) -> ClientSession:
+
+    # a client of its own (with its own cookies) over the shared
+    # connections. clients which block the local network (for fetching
+    # the files users ask for) raise for error statuses, the others leave
+    # that to the caller. closing it leaves the connections open
+
+    return ClientSession(
+        connector=get_connector(block_local=block_local),
+        connector_owner=False,
+        raise_for_status=block_local)
+
+
+def get_client() -> ClientSession:
+
+    # the shared client, for downloads. it's used by every session, so
+    # mustn't keep cookies; one user's cookies would be sent with
+    # another's requests
+
+    global _client
+
+    loop = get_running_loop()
+    if _client is not None:
+        client_loop, client = _client
+        if client_loop is loop and not client.closed:
+            return client
+
+    client = ClientSession(
+        connector=get_connector(),
+        connector_owner=False,
+        cookie_jar=DummyCookieJar())
+    _client = (loop, client)
+    return client
+
+
+async def close():
+    global _client
+    if _client is not None:
+        _, client = _client
+        _client = None
+        await client.close()
+    connectors = [ connector for _, connector in _connectors.values() ]
+    _connectors.clear()
+    for connector in connectors:
+        await connector.close()
@@ -14,12 +14,13 @@ from .utils import conf
 from .utils import FileEntry
 from .utils import CSVParser
 from .utils import HTMLParser
-from .utils import ssl_context
 from .utils.stream import ProgressStream
 from .instancemodel import InstanceModel
 from . import formatio
 from .modtracker import ModTracker
 from .permissions import Permissions
+from .resultsdelta import make_delta
+from . import httpclient
 
 from .exceptions import FileExistsException
 from .exceptions import UserException
@@ -34,17 +35,15 @@ import platform
 import re
 import posixpath
 import math
+import json
 import logging
 import asyncio
 import functools
+import numpy as np
 from time import monotonic
 from itertools import islice
 from urllib import parse
 
-from aiohttp import ClientSession
-from aiohttp import TCPConnector
-from ipaddress import ip_address
-
 from asyncio import ensure_future as create_task
 from asyncio import wait
 
@@ -82,8 +81,6 @@ ConnectionStatus = namedtuple('ConnectionStatus',
 
 class Instance:
 
-    _file_sync_client: ClientSession
-
     def __init__(self, session, instance_path, instance_id, settings):
 
         self._session = session
@@ -101,6 +98,11 @@ class Instance:
         self._data = InstanceModel(self)
         self._coms = None
         self._perms = Permissions.retrieve()
+
+        # the results last sent to the client for each analysis, which
+        # later results are sent as a delta of
+        self._results_sent = { }
+        self._results_sequence = 0
         self._mod_tracker = ModTracker(self._data)
 
         now = monotonic()
@@ -234,7 +236,13 @@ class Instance:
     def instance_path(self):
         return self._instance_path
 
+    @property
+    def buffer_path(self):
+        return self._buffer_path
+
     def set_coms(self, coms):
+        if coms is not self._coms:
+            self._results_sent.clear()  # a new connection needs full results
         if self._coms is not None:
             self._coms.remove_close_listener(self._close)
         self._coms = coms
@@ -246,6 +254,8 @@ class Instance:
         self._session.modules.remove_listener(self._module_event)
         if self._mm is not None:
             self._mm.close()
+        if self._file_sync_client is not None:
+            create_task(self._file_sync_client.close())
 
     def _close(self, clean=True):
         self._coms.remove_close_listener(self._close)
@@ -297,21 +307,52 @@ class Instance:
             self._on_settings(request)
         elif type(request) == jcoms.AnalysisRequest:
             await self._on_analysis(request)
+        elif type(request) == jcoms.AnalysisViewRequest:
+            self._on_analysis_view(request)
+        elif type(request) == jcoms.ResultsResyncRequest:
+            self._on_results_resync(request)
         elif type(request) == jcoms.FSRequest:
             self._on_fs_request(request)
         elif type(request) == jcoms.ModuleRR:
             await self._on_module(request)
         elif type(request) == jcoms.StoreRequest:
             await self._on_store(request)
+        elif type(request) == jcoms.MetricsRR:
+            self._on_metrics(request)
         else:
             log.info('unrecognised request')
             log.info(request.payloadType)
 
     def _on_results(self, analysis):
-        if self._coms is not None:
-            self._coms.send(analysis.results, self._instance_id, complete=analysis.complete)
+        if self._coms is None:
+            return
+
+        self._results_sequence += 1
+
+        results = jcoms.AnalysisResponse()
+        results.CopyFrom(analysis.results)
+        results.sequence = self._results_sequence
+
+        base = self._results_sent.get(analysis.id)
+        self._results_sent[analysis.id] = results
+
+        if base is not None:
+            results = make_delta(base, results)
+            results.deltaBase = base.sequence
+
+        self._coms.send(results, self._instance_id, complete=analysis.complete)
 
     def _on_output_received(self, analysis, outputs):
+        create_task(self._write_outputs(analysis, outputs))
+
+    async def _write_outputs(self, analysis, outputs):
+        # written with the data set locked like any other edit, so it isn't
+        # copied part written. it's only a new version of the data set if
+        # the outputs change it though
+        async with self._data.attach(new_snapshot=False):
+            self._apply_outputs(analysis, outputs)
+
+    def _apply_outputs(self, analysis, outputs):
 
         def gen_output_column_name(desired_name):
             name = desired_name
@@ -330,6 +371,7 @@ class Instance:
 
         changed = set()
         renamed = dict()
+        added = False
         rows_added_removed = False
 
         try:
@@ -370,6 +412,7 @@ class Instance:
                         name = gen_output_column_name(desired_name)
 
                         column = self._data.insert_column(self._data.column_count, name)
+                        added = True
                         column.column_type = ColumnType.OUTPUT
                         column.description = output.description
                         column.output_analysis_id = analysis_id
@@ -406,14 +449,14 @@ class Instance:
                         column.clear()
                         column.change(measure_type=output.measure_type)
                         changed.add(column.name)
-                    elif isinstance(output.values[0], int):
+                    elif output.values.dtype == np.int32:
                         column.clear()
                         column.change(data_type=DataType.INTEGER, measure_type=output.measure_type)
                         if output.measure_type is not MeasureType.CONTINUOUS:
                             for level in output.levels:
                                 column.append_level(level.value, level.label)
                         changed.add(column.name)
-                    elif isinstance(output.values[0], float):
+                    elif output.values.dtype == np.float64:
                         if column.data_type is not DataType.DECIMAL or column.measure_type is not MeasureType.CONTINUOUS:
                             column.change(data_type=DataType.DECIMAL, measure_type=MeasureType.CONTINUOUS)
                             changed.add(column.name)
@@ -421,20 +464,22 @@ class Instance:
                         # shouldn't get here
                         continue
 
-                    if output.values:
-                        index = 0
+                    if output.values is not None and len(output.values) > 0:
                         n_values = len(output.values)
                         if n_values > self._data.row_count:
                             self._data.set_row_count(n_values)
                             self._data.refresh_filter_state()
                             rows_added_removed = True
-                        for row_no in range(column.row_count):
-                            if index < n_values:
-                                value = output.values[index]
-                                column.set_value(row_no, value)
-                                index += 1
-                            else:
-                                column.clear_at(row_no)
+
+                        # written in one go, with the rows beyond the
+                        # values cleared
+                        values = np.empty(column.row_count, dtype=output.values.dtype)
+                        values[:n_values] = output.values
+                        if column.data_type == DataType.DECIMAL:
+                            values[n_values:] = np.nan
+                        else:
+                            values[n_values:] = -2147483648
+                        column.set_raw_values(0, values)
 
                         if column.data_type == DataType.DECIMAL:
                             column.determine_dps()
@@ -466,6 +511,11 @@ class Instance:
                     column_pb.id = column.id
                     column_pb.action = jcoms.DataSetSchema.ColumnSchema.Action.Value('REMOVE')
 
+            # outputs which leave the data set as it was (most of them,
+            # while an analysis is running) don't need it copied again
+            if changed or renamed or added:
+                self._data.next_snapshot()
+
             if self._coms is not None and response is not None:
                 self._populate_schema_info(None, response)
                 self._coms.send(response, self._instance_id)
@@ -473,6 +523,8 @@ class Instance:
             self._update_analyses(changed=changed, renamed=renamed, rows_added_removed=rows_added_removed)
 
         except Exception as e:
+            # part written, perhaps
+            self._data.next_snapshot()
             log.exception(e)
 
     def _on_weights_changed(self, event):
@@ -676,22 +728,10 @@ class Instance:
 
     @property
     def file_sync_client(self):
-
-        class BlockLocalConnector(TCPConnector):
-            # block connections to the local network (security!)
-            async def _resolve_host(self, host: str, port: int, traces=None):
-                resolved_list = await super()._resolve_host(host, port, traces)
-                for resolved in resolved_list:
-                    if not ip_address(resolved['host']).is_global:
-                        raise PermissionError
-                return resolved_list
-
-        if self._file_sync_client is None:
-            self._file_sync_client = ClientSession(
-                raise_for_status=True,
-                connector=BlockLocalConnector(ssl=ssl_context()),
-            )
-
+        # a client of the instance's own, so the cookies a file's host
+        # sets (on redirects, say) are sent with its later requests
+        if self._file_sync_client is None or self._file_sync_client.closed:
+            self._file_sync_client = httpclient.create_client(block_local=True)
         return self._file_sync_client
 
 
@@ -898,6 +938,10 @@ class Instance:
 
         save_task.result()  # throw if necessary
 
+        # the data set's changes are written to its file along with the save
+        if self._mm is not None:
+            await ioloop.run_in_executor(None, self._mm.checkpoint)
+
 
     async def _on_save_part(self, path, part):
 
@@ -1216,6 +1260,25 @@ class Instance:
                 if analysis.enabled:
                     analysis.run()
 
+    def _on_analysis_view(self, request):
+        self.session.prioritise_analyses(
+            self._instance_id,
+            visible=request.visible,
+            editing=request.editing)
+
+    def _on_results_resync(self, request):
+        # the client's results are out of step, so it needs them in full
+        for analysis_id in request.analysisIds:
+            self._results_sent.pop(analysis_id, None)
+            analysis = self._data.analyses.get(analysis_id)
+            if analysis is not None and analysis.results is not None:
+                self._on_results(analysis)
+
+    def _on_metrics(self, request):
+        response = jcoms.MetricsRR()
+        response.content = json.dumps(self.session.profile())
+        self._coms.send(response, self._instance_id, request)
+
     async def _on_analysis(self, request):
 
         if request.restartEngines:
@@ -1296,6 +1359,8 @@ class Instance:
                     analysis_to_delete.reset_options(request.revision)
                     self._coms.send(analysis_to_delete.results, self._instance_id, request, True)
             else:
+                # the analysis being changed goes before any others
+                self.session.prioritise_analyses(self._instance_id, editing=analysis.id)
                 analysis.set_options(request.options, request.changed, request.revision, request.enabled)
                 self._coms.send(None, self._instance_id, request, True)
         else:  # create analysis
@@ -1,7 +1,10 @@
 
 from __future__ import annotations
 
+import os
+import os.path
 import asyncio
+import logging
 from collections import deque
 import typing
 from contextlib import asynccontextmanager
@@ -20,6 +23,7 @@ from .column import Column
 from .analyses import Analyses
 from .utils import NullLog
 from .permissions import Permissions
+from . import snapshots
 
 from .i18n import _
 
@@ -28,6 +32,12 @@ if typing.TYPE_CHECKING:
     from .syncs import HttpSync
 
 
+log = logging.getLogger(__name__)
+
+# the number of rows copied at a time when importing
+IMPORT_BLOCK_SIZE = 10000
+
+
 class _RWLock:
 
     def __init__(self):
@@ -57,6 +67,10 @@ class _RWLock:
             self._write_locked = False
             self._condition.notify_all()
 
+    @property
+    def write_locked(self):
+        return self._write_locked
+
 
 class InstanceModel:
 
@@ -106,10 +120,21 @@ class InstanceModel:
         self._row_tracker = RowTracker()
         self._rwlock = _RWLock()
 
+        # frozen copies of the data set, which the engines read so it can
+        # carry on being edited while analyses run. each version of the
+        # data set is copied at most once, and shared by the requests
+        # reading it
+        self._snapshot_id = 1
+        self._snapshot_refs = { }
+        self._snapshots_stale = set()
+        self._snapshots_pending = { }
+        self._snapshots_copying = { }
+        self._snapshots_bad = set()
+
         self.file_sync = None
 
     @asynccontextmanager
-    async def attach(self, read_only: bool = False):
+    async def attach(self, read_only: bool = False, new_snapshot: bool = True):
         if read_only:
             await self._rwlock.acquire_read()
             try:
@@ -118,11 +143,101 @@ class InstanceModel:
                 await self._rwlock.release_read()
         else:
             await self._rwlock.acquire_write()
+            if new_snapshot or self._snapshots_copying:
+                # edits don't wait for copies under way; they could catch
+                # the data set part written, so are abandoned
+                self._snapshots_bad.update(self._snapshots_copying)
+                self.next_snapshot()
             try:
                 yield
             finally:
+                # copies requested during the edit are made now it's done
+                for snapshot_id in list(self._snapshots_pending):
+                    self._copy_snapshot(snapshot_id)
                 await self._rwlock.release_write()
 
+    @property
+    def version(self) -> int:
+        # changes whenever the contents of the data set do
+        return self._snapshot_id
+
+    @property
+    def is_edited(self) -> bool:
+        return self._rwlock.write_locked
+
+    def next_snapshot(self):
+        # the data set is changing, so requests from now on read a new copy
+        self._snapshot_id += 1
+        self._remove_snapshots()
+
+    def acquire_snapshot(self) -> int:
+        # returns 0 if there's no copy, and the data set itself is to be read
+        if not os.path.isfile(self._instance.buffer_path):
+            return 0
+
+        snapshot_id = self._snapshot_id
+        if snapshot_id in self._snapshots_bad:
+            return 0
+
+        if snapshot_id not in self._snapshot_refs:
+            # the copy is made in the background, and the engines wait
+            # for it before reading it
+            copied = asyncio.get_event_loop().create_future()
+            snapshots.add(self._instance.id, snapshot_id, copied)
+            self._snapshots_pending[snapshot_id] = copied
+            self._snapshot_refs[snapshot_id] = 0
+            if not self._rwlock.write_locked:
+                self._copy_snapshot(snapshot_id)
+
+        self._snapshot_refs[snapshot_id] += 1
+        return snapshot_id
+
+    def _copy_snapshot(self, snapshot_id: int):
+        copied = self._snapshots_pending.pop(snapshot_id)
+        self._snapshots_copying[snapshot_id] = copied
+        path = self._snapshot_path(snapshot_id)
+        copying = snapshots.copy(self._instance.buffer_path, path)
+        copying.add_done_callback(lambda f: self._snapshot_copied(snapshot_id, f))
+
+    def _snapshot_copied(self, snapshot_id: int, f):
+        copied = self._snapshots_copying.pop(snapshot_id)
+        if f.cancelled():
+            self._snapshots_bad.add(snapshot_id)
+        elif f.exception() is not None:
+            log.exception(f.exception())
+            self._snapshots_bad.add(snapshot_id)
+        copied.set_result(snapshot_id not in self._snapshots_bad)
+        self._remove_snapshots()
+
+    def release_snapshot(self, snapshot_id: int):
+        if snapshot_id in self._snapshot_refs:
+            self._snapshot_refs[snapshot_id] -= 1
+            self._remove_snapshots()
+
+    def _snapshot_path(self, snapshot_id: int) -> str:
+        return os.path.join(self._instance.instance_path, 'snapshots', str(snapshot_id))
+
+    def _remove_snapshots(self):
+        # copies of earlier versions are removed once nothing reads them
+        for snapshot_id, refs in list(self._snapshot_refs.items()):
+            if (refs == 0
+                    and snapshot_id != self._snapshot_id
+                    and snapshot_id not in self._snapshots_pending
+                    and snapshot_id not in self._snapshots_copying):
+                del self._snapshot_refs[snapshot_id]
+                self._snapshots_bad.discard(snapshot_id)
+                self._snapshots_stale.add(snapshot_id)
+                snapshots.remove(self._instance.id, snapshot_id)
+
+        for snapshot_id in list(self._snapshots_stale):
+            try:
+                os.remove(self._snapshot_path(snapshot_id))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # still open in an engine (windows), try again later
+            self._snapshots_stale.discard(snapshot_id)
+
     @property
     def results_language(self):
         if self._results_language == '':
@@ -585,15 +700,18 @@ class InstanceModel:
                 # now copy the cell data across
                 self.set_row_count(offset + source.row_count)
 
-                for i in range(0, len(source_columns)):
-                    source_column = source_columns[i]
-                    dest_column = dest_columns[i]
-                    for row_no in range(source.row_count):
-                        dest_column.set_value(offset + row_no, source_column[row_no])
-
-                if name_column is not None:
-                    for row_no in range(source.row_count):
-                        name_column.set_value(offset + row_no, name)
+                # a block of rows at a time, so the whole source isn't
+                # held in memory at once
+                dest_indices = [ column.index for column in dest_columns ]
+                for row_start in range(0, source.row_count, IMPORT_BLOCK_SIZE):
+                    n_rows = min(IMPORT_BLOCK_SIZE, source.row_count - row_start)
+                    self.set_values(
+                        dest_indices,
+                        offset + row_start,
+                        [ column.get_values(row_start, n_rows) for column in source_columns ])
+
+                    if name_column is not None:
+                        self.set_values(name_column.index, offset + row_start, [ [ name ] * n_rows ])
 
         finally:
             # now we can reparse everything
@@ -4,10 +4,11 @@ import os.path
 import logging
 import shutil
 import json
+import pickle
+from copy import deepcopy
 from zipfile import ZipFile
 from asyncio import ensure_future as create_task
 from collections import namedtuple
-from functools import lru_cache
 
 import yaml
 
@@ -35,6 +36,77 @@ log = logging.getLogger('jamovi')
 LibraryContent = namedtuple('Library', 'message modules')
 
 
+# the parsed module definitions, shared by all the sessions in the process.
+# they're kept by path, along with the mtime and size of the file they were
+# parsed from, and are also stored alongside it, so later processes needn't
+# parse them either. they're shared, so mustn't be modified
+_definitions: dict = { }
+
+DEFN_CACHE_NAME = '.jamovi-defn.pickle'
+DEFN_CACHE_VERSION = 1
+
+
+def _read_defn(meta_path):
+
+    # raises FileNotFoundError if there's no file at meta_path
+
+    stat = os.stat(meta_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    entry = _definitions.get(meta_path)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
+    cache_path = os.path.join(os.path.dirname(meta_path), DEFN_CACHE_NAME)
+    defn = None
+
+    try:
+        with open(cache_path, 'rb') as stream:
+            version, leaf, cache_key, cache_defn = pickle.load(stream)
+        if (version, leaf, cache_key) == (DEFN_CACHE_VERSION, os.path.basename(meta_path), key):
+            defn = cache_defn
+    except Exception:
+        # missing, stale, or from another version
+        pass
+
+    if defn is None:
+        with open(meta_path, encoding='utf-8') as stream:
+            defn = yaml.load(stream, Loader=Loader)
+        try:
+            temp_path = f'{ cache_path }.{ os.getpid() }.tmp'
+            with open(temp_path, 'wb') as stream:
+                pickle.dump((DEFN_CACHE_VERSION, os.path.basename(meta_path), key, defn), stream)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            # system modules are often read only
+            log.debug('unable to store module definition: %s', e)
+
+    _definitions[meta_path] = (key, defn)
+    return defn
+
+
+def _read_translations(i18n_path):
+
+    # the translations are shared too, and kept by mtime and size
+
+    try:
+        stat = os.stat(i18n_path)
+    except FileNotFoundError:
+        return { }
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    entry = _definitions.get(i18n_path)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
+    with open(i18n_path, 'r', encoding='utf-8') as stream:
+        i18n_def = json.load(stream)
+        messages = i18n_def['locale_data']['messages']
+
+    _definitions[i18n_path] = (key, messages)
+    return messages
+
+
 class LibraryError(Exception):
     pass
 
@@ -105,15 +177,10 @@ class ModuleMeta:
         self.i18n_msgs = self._load_translations(code)
         return bool(self.i18n_msgs)
 
-    @lru_cache(None)
     def _load_translations(self, code):
         if code:
             i18n_root = os.path.join(self.path, 'R', self.name, 'i18n', f'{code}.json')
-            if os.path.exists(i18n_root):
-                with open(i18n_root, 'r', encoding='utf-8') as stream:
-                    i18n_def = json.load(stream)
-                    return i18n_def['locale_data']['messages']
-
+            return _read_translations(i18n_root)
         return { }
 
     def translate(self, value):
@@ -151,14 +218,25 @@ class AnalysisMeta:
         self.defn: dict = {}
         self.translated = ''
         self.category = ''
+        self._original_defn: dict | None = None
 
     def translate_defaults(self, module_meta, code):
         if self.translated == code:
             return
 
+        if self._original_defn is None:
+            self._original_defn = self.defn
+        self.defn = self._original_defn
+        self.translated = ''
+
         if not module_meta.load_translations(code):
             return
 
+        # the definition is shared with other sessions, so the options
+        # are translated in a copy
+        self.defn = dict(self._original_defn)
+        self.defn['options'] = deepcopy(self._original_defn['options'])
+
         options_defn = self.defn['options']
         for opt_defn in options_defn:
             if 'name' not in opt_defn or 'type' not in opt_defn:
@@ -293,8 +371,7 @@ class Modules:
         for leaf in ('jamovi-full.yaml', 'jamovi.yaml'):
             try:
                 meta_path = os.path.join(path, leaf)
-                with open(meta_path, encoding='utf-8') as stream:
-                    defn = yaml.load(stream, Loader=Loader)
+                defn = _read_defn(meta_path)
             except FileNotFoundError:
                 continue
             else:
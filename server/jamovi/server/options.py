@@ -402,6 +402,14 @@ class Options:
                 opt_pb = self._pb.options[i]
                 write_value_to_pb(False, opt_pb)
 
+    def has_actions(self):
+        for i, name in enumerate(self._pb.names):
+            option = self._options.get(name, None)
+            if option is not None and option.type == 'Action':
+                if read_value_from_pb(self._pb.options[i]):
+                    return True
+        return False
+
     def read(self, bin):
         self._pb.ParseFromString(bin)
 
@@ -4,9 +4,11 @@ from collections import OrderedDict
 from asyncio import Semaphore
 from asyncio import QueueFull
 from asyncio import Event
+from time import monotonic
 
 from .utils import req_str
 from .utils.stream import ProgressStream
+from .utils.event import EventHook
 
 from logging import getLogger
 
@@ -24,10 +26,59 @@ class Pool:
         self._not_full = Event()
         self._not_full.set()
 
+        self.resized = EventHook()
+
+        # requests with a lower priority value are yielded first
+        self._priorities = { }
+
+        # for the metrics
+        self._queued_at = { }
+        self._started_at = { }
+        self._n_dispatched = 0
+        self._wait_time = 0.0
+        self._wait_max = 0.0
+        self._busy_time = 0.0
+        self._slot_time = 0.0
+        self._slot_time_at = monotonic()
+
     @property
     def n_slots(self):
         return self._n_slots
 
+    def resize(self, n_slots):
+        self._add_slot_time()
+        self._n_slots = n_slots
+        if self.is_full:
+            self._not_full.clear()
+        else:
+            self._not_full.set()
+        self.resized(n_slots)
+
+    def _add_slot_time(self):
+        now = monotonic()
+        self._slot_time += (now - self._slot_time_at) * self._n_slots
+        self._slot_time_at = now
+
+    @property
+    def metrics(self):
+        # times are in seconds, and are totals since the pool was created
+        self._add_slot_time()
+        now = monotonic()
+        busy_time = self._busy_time
+        for started_at in self._started_at.values():
+            busy_time += now - started_at
+        return {
+            'slots': self._n_slots,
+            'queued': len(self._wait_tx),
+            'running': len(self._wait_rx),
+            'dispatched': self._n_dispatched,
+            'wait_time': self._wait_time,
+            'wait_max': self._wait_max,
+            'busy_time': busy_time,
+            'slot_time': self._slot_time,
+            'utilisation': busy_time / self._slot_time if self._slot_time > 0 else 0.0,
+        }
+
     @property
     def is_full(self):
         return len(self._wait_tx) + len(self._wait_rx) >= self._n_slots
@@ -42,7 +93,11 @@ class Pool:
     def qsize(self):
         return self._n_slots
 
-    def put_nowait(self, request):
+    def set_priority(self, key, priority):
+        if key in self._wait_tx:
+            self._priorities[key] = priority
+
+    def put_nowait(self, request, priority=0):
         instance_id = request.instanceId
         analysis_id = request.analysisId
         key = (instance_id, analysis_id)
@@ -74,6 +129,8 @@ class Pool:
         stream = ProgressStream()
         log.debug('%s %s', 'queueing', req_str(request))
         self._wait_tx[key] = (request, stream)
+        self._queued_at[key] = monotonic()
+        self._priorities[key] = priority
         if self._wait_tx_sem.locked():
             self._wait_tx_sem.release()
         stream.add_done_callback(self._stream_complete)
@@ -81,8 +138,8 @@ class Pool:
             self._not_full.clear()
         return stream
 
-    def add(self, request):
-        return self.put_nowait(request)
+    def add(self, request, priority=0):
+        return self.put_nowait(request, priority)
 
     def cancel(self, key):
         existing = self._wait_tx.get(key)
@@ -114,11 +171,14 @@ class Pool:
             request, stream = value
             if stream.done():
                 del self._wait_rx[key]
+                self._busy_time += monotonic() - self._started_at.pop(key)
                 log.debug('%s %s', 'removing', req_str(request))
         for key, value in list(self._wait_tx.items()):
             request, stream = value
             if stream.done():
                 del self._wait_tx[key]
+                del self._queued_at[key]
+                del self._priorities[key]
                 log.debug('%s %s', 'removing', req_str(request))
         if not self.is_full:
             self._not_full.set()
@@ -128,8 +188,18 @@ class Pool:
         while True:
             await self._wait_tx_sem.acquire()
             while len(self._wait_tx) > 0:
-                key, value = self._wait_tx.popitem()
+                # the most recently added, of those with the top priority
+                key = min(reversed(self._wait_tx), key=self._priorities.__getitem__)
+                value = self._wait_tx.pop(key)
+                del self._priorities[key]
                 self._wait_rx[key] = value
+
+                now = monotonic()
+                wait_time = now - self._queued_at.pop(key)
+                self._wait_time += wait_time
+                self._wait_max = max(self._wait_max, wait_time)
+                self._started_at[key] = now
+                self._n_dispatched += 1
                 request, stream = value
                 log.debug('%s %s', 'yielding', req_str(request))
                 yield value
@@ -0,0 +1,148 @@
+
+from collections import deque
+from time import monotonic
+from time import time
+from logging import getLogger
+
+import platform
+
+from .jamovi_pb2 import AnalysisRequest
+from .jamovi_pb2 import AnalysisStatus
+
+
+log = getLogger(__name__)
+
+
+ANALYSIS_ERROR = AnalysisStatus.Value('ANALYSIS_ERROR')
+
+DEFAULT_SIZE = 1000
+
+
+class RequestLog:
+
+    # a record of each analysis request; how long it waited in the queue,
+    # how long the engine took with it, the size of the results it sent
+    # back, and the engine's peak memory use while running it. only the
+    # most recent are kept
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self._records = deque(maxlen=size)
+        self._active = { }
+
+    @staticmethod
+    def _key(request):
+        return (request.instanceId, request.analysisId, request.revision, request.perform)
+
+    def queued(self, request):
+        self._active[self._key(request)] = {
+            'instance': request.instanceId,
+            'analysis': request.analysisId,
+            'ns': request.ns,
+            'name': request.name,
+            'perform': AnalysisRequest.Perform.Name(request.perform).lower(),
+            'revision': request.revision,
+            'queued_at': time(),
+            'wait': None,
+            'first_result': None,
+            'duration': None,
+            'payload_size': 0,
+            'peak_rss': None,
+            'status': None,
+            '_queued': monotonic(),
+            '_sent': None,
+        }
+
+    def sent(self, request, pid=None):
+        record = self._active.get(self._key(request))
+        if record is None:
+            return
+        record['_sent'] = monotonic()
+        record['wait'] = record['_sent'] - record['_queued']
+        if pid is not None:
+            reset_peak_rss(pid)
+
+    def received(self, request, payload_size, pid=None):
+        record = self._active.get(self._key(request))
+        if record is None or record['_sent'] is None:
+            return
+        if record['first_result'] is None:
+            record['first_result'] = monotonic() - record['_sent']
+        record['payload_size'] += payload_size
+        if pid is not None:
+            record['peak_rss'] = peak_rss(pid)
+
+    def done(self, request, results=None):
+        record = self._active.pop(self._key(request), None)
+        if record is None:
+            return
+        if record['_sent'] is not None:
+            record['duration'] = monotonic() - record['_sent']
+        if results is None:
+            record['status'] = 'cancelled'
+        elif results.status == ANALYSIS_ERROR:
+            record['status'] = 'error'
+        else:
+            record['status'] = 'complete'
+        del record['_queued']
+        del record['_sent']
+        self._records.append(record)
+
+    @property
+    def records(self):
+        return list(self._records)
+
+    def summary(self):
+        # totals for each analysis, to show which use the most capacity
+        summary = { }
+        for record in self._records:
+            key = f'{ record["ns"] }::{ record["name"] }'
+            entry = summary.get(key)
+            if entry is None:
+                entry = summary[key] = {
+                    'requests': 0,
+                    'cancelled': 0,
+                    'errors': 0,
+                    'wait': 0.0,
+                    'duration': 0.0,
+                    'duration_max': 0.0,
+                    'payload_size': 0,
+                    'peak_rss': None,
+                }
+            entry['requests'] += 1
+            if record['status'] == 'cancelled':
+                entry['cancelled'] += 1
+            elif record['status'] == 'error':
+                entry['errors'] += 1
+            entry['wait'] += record['wait'] or 0.0
+            entry['duration'] += record['duration'] or 0.0
+            entry['duration_max'] = max(entry['duration_max'], record['duration'] or 0.0)
+            entry['payload_size'] += record['payload_size']
+            if record['peak_rss'] is not None:
+                entry['peak_rss'] = max(entry['peak_rss'] or 0, record['peak_rss'])
+        return summary
+
+
+def reset_peak_rss(pid):
+    # resets the process' peak resident set size, so it's the peak for
+    # each request (only possible under linux)
+    if platform.system() != 'Linux':
+        return
+    try:
+        with open(f'/proc/{ pid }/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError as e:
+        log.debug('unable to reset peak rss: %s', e)
+
+
+def peak_rss(pid):
+    # the process' peak resident set size in bytes, or None if unavailable
+    if platform.system() != 'Linux':
+        return None
+    try:
+        with open(f'/proc/{ pid }/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
@@ -0,0 +1,204 @@
+import os
+
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+from hashlib import blake2b
+from logging import getLogger
+
+from jamovi.core import DataType
+from jamovi.core import MeasureType
+
+from .analyses import Analysis
+from .jamovi_pb2 import AnalysisResponse
+from .jamovi_pb2 import AnalysisStatus
+
+
+log = getLogger(__name__)
+
+
+ANALYSIS_COMPLETE = AnalysisStatus.Value('ANALYSIS_COMPLETE')
+
+DEFAULT_MAX_SIZE = 128 * 1024 * 1024
+
+# the fingerprints of each data set's columns, by column id, along with
+# the version of the data set they're for
+_fingerprints = WeakKeyDictionary()
+
+
+def make_key(analysis, version):
+
+    # the key is a digest of everything the results depend on; the
+    # analysis, its options, and the contents of the columns it uses.
+    # returns None for analyses whose results shouldn't be reused
+
+    if analysis.arbitrary_code or analysis.options.has_actions():
+        return None
+
+    data = analysis.dataset
+
+    digest = blake2b(digest_size=20)
+    digest.update(repr((analysis.ns, analysis.name, version, data.results_language)).encode())
+    digest.update(analysis.options.as_bytes())
+
+    using = analysis.get_using()
+    for addon in analysis.addons:
+        digest.update(repr((addon.ns, addon.name)).encode())
+        digest.update(addon.options.as_bytes())
+        using |= addon.get_using()
+
+    # filters and weights determine which rows the analysis sees
+    columns = [ column for column in data if column.is_filter ]
+    if data.has_weights:
+        using.add(data.weights_name)
+
+    for name in sorted(using):
+        try:
+            columns.append(data.get_column_by_name(name))
+        except KeyError:
+            digest.update(repr(('missing', name)).encode())
+
+    for column in columns:
+        digest.update(_fingerprint(data, column))
+
+    return digest.hexdigest()
+
+
+def _fingerprint(data, column):
+
+    # a column's fingerprint only changes when the data set does, so is
+    # kept for each version of it. not while it's being edited though;
+    # it may change again before the edit's done
+
+    if data.is_edited:
+        return fingerprint(column)
+
+    version = (data.version, column.changes)
+    fingerprints = _fingerprints.setdefault(data, { })
+    entry = fingerprints.get(column.id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    value = fingerprint(column)
+    fingerprints[column.id] = (version, value)
+    return value
+
+
+def fingerprint(column):
+
+    # a digest of a column's contents, and the properties that
+    # determine how an analysis reads them
+
+    digest = blake2b(digest_size=20)
+    digest.update(repr((
+        column.name,
+        column.data_type.value,
+        column.measure_type.value,
+        column.active,
+        column.row_count,
+        column.levels,
+        column.missing_values)).encode())
+
+    if column.row_count > 0:
+        if column.data_type is DataType.TEXT and column.measure_type is MeasureType.ID:
+            values = column.get_values(0, column.row_count)
+            digest.update('\0'.join(values).encode())
+        else:
+            values = column.get_raw_values(0, column.row_count)
+            digest.update(values.tobytes())
+
+    return digest.digest()
+
+
+class ResultsCache:
+
+    # results are kept in files under path, named by their key. the index
+    # of their sizes is kept in least recently used order, and the least
+    # recently used are removed once the total exceeds max_size
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self._path = path
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._size = 0
+
+        os.makedirs(path, exist_ok=True)
+
+        # pick up entries from a previous run
+        entries = [ ]
+        for entry in os.scandir(path):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        if key not in self._entries:
+            return None
+        try:
+            with open(os.path.join(self._path, key), 'rb') as file:
+                content = file.read()
+            results = AnalysisResponse()
+            results.ParseFromString(content)
+        except Exception as e:
+            log.exception(e)
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return results
+
+    def put(self, key, results):
+
+        # only complete results without images (whose files belong to
+        # the analysis which produced them) are worth keeping
+        if results.status != ANALYSIS_COMPLETE:
+            return
+        if Analysis._get_resources(results.results):
+            return
+
+        content = results.SerializeToString()
+        if len(content) > self._max_size:
+            return
+
+        path = os.path.join(self._path, key)
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.exception(e)
+            return
+
+        self._size -= self._entries.pop(key, 0)
+        self._entries[key] = len(content)
+        self._size += len(content)
+        self._evict()
+
+    def clear(self):
+        for key in list(self._entries):
+            self._remove(key)
+
+    def _evict(self):
+        while self._size > self._max_size:
+            key = next(iter(self._entries))
+            self._remove(key)
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key, 0)
+        try:
+            os.remove(os.path.join(self._path, key))
+        except FileNotFoundError:
+            pass
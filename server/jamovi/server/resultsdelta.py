@@ -0,0 +1,47 @@
+
+from .jamovi_pb2 import AnalysisResponse
+from .jamovi_pb2 import ResultsElement
+
+
+def make_delta(base, results):
+
+    # a copy of the results, where the elements which are the same as in
+    # the base results are replaced with placeholders marked unchanged
+
+    delta = AnalysisResponse()
+    delta.CopyFrom(results)
+    if base.HasField('results') and results.HasField('results'):
+        delta.results.CopyFrom(_diff(base.results, results.results))
+    return delta
+
+
+def _diff(base, element):
+
+    if base == element:
+        placeholder = ResultsElement()
+        placeholder.name = element.name
+        placeholder.unchanged = True
+        return placeholder
+
+    kind = element.WhichOneof('type')
+    if kind not in ('group', 'array') or base.WhichOneof('type') != kind:
+        return element
+
+    # children are matched by name, so this only works if they're unique
+    base_children = getattr(base, kind).elements
+    by_name = { child.name: child for child in base_children }
+    if len(by_name) != len(base_children):
+        return element
+
+    delta = ResultsElement()
+    delta.CopyFrom(element)
+    children = getattr(delta, kind).elements
+    del children[:]
+
+    for child in getattr(element, kind).elements:
+        child_base = by_name.get(child.name)
+        if child_base is not None:
+            child = _diff(child_base, child)
+        children.add().CopyFrom(child)
+
+    return delta
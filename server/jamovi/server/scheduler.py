@@ -3,13 +3,20 @@ from asyncio import wait
 from asyncio import FIRST_COMPLETED
 from asyncio import ensure_future as create_task
 from asyncio import CancelledError
+from asyncio import get_event_loop
 from logging import getLogger
+from time import monotonic
+
+import os
 
 from .analyses import Analysis
 from .jamovi_pb2 import AnalysisRequest
 from .jamovi_pb2 import AnalysisStatus
 from .pool import Pool
+from .resultscache import make_key
 from .utils import req_str
+from .utils import conf
+from .utils.event import EventHook
 from .i18n import _
 
 
@@ -19,6 +26,16 @@ PERFORM_INIT = AnalysisRequest.Perform.Value('INIT')
 PERFORM_SAVE = AnalysisRequest.Perform.Value('SAVE')
 PERFORM_RUN = AnalysisRequest.Perform.Value('RUN')
 
+# analyses are sent in order of priority (lower first), then the order
+# they appear in the results
+PRIORITY_EDITING = 0
+PRIORITY_VISIBLE = 1
+PRIORITY_HIDDEN = 2
+
+# a waiting analysis is raised a priority every this many seconds, so
+# hidden analyses aren't starved (but never above the analysis being edited)
+PRIORITY_AGING_INTERVAL = 5
+
 
 class BadAnalysis(Exception):
     def __init__(self, message):
@@ -28,30 +45,102 @@ class BadAnalysis(Exception):
 log = getLogger(__name__)
 
 
+class EngineLimit:
+
+    # the ceiling on the number of engines, shared by the schedulers of
+    # all the sessions in a process
+
+    def __init__(self, max_engines):
+        self.max_engines = max_engines
+        self.n_engines = 0
+        self.released = EventHook()
+
+    def acquire(self, n=1):
+        if self.n_engines + n > self.max_engines:
+            return False
+        self.n_engines += n
+        return True
+
+    def release(self, n=1):
+        self.n_engines -= n
+        if n > 0:
+            self.released()
+
+
+_engine_limit = None
+
+
+def engine_limit():
+    global _engine_limit
+    if _engine_limit is None:
+        # by default, at least enough for one session's base slots and
+        # standby engines
+        n_base = (int(conf.get('engine_init_count', '1'))
+                  + int(conf.get('engine_run_count', '3'))
+                  + int(conf.get('engine_standby_count', '1')))
+        max_engines = int(conf.get('engine_max_count', max(os.cpu_count() or 4, n_base)))
+        _engine_limit = EngineLimit(max_engines)
+    return _engine_limit
+
+
 class Scheduler:
 
-    def __init__(self, n_init_slots, n_run_slots, analyses, modules):
-        self._n_init_slots = n_init_slots
-        self._n_run_slots = n_run_slots
-        self._n_slots = n_init_slots + n_run_slots
+    def __init__(self, n_init_slots, n_run_slots, analyses, modules, *, cache=None, limit=None, idle_timeout=60, request_log=None):
+        self._n_init_slots = 0
+        self._n_run_slots = 0
+        self._n_slots = 0
         self._analyses = analyses
         self._modules = modules
+        self._cache = cache
+        self._request_log = request_log
+
+        # run slots are added while analyses are waiting (and the limit
+        # allows), and removed once they've been idle for idle_timeout
+        self._limit = limit if limit is not None else engine_limit()
+        self._min_init_slots = n_init_slots
+        self._min_run_slots = n_run_slots
+        self._idle_timeout = idle_timeout
+        self._extra_last_used = monotonic()
+        self._reap_handle = None
+
+        # the cache keys of analyses waiting to run, so their results
+        # can be stored when they arrive
+        self._keys = { }
+
+        # the analyses in the results viewport, and being edited, of each
+        # instance, as reported by the client
+        self._visible = { }
+        self._editing = { }
+        self._waiting_since = { }
 
         self._n_initing = 0
         self._n_running = 0
+        self._stopped = False
 
         self._analyses.add_options_changed_listener(self._send_next)
 
         self._pool = Pool(self._n_slots)
 
+        # the base slots count against the limit too. if it's reached, the
+        # session starts with fewer, and takes up the rest as other
+        # sessions give theirs up
+        self._fill_slots()
+        self._limit.released += self._on_limit_released
+
     def _send_next(self, analysis=None):
 
+        if self._stopped:
+            return
+
         # print('counts', self._n_initing, self._n_running, self._n_slots, self._n_run_slots)
 
         # if the analysis already running, update the queue
         if analysis is not None:
             key = (analysis.instance.id, analysis.id)
+            # its options or data have changed
+            self._keys.pop(key, None)
             if key in self._pool:
+                self._make_key(analysis)
                 analysis.set_status(Analysis.Status.RUNNING)
                 try:
                     self._run_analysis(analysis, 'init')
@@ -61,51 +150,209 @@ class Scheduler:
                     self._n_initing += 1
                     log.debug('%s %s %s', 'inc_counters', 'initing', (self._n_initing, self._n_running, self._n_slots))
 
-        if self._n_initing + self._n_running >= self._n_slots:
-            return
-
+        # replaying results from the cache needs no slot
         for analysis in self._analyses.needs_init:
-            analysis.set_status(Analysis.Status.RUNNING)
-            try:
-                self._run_analysis(analysis, 'init')
-            except BadAnalysis as e:
-                analysis.set_error(e.message)
-                continue
-            self._n_initing += 1
-            log.debug('%s %s %s', 'inc_counters', 'initing', (self._n_initing, self._n_running, self._n_slots))
-            if self._n_initing + self._n_running >= self._n_slots:
-                return
+            self._replay(analysis)
 
-        if self._n_running >= self._n_run_slots:
-            return
+        if self._n_initing + self._n_running < self._n_slots:
+            for analysis in self._by_priority(self._analyses.needs_init):
+                analysis.set_status(Analysis.Status.RUNNING)
+                try:
+                    self._run_analysis(analysis, 'init')
+                except BadAnalysis as e:
+                    analysis.set_error(e.message)
+                    continue
+                self._n_initing += 1
+                log.debug('%s %s %s', 'inc_counters', 'initing', (self._n_initing, self._n_running, self._n_slots))
+                if self._n_initing + self._n_running >= self._n_slots:
+                    break
 
         for analysis in self._analyses.needs_op:
+            if not self._run_slot_available():
+                return
             analysis.set_status(Analysis.Status.RUNNING)
             try:
                 self._run_analysis(analysis, 'op')
             except BadAnalysis as e:
                 analysis.set_error(e.message)
                 continue
-            self._n_running += 1
-            log.debug('%s %s %s', 'inc_counters', 'running', (self._n_initing, self._n_running, self._n_slots))
-            if self._n_running + self._n_initing >= self._n_slots:
-                return
-            if self._n_running >= self._n_run_slots:
-                return
+            self._inc_running()
 
-        for analysis in self._analyses.needs_run:
+        for analysis in self._by_priority(self._analyses.needs_run):
+            if not self._run_slot_available():
+                return
             analysis.set_status(Analysis.Status.RUNNING)
             try:
                 self._run_analysis(analysis, 'run')
             except BadAnalysis as e:
                 analysis.set_error(e.message)
                 continue
-            self._n_running += 1
-            log.debug('%s %s %s', 'inc_counters', 'running', (self._n_initing, self._n_running, self._n_slots))
-            if self._n_running + self._n_initing >= self._n_slots:
-                return
-            if self._n_running >= self._n_run_slots:
-                return
+            self._inc_running()
+
+    def prioritise(self, instance_id, *, visible=None, editing=None):
+        # visible and editing are analysis ids; None leaves them unchanged
+        if visible is not None:
+            self._visible[instance_id] = set(visible)
+        if editing is not None:
+            self._editing[instance_id] = editing
+
+        # update the requests waiting in the pool
+        for analysis in self._analyses:
+            if analysis.instance.id == instance_id:
+                key = (instance_id, analysis.id)
+                self._pool.set_priority(key, self._priority(analysis))
+
+    def _priority(self, analysis):
+        instance_id = analysis.instance.id
+        if analysis.id == self._editing.get(instance_id):
+            return PRIORITY_EDITING
+        visible = self._visible.get(instance_id)
+        if visible is None or analysis.id in visible:
+            return PRIORITY_VISIBLE
+
+        key = (instance_id, analysis.id)
+        waiting_for = monotonic() - self._waiting_since.get(key, monotonic())
+        raised = int(waiting_for // PRIORITY_AGING_INTERVAL)
+        return max(PRIORITY_HIDDEN - raised, PRIORITY_VISIBLE)
+
+    def _by_priority(self, analyses):
+        # sorted() is stable, so equal priorities keep their order
+        analyses = list(analyses)
+        now = monotonic()
+        for analysis in analyses:
+            key = (analysis.instance.id, analysis.id)
+            self._waiting_since.setdefault(key, now)
+        return sorted(analyses, key=self._priority)
+
+    def _inc_running(self):
+        self._n_running += 1
+        log.debug('%s %s %s', 'inc_counters', 'running', (self._n_initing, self._n_running, self._n_slots))
+        if self._n_running > self._min_run_slots:
+            self._extra_last_used = monotonic()
+
+    def _run_slot_available(self):
+        if (self._n_running < self._n_run_slots
+                and self._n_running + self._n_initing < self._n_slots):
+            return True
+        return self._add_run_slot()
+
+    def _add_run_slot(self):
+        if not self._limit.acquire():
+            return False
+        self._n_run_slots += 1
+        self._n_slots += 1
+        log.debug('%s %s', 'adding_run_slot', (self._n_run_slots, self._n_slots))
+        self._pool.resize(self._n_slots)
+        self._extra_last_used = monotonic()
+        if self._reap_handle is None:
+            self._reap_handle = get_event_loop().call_later(self._idle_timeout, self._reap)
+        return True
+
+    def _fill_slots(self):
+        n_added = 0
+        while self._n_init_slots < self._min_init_slots and self._limit.acquire():
+            self._n_init_slots += 1
+            n_added += 1
+        while self._n_run_slots < self._min_run_slots and self._limit.acquire():
+            self._n_run_slots += 1
+            n_added += 1
+        if n_added > 0:
+            self._n_slots += n_added
+            log.debug('%s %s', 'adding_slots', (self._n_init_slots, self._n_run_slots, self._n_slots))
+            self._pool.resize(self._n_slots)
+        return n_added > 0
+
+    def _on_limit_released(self):
+        if self._fill_slots():
+            self._send_next()
+
+    def _reap(self):
+        # removes the extra run slots, once they've been idle long enough
+        self._reap_handle = None
+        n_extra = self._n_run_slots - self._min_run_slots
+        if n_extra <= 0:
+            return
+
+        idle_for = monotonic() - self._extra_last_used
+        if idle_for < self._idle_timeout:
+            self._reap_handle = get_event_loop().call_later(self._idle_timeout - idle_for, self._reap)
+            return
+
+        n_remove = min(n_extra, self._n_run_slots - self._n_running)
+        if n_remove > 0:
+            self._n_run_slots -= n_remove
+            self._n_slots -= n_remove
+            self._limit.release(n_remove)
+            log.debug('%s %s', 'removing_run_slots', (self._n_run_slots, self._n_slots))
+            self._pool.resize(self._n_slots)
+
+        if self._n_run_slots > self._min_run_slots:
+            self._reap_handle = get_event_loop().call_later(self._idle_timeout, self._reap)
+
+    def stop(self):
+        # returns the slots to the engine limit, so other sessions can use them
+        if self._reap_handle is not None:
+            self._reap_handle.cancel()
+            self._reap_handle = None
+        if self._stopped:
+            return
+        self._stopped = True
+        self._limit.released -= self._on_limit_released
+        self._limit.release(self._n_slots)
+        self._analyses.remove_options_changed_listener(self._send_next)
+
+    @property
+    def metrics(self):
+        metrics = self._pool.metrics
+        metrics['waiting'] = sum(1 for _ in self._analyses.needs_run)
+        metrics['initing'] = self._n_initing
+        metrics['run_slots'] = self._n_run_slots
+        metrics['engine_limit'] = self._limit.max_engines
+        return metrics
+
+    def _make_key(self, analysis):
+        if self._cache is None or analysis.ns not in self._modules:
+            return None
+        key = (analysis.instance.id, analysis.id)
+        if key not in self._keys:
+            try:
+                version = self._modules.get(analysis.ns).version
+                self._keys[key] = make_key(analysis, version)
+            except Exception as e:
+                log.exception(e)
+                self._keys[key] = None
+        return self._keys[key]
+
+    def _replay(self, analysis):
+        # sets the analysis' results from the cache, if they're there
+        key = (analysis.instance.id, analysis.id)
+        if key in self._keys or key in self._pool:
+            # already looked up, or running
+            return False
+
+        cache_key = self._make_key(analysis)
+        if cache_key is None or analysis.clear_state:
+            return False
+
+        results = self._cache.get(cache_key)
+        if results is None:
+            return False
+
+        log.debug('%s %s', 'results_replayed', (analysis.instance.id, analysis.id))
+
+        results.instanceId = analysis.instance.id
+        results.analysisId = analysis.id
+        results.revision = analysis.revision
+
+        # the engine hasn't seen these changes, so they're kept for
+        # when it next runs the analysis
+        changes = set(analysis.changes)
+        analysis.set_results(results, status=Analysis.Status.COMPLETE)
+        analysis.changes |= changes
+
+        del self._keys[key]
+        self._waiting_since.pop(key, None)
+        return True
 
     def _run_analysis(self, analysis, perform):
 
@@ -114,9 +361,26 @@ class Scheduler:
 
         request = self._to_message(analysis, perform)
 
+        key = (analysis.instance.id, analysis.id)
+        priority = self._priority(analysis)
+
+        cache_key = None
+        if request.perform == PERFORM_RUN:
+            cache_key = self._keys.pop(key, None)
+            self._waiting_since.pop(key, None)
+
+        # the engine reads a frozen copy of the data, which is released
+        # once the request is done with
+        dataset = analysis.dataset
+        snapshot_id = request.snapshot = dataset.acquire_snapshot()
+
+        if self._request_log is not None:
+            self._request_log.queued(request)
+
         log.debug('%s %s', 'sending_to_pool', req_str(request))
-        stream = self._pool.add(request)
-        task = create_task(self._handle_results(request, stream))
+        stream = self._pool.add(request, priority)
+        task = create_task(self._handle_results(request, stream, cache_key))
+        task.add_done_callback(lambda f: dataset.release_snapshot(snapshot_id))
         task.add_done_callback(self._run_done)
 
     def _run_done(self, f):
@@ -129,11 +393,12 @@ class Scheduler:
 
         self._send_next()
 
-    async def _handle_results(self, request, stream):
+    async def _handle_results(self, request, stream, cache_key=None):
 
         instance_id = request.instanceId
         analysis_id = request.analysisId
         analysis = self._analyses.get(analysis_id, instance_id)
+        final = None
 
         try:
             async for results in stream:
@@ -142,6 +407,7 @@ class Scheduler:
 
             log.debug('%s %s', 'results_received', req_str(request))
             results = stream.result()
+            final = results
 
             if request.perform == PERFORM_SAVE:
                 if results.status == ANALYSIS_ERROR:
@@ -156,10 +422,15 @@ class Scheduler:
                     status = Analysis.Status.INITED
                 else:
                     status = Analysis.Status.COMPLETE
+                    if cache_key is not None:
+                        # stored before set_results() strips the outputs
+                        self._cache.put(cache_key, results)
 
                 analysis.set_results(results, status=status)
 
         finally:
+            if self._request_log is not None:
+                self._request_log.done(request, final)
             if request.perform == PERFORM_INIT:
                 self._n_initing -= 1
                 log.debug('%s %s %s', 'dec_counters', 'initing', (self._n_initing, self._n_running, self._n_slots))
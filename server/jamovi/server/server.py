@@ -14,6 +14,7 @@ from tempfile import NamedTemporaryFile, TemporaryDirectory
 from shutil import rmtree
 
 from aiohttp import web
+from aiohttp import BodyPartReader
 
 from .clientconnection import client_connection_handler
 from .session import Session
@@ -22,11 +23,21 @@ from .appinfo import app_info
 from jamovi.core import Dirs
 from .i18n import _
 from .webhandlers import forward_handler
+from . import httpclient
 from .exceptions import FileExistsException, UserException
+from .assetcache import AssetCache
+from .assetcache import DEFAULT_MAX_SIZE as ASSET_CACHE_SIZE
 
 log = logging.getLogger(__name__)
 
 
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# the fields sent alongside an upload (options, paths) are read into memory,
+# so are limited in size
+MAX_FIELD_SIZE = 1024 * 1024
+
+
 access_key = conf.get('access_key', None)
 access_key_generated = False
 
@@ -36,16 +47,16 @@ if access_key is None:
     conf.set('access_key', access_key)
 
 
+# the client, analysis ui and module files, shared by all the handlers
+_asset_cache = AssetCache(int(conf.get('asset_cache_size', ASSET_CACHE_SIZE)))
+
+
 # Generic static-file helpers (no session dependency)
 
 def _make_single_file_handler(path: str, mime_type: str | None = None,
                                extra_headers: dict | None = None):
-    async def handler(_: web.Request) -> web.Response:
-        ct = mime_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
-        with open(path, 'rb') as f:
-            body = f.read()
-        return web.Response(body=body, content_type=ct,
-                            headers=dict(extra_headers) if extra_headers else {})
+    async def handler(request: web.Request) -> web.StreamResponse:
+        return await _asset_cache.serve(request, path, mime_type, extra_headers)
     return handler
 
 
@@ -53,7 +64,7 @@ def _make_static_dir_handler(directory: str, extra_headers: dict | None = None,
                               default_filename: str | None = None):
     _real = os.path.realpath(directory)
 
-    async def handler(request: web.Request) -> web.Response:
+    async def handler(request: web.Request) -> web.StreamResponse:
         rel = request.match_info.get('path', '')
         if not rel:
             if default_filename:
@@ -63,16 +74,10 @@ def _make_static_dir_handler(directory: str, extra_headers: dict | None = None,
         filepath = os.path.realpath(os.path.join(_real, rel))
         if not filepath.startswith(_real):
             raise web.HTTPForbidden()
-        if not os.path.isfile(filepath):
+        try:
+            return await _asset_cache.serve(request, filepath, headers=extra_headers)
+        except FileNotFoundError:
             raise web.HTTPNotFound()
-        ct, enc = mimetypes.guess_type(filepath)
-        headers = dict(extra_headers) if extra_headers else {}
-        if enc:
-            headers['Content-Encoding'] = enc
-        with open(filepath, 'rb') as f:
-            body = f.read()
-        return web.Response(body=body, content_type=ct or 'application/octet-stream',
-                            headers=headers)
     return handler
 
 
@@ -152,6 +157,10 @@ class _Handlers:
         return web.Response(text=json.dumps(rows), content_type='application/json',
             headers={'Cache-Control': 'private, no-store, must-revalidate, max-age=0'})
 
+    async def metrics(self, _: web.Request) -> web.Response:
+        return web.Response(text=json.dumps(self._session.profile()), content_type='application/json',
+            headers={'Cache-Control': 'private, no-store, must-revalidate, max-age=0'})
+
     async def settings(self, request: web.Request) -> web.Response:
         self._session.apply_settings(json.loads((await request.read()).decode('utf-8')))
         return web.Response(status=200)
@@ -232,8 +241,48 @@ class _Handlers:
         if err is not None:
             return err
 
+        # the upload is streamed to disk, so isn't limited by client_max_size
+        limit = int(conf.get('upload_size_limit', '0')) * 1024 * 1024
+        if limit and request.content_length is not None and request.content_length > limit:
+            return web.Response(status=413, text='413: Payload Too Large')
+
         options: dict = {}
-        data = await request.post()
+        data: dict = {}
+        upload_path = None
+        resp = None
+
+        try:
+            if request.content_type == 'multipart/form-data':
+                reader = await request.multipart()
+                async for part in reader:
+                    if not isinstance(part, BodyPartReader):
+                        raise web.HTTPBadRequest(text='400: Bad Request')
+                    if part.filename is not None:
+                        if part.name != 'file' or upload_path is not None:
+                            await part.release()
+                            continue
+                        # progress is reported while the file arrives
+                        resp = web.StreamResponse(headers={'Content-Type': 'text/plain'})
+                        await resp.prepare(request)
+                        upload_path = await self._receive_upload(part, request.content_length, limit, resp)
+                        data['file'] = part.filename
+                    else:
+                        data[part.name] = await self._read_field(part)
+            else:
+                data = dict(await request.post())
+        except web.HTTPClientError as e:
+            if upload_path is not None:
+                os.remove(upload_path)
+            if resp is None:
+                return web.Response(status=e.status, text=e.text)
+            await resp.write(f'{{"status":"error","message":{json.dumps(e.text)}}}\n'.encode())
+            await resp.write_eof()
+            return resp
+        except BaseException:
+            if upload_path is not None:
+                os.remove(upload_path)
+            raise
+
         options_raw = data.get('options', '{}')
         if isinstance(options_raw, str):
             try:
@@ -248,15 +297,12 @@ class _Handlers:
         file_ext = None
         is_temp = False
 
-        if 'file' in data:
-            ff = data['file']
-            if not isinstance(ff, web.FileField):
-                return web.Response(status=400, text='400: Bad Request')
-            file_title, dot_ext = os.path.splitext(ff.filename)
-            with NamedTemporaryFile(suffix=dot_ext, delete=False) as tmp:
-                tmp.write(ff.file.read())
-            file_path = tmp.name
+        if upload_path is not None:
+            file_title, dot_ext = os.path.splitext(data['file'])
+            file_path = upload_path
             is_temp = True
+        elif 'file' in data:
+            return web.Response(status=400, text='400: Bad Request')
         elif 'path' in options:
             file_path = options['path']
             is_temp = options.get('temp', False) is not False
@@ -276,8 +322,9 @@ class _Handlers:
 
         self._session.set_language(request.headers.get('Accept-Language', 'en'))
 
-        resp = web.StreamResponse(headers={'Content-Type': 'text/plain'})
-        await resp.prepare(request)
+        if resp is None:
+            resp = web.StreamResponse(headers={'Content-Type': 'text/plain'})
+            await resp.prepare(request)
         try:
             instance = await self._session.create()
             async for progress in instance.open(
@@ -285,6 +332,9 @@ class _Handlers:
                 ext=file_ext, options=options,
             ):
                 p, n = progress
+                if upload_path is not None:
+                    # the second half, after the upload
+                    p, n = 500 + 500 * p // n, 1000
                 await resp.write(f'{{"status":"in-progress","p":{p},"n":{n}}}\n'.encode())
         except Exception as e:
             log.exception(e)
@@ -295,6 +345,49 @@ class _Handlers:
         await resp.write_eof()
         return resp
 
+    async def _receive_upload(self, part: BodyPartReader, total: int | None,
+                              limit: int, resp: web.StreamResponse) -> str:
+        # writes the file to a temp file as it arrives, without holding it
+        # in memory. the upload is the first half of the progress reported
+        loop = asyncio.get_event_loop()
+        dot_ext = os.path.splitext(part.filename or '')[1]
+        received = 0
+        reported = 0
+        with NamedTemporaryFile(suffix=dot_ext, delete=False) as tmp:
+            try:
+                while True:
+                    chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                    if limit and received > limit:
+                        raise web.HTTPRequestEntityTooLarge(limit, received,
+                            text=_('The file is too large to upload'))
+                    await loop.run_in_executor(None, tmp.write, chunk)
+                    if total:
+                        p = min(500 * received // total, 500)
+                        if p > reported:
+                            reported = p
+                            await resp.write(f'{{"status":"in-progress","p":{p},"n":1000}}\n'.encode())
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+        return tmp.name
+
+    async def _read_field(self, part: BodyPartReader) -> str:
+        value = bytearray()
+        while True:
+            chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            value.extend(chunk)
+            if len(value) > MAX_FIELD_SIZE:
+                raise web.HTTPRequestEntityTooLarge(MAX_FIELD_SIZE, len(value),
+                    text='413: Payload Too Large')
+        data = await part.decode(bytes(value))
+        return data.decode(part.get_charset(default='utf-8'))
+
     async def save(self, request: web.Request) -> web.StreamResponse:
         instance_id = request.match_info['instance_id']
         instance = self._session.get(instance_id)
@@ -366,7 +459,7 @@ class _Handlers:
         return web.Response(body=body, content_type=ct or 'application/octet-stream',
                             headers=headers)
 
-    async def module_asset(self, request: web.Request) -> web.Response:
+    async def module_asset(self, request: web.Request) -> web.StreamResponse:
         instance_id = request.match_info['instance_id']
         analysis_id = request.match_info['analysis_id']
         path = request.match_info['path']
@@ -383,14 +476,11 @@ class _Handlers:
         if not asset_path.startswith(module_path):
             return web.Response(status=403, content_type='text/html', text='<h1>403</h1>verboten')
 
-        ct, enc = mimetypes.guess_type(asset_path)
         headers = {'Cache-Control': 'private, no-cache, must-revalidate, max-age=0'}
-        if enc:
-            headers['Content-Encoding'] = enc
-        with open(asset_path, 'rb') as f:
-            body = f.read()
-        return web.Response(body=body, content_type=ct or 'application/octet-stream',
-                            headers=headers)
+        try:
+            return await _asset_cache.serve(request, asset_path, headers=headers)
+        except FileNotFoundError as e:
+            return web.Response(status=404, content_type='text/html', text=f'<h1>404</h1>{e}')
 
     async def module_i18n(self, request: web.Request) -> web.Response:
         module_name = request.match_info['module_name']
@@ -416,7 +506,7 @@ class _Handlers:
             return web.Response(status=404, content_type='text/html', text=f'<h1>404</h1>{e}')
         return web.Response(body=body, content_type='text/yaml')
 
-    async def analysis_descriptor(self, request: web.Request) -> web.Response:
+    async def analysis_descriptor(self, request: web.Request) -> web.StreamResponse:
         module_name = request.match_info['module_name']
         analysis_name = request.match_info['analysis_name']
         part = request.match_info.get('part') or 'js'
@@ -427,11 +517,10 @@ class _Handlers:
             else:
                 path = os.path.join(module_path, 'analyses', analysis_name.lower() + '.' + part)
             path = os.path.realpath(path)
-            with open(path, 'rb') as f:
-                body = f.read()
+            return await _asset_cache.serve(request, path, 'text/plain',
+                {'Cache-Control': 'private, no-cache, must-revalidate, max-age=0'})
         except (KeyError, FileNotFoundError) as e:
             return web.Response(status=404, content_type='text/html', text=f'<h1>404</h1>{e}')
-        return web.Response(body=body, content_type='text/plain')
 
     async def pdf(self, request: web.Request) -> web.Response:
         body = await request.read()
@@ -516,6 +605,7 @@ class _Handlers:
             self.analysis_descriptor)
         router.add_post('/utils/to-pdf', self.pdf)
         router.add_get('/api/datasets', self.datasets)
+        router.add_get('/metrics', self.metrics)
         router.add_get('/i18n/', self.i18n_manifest)
         router.add_get(r'/i18n/{path:.+}', _make_static_dir_handler(self._i18n_path))
 
@@ -855,6 +945,7 @@ class Server:
         finally:
             for runner in runners:
                 await runner.cleanup()
+            await httpclient.close()
             try:
                 os.remove(self._port_file)
             except OSError:
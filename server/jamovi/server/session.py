@@ -18,6 +18,9 @@ from .instance import Instance
 from .analyses import AnalysisIterator
 from .enginemanager import EngineManager
 from .scheduler import Scheduler
+from .resultscache import ResultsCache
+from .resultscache import DEFAULT_MAX_SIZE
+from .requestlog import RequestLog
 from . import i18n
 
 from jamovi.core import Dirs
@@ -66,6 +69,7 @@ class Session(dict):
     _ended: Event
     _settings: Settings
     _modules: Modules
+    _results_cache: ResultsCache
 
     def __init__(self, data_path: str, id: str):
         self._path = data_path
@@ -106,14 +110,30 @@ class Session(dict):
         if language != '':
             i18n.set_language(language)
 
-        self._scheduler = Scheduler(1, 3, self._analyses, self._modules)
+        cache_path = os.path.join(self._session_path, 'cache')
+        cache_size = int(conf.get('results_cache_size', DEFAULT_MAX_SIZE))
+        self._results_cache = ResultsCache(cache_path, cache_size)
+
+        idle_timeout = int(conf.get('engine_idle_timeout', '60'))
+
+        request_log_size = int(conf.get('request_log_size', '1000'))
+        self._request_log = RequestLog(request_log_size)
+
+        n_init_slots = int(conf.get('engine_init_count', '1'))
+        n_run_slots = int(conf.get('engine_run_count', '3'))
+
+        self._scheduler = Scheduler(n_init_slots, n_run_slots, self._analyses, self._modules,
+                                    cache=self._results_cache,
+                                    idle_timeout=idle_timeout,
+                                    request_log=self._request_log)
 
         task_queue_url = conf.get('task_queue_url')
         if task_queue_url is not None:
             from .remotepool import RemotePool
             self._runner = RemotePool(task_queue_url, self._scheduler.queue)
         else:
-            self._runner = EngineManager(self._path, self._scheduler.queue, conf)
+            self._runner = EngineManager(self._path, self._scheduler.queue, conf,
+                                         request_log=self._request_log)
 
         self._runner.add_engine_listener(self._on_engine_event)
 
@@ -160,6 +180,7 @@ class Session(dict):
         def4ult = False if is_windows else True
         settings.group('main').specify_default('autoUpdate', def4ult)
         settings.group('main').specify_default('missings', 'NA')
+        settings.group('main').specify_default('importSampleSize', 0)
         settings.group('main').specify_default('selectedLanguage', '')
         settings.group('main').specify_default('updateStatus', 'na')
 
@@ -199,6 +220,10 @@ class Session(dict):
     def add_options_changed_listener(self, listener):
         self._analysis_listeners.append(listener)
 
+    def remove_options_changed_listener(self, listener):
+        if listener in self._analysis_listeners:
+            self._analysis_listeners.remove(listener)
+
     def add_session_listener(self, listener):
         self._session_listeners.append(listener)
 
@@ -215,6 +240,27 @@ class Session(dict):
     def analyses(self):
         return self._analyses
 
+    def prioritise_analyses(self, instance_id, *, visible=None, editing=None):
+        self._scheduler.prioritise(instance_id, visible=visible, editing=editing)
+
+    @property
+    def metrics(self):
+        # queue and engine metrics, for tuning the engine limits
+        return self._scheduler.metrics
+
+    @property
+    def request_log(self):
+        # the timings and sizes of recent analysis requests
+        return self._request_log
+
+    def profile(self):
+        # the metrics, and the recent requests, totalled by analysis
+        return {
+            'metrics': self.metrics,
+            'analyses': self._request_log.summary(),
+            'requests': self._request_log.records,
+        }
+
     def notify_global_changes(self):
         for instance in self.values():
             if instance.is_active:
@@ -456,6 +502,12 @@ class Session(dict):
                         self._notify(notif)
                         last_time_limit_warning += 30
         finally:
+            self._scheduler.stop()
+            if isinstance(self._runner, EngineManager):
+                try:
+                    await self._runner.stop()
+                except Exception as e:
+                    log.exception(e)
             if self._settings is not None:
                 try:
                     await self._settings.flush()
@@ -493,6 +545,9 @@ class SessionAnalyses:
     def add_options_changed_listener(self, listener):
         self._session.add_options_changed_listener(listener)
 
+    def remove_options_changed_listener(self, listener):
+        self._session.remove_options_changed_listener(listener)
+
     @property
     def needs_init(self):
         return AnalysisIterator(self, True)
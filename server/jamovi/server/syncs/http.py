@@ -1,9 +1,15 @@
 
 from asyncio import create_task
+from asyncio import get_event_loop
+from asyncio import gather
+from asyncio import sleep
 from tempfile import mkstemp
+from tempfile import TemporaryDirectory
 from ssl import SSLContext
 from urllib import parse
+from collections import OrderedDict
 import os
+import shutil
 from enum import Enum
 from http.cookies import SimpleCookie
 from dataclasses import dataclass
@@ -15,6 +21,8 @@ from aiohttp import ClientSession
 from aiohttp import ClientResponse
 from aiohttp.client_exceptions import ClientError
 from aiohttp.client_exceptions import ClientResponseError
+from aiohttp.client_exceptions import ClientConnectionError
+from aiohttp.client_exceptions import ClientPayloadError
 
 from jamovi.server.utils import ProgressStream
 from jamovi.server.i18n import _
@@ -90,6 +98,79 @@ def filename_from_url(url: str):
     return filename
 
 
+# files at least this large are downloaded as several ranges at once
+RANGE_MIN_SIZE = 8 * 1024 * 1024
+RANGE_COUNT = 4
+
+# the times a range is resumed after the connection drops
+MAX_RETRIES = 3
+
+# data is written to the file in blocks of this size
+WRITE_SIZE = 256 * 1024
+
+DOWNLOAD_CACHE_SIZE = 512 * 1024 * 1024
+
+TRANSIENT_ERRORS = (ClientConnectionError, ClientPayloadError, TimeoutError)
+
+
+@dataclass
+class CachedDownload:
+    path: str
+    filename: str
+    final_url: str
+    etag: str
+    size: int
+
+
+class DownloadCache:
+
+    # downloaded files, kept so they needn't be downloaded again while the
+    # server reports them unchanged (by their etag). they're kept by url and
+    # request headers, and the least recently used are removed once their
+    # total size exceeds max_size
+
+    def __init__(self, max_size: int = DOWNLOAD_CACHE_SIZE):
+        self._max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._dir: TemporaryDirectory | None = None
+
+    @staticmethod
+    def make_key(url: str, headers: dict | None) -> tuple:
+        return (url, tuple(sorted((headers or { }).items())))
+
+    def get(self, key: tuple) -> CachedDownload | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def put(self, key: tuple, path: str, filename: str, final_url: str, etag: str) -> None:
+        size = os.path.getsize(path)
+        if size > self._max_size:
+            return
+        if self._dir is None:
+            self._dir = TemporaryDirectory()  # assigned to self so it doesn't get cleaned up
+        fd, cache_path = mkstemp(dir=self._dir.name)
+        os.close(fd)
+        await get_event_loop().run_in_executor(None, shutil.copyfile, path, cache_path)
+        self._remove(key)
+        self._entries[key] = CachedDownload(cache_path, filename, final_url, etag, size)
+        self._size += size
+        while self._size > self._max_size:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+_download_cache = DownloadCache()
 
 
 class HttpSync:
@@ -115,6 +196,7 @@ class HttpSync:
 
         self._temp_file = None
         self._temp_file_path = None
+        self._cache_key: tuple | None = None
 
     def matches(self, url: str) -> bool:
         return self._url == url
@@ -141,8 +223,29 @@ class HttpSync:
 
     async def _read(self, stream: ProgressStream) -> None:
         headers = self._options.get('headers', None)
+        self._cache_key = DownloadCache.make_key(self._url, headers)
+        cached = _download_cache.get(self._cache_key)
+        if cached is not None:
+            headers = { **(headers or { }), 'If-None-Match': cached.etag }
         async with self._client.get(self._url, headers=headers) as response:
-            await self._read_response(response, stream)
+            if response.status == 304 and cached is not None:
+                await self._read_cached(cached, response, stream)
+            else:
+                await self._read_response(response, stream)
+
+    async def _read_cached(self, cached: CachedDownload, response: ClientResponse, stream: ProgressStream) -> None:
+        # the file hasn't changed since it was last downloaded
+        self._cookies = response.cookies
+        self._final_url = cached.final_url
+        self._filename = cached.filename
+
+        _, dotext = os.path.splitext(cached.filename)
+        fd, self._temp_file_path = mkstemp(suffix=dotext)
+        os.close(fd)
+        await get_event_loop().run_in_executor(None, shutil.copyfile, cached.path, self._temp_file_path)
+
+        ext = dotext[1:].lower()
+        stream.set_result(HttpSyncFileInfo(self._temp_file_path, cached.filename, ext))
 
     async def __write(self, content: BinaryIO, content_size: int, overwrite: bool, stream: ProgressStream) -> None:
         try:
@@ -175,35 +278,122 @@ class HttpSync:
 
         _, dotext = os.path.splitext(filename)
         fd, self._temp_file_path = mkstemp(suffix=dotext)
+        os.close(fd)
 
-        try:
-            self._temp_file = os.fdopen(fd, 'wb')
-
-            if dotext != '':
-                ext = dotext[1:].lower()
-            else:
-                ext = ''
-
-            p = 0
-            n = 1
-
+        if dotext != '':
+            ext = dotext[1:].lower()
+        else:
+            ext = ''
+
+        # ranges can only be resumed (or read in parallel) if the server
+        # supports them, and the file can be identified, so a range isn't
+        # read from a different version of it
+        etag = response.headers.get('ETag')
+        validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+        resumable = (response.headers.get('Accept-Ranges') == 'bytes'
+                     and content_length is not None
+                     and validator is not None
+                     and response.headers.get('Content-Encoding', 'identity') == 'identity')
+
+        p = 0
+        n = content_length or 1
+
+        def progress(n_bytes):
+            nonlocal p
             if content_length:
-                n = content_length
+                p += n_bytes
+                stream.write(p / n)
+
+        stream.write(p / n)
 
-            stream.write(p / n)
+        try:
+            if resumable and content_length >= RANGE_MIN_SIZE:
+                size = -(-content_length // RANGE_COUNT)
+                ranges = [ (start, min(start + size, content_length)) for start in range(0, content_length, size) ]
+                # the first range is read from the response already open
+                tasks = [
+                    create_task(self._read_range(start, end, response if start == 0 else None, validator, True, progress))
+                    for start, end in ranges ]
+                try:
+                    await gather(*tasks)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+            else:
+                await self._read_range(0, content_length, response, validator, resumable, progress)
+        except BaseException:
+            os.remove(self._temp_file_path)
+            raise
 
-            async for data in response.content.iter_any():
-                self._temp_file.write(data)
-                if content_length:
-                    p += len(data)
-                    stream.write(p / n)
-        finally:
-            if self._temp_file is not None:
-                self._temp_file.close()
+        if (self._cache_key is not None
+                and etag is not None
+                and response.headers.get('Content-Encoding', 'identity') == 'identity'):
+            await _download_cache.put(self._cache_key, self._temp_file_path, filename, self._final_url, etag)
 
         info = HttpSyncFileInfo(self._temp_file_path, filename, ext)
         stream.set_result(info)
 
+    async def _read_range(self, start: int, end: int | None, response: ClientResponse | None,
+                          validator: str | None, resumable: bool, progress) -> None:
+
+        # reads the bytes from start to end into the temp file. if there's no
+        # response, they're requested, and if the connection drops, the rest
+        # of them are requested again
+
+        loop = get_event_loop()
+        offset = start
+        retries = 0
+
+        with open(self._temp_file_path, 'r+b') as file:
+            file.seek(start)
+
+            while end is None or offset < end:
+                buffer = bytearray()
+                try:
+                    if response is None:
+                        headers = { **(self._options.get('headers') or { }) }
+                        headers['Range'] = f'bytes={ offset }-{ end - 1 }'
+                        headers['If-Range'] = validator
+                        response = await self._client.get(self._final_url, headers=headers)
+                        content_range = response.headers.get('Content-Range', '')
+                        if response.status != 206 or not content_range.startswith(f'bytes { offset }-'):
+                            response.release()
+                            raise ValueError(_('The file changed while it was being downloaded'))
+
+                    try:
+                        async for data in response.content.iter_any():
+                            if end is not None:
+                                data = data[:end - offset - len(buffer)]
+                            buffer += data
+                            if len(buffer) >= WRITE_SIZE:
+                                await loop.run_in_executor(None, file.write, buffer)
+                                offset += len(buffer)
+                                progress(len(buffer))
+                                buffer = bytearray()
+                            if end is not None and offset + len(buffer) >= end:
+                                break
+                    finally:
+                        response.release()
+                        response = None
+
+                    if buffer:
+                        await loop.run_in_executor(None, file.write, buffer)
+                        offset += len(buffer)
+                        progress(len(buffer))
+
+                    if not resumable:
+                        break
+                    if offset < end:
+                        # the server ended the response early
+                        raise ClientPayloadError(f'Response ended at { offset } of { end }')
+
+                except TRANSIENT_ERRORS as e:
+                    if not resumable or retries >= MAX_RETRIES:
+                        raise
+                    retries += 1
+                    log.debug('resuming download at %s: %s', offset, e)
+                    await sleep(retries)
+
     @property
     def shareable(self) -> Iterable[Shareable]:
         return (Shareable.READ_ONLY, )
@@ -1,7 +1,8 @@
 
-import aiohttp
 from aiohttp import web
 
+from . import httpclient
+
 # Headers not safe to forward between proxy and upstream
 _HOP_BY_HOP = frozenset({
     'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
@@ -35,15 +36,15 @@ async def forward_handler(
 
     resp = web.StreamResponse()
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=forward_headers) as upstream:
-            resp.set_status(upstream.status)
-            for key, value in upstream.headers.items():
-                if key.lower() not in _HOP_BY_HOP:
-                    resp.headers[key] = value
-            await resp.prepare(request)
-            async for chunk in upstream.content.iter_chunked(64 * 1024):
-                await resp.write(chunk)
+    session = httpclient.get_client()
+    async with session.get(url, headers=forward_headers) as upstream:
+        resp.set_status(upstream.status)
+        for key, value in upstream.headers.items():
+            if key.lower() not in _HOP_BY_HOP:
+                resp.headers[key] = value
+        await resp.prepare(request)
+        async for chunk in upstream.content.iter_chunked(64 * 1024):
+            await resp.write(chunk)
 
     await resp.write_eof()
     return resp
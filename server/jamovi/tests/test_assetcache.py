@@ -0,0 +1,89 @@
+"""Tests for the cache of static files."""
+
+import gzip
+import os
+from os import path
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from jamovi.server.assetcache import AssetCache
+
+
+@pytest.mark.asyncio
+async def test_assets_are_revalidated(temp_dir: str):
+    """assets are compressed, validated by etag, and reloaded when changed"""
+
+    # GIVEN a javascript file, served from the cache
+    file_path = path.join(temp_dir, "bundle.js")
+    with open(file_path, "w") as file:
+        file.write("var x = 1;\n" * 200)
+    cache = AssetCache()
+    request = make_mocked_request("GET", "/bundle.js", headers={"Accept-Encoding": "gzip"})
+    response = await cache.serve(request, file_path)
+
+    # THEN it's sent compressed, with an etag
+    assert response.status == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.body) == b"var x = 1;\n" * 200
+    etag = response.headers["ETag"]
+
+    # WHEN the client already has it
+    headers = {"Accept-Encoding": "gzip", "If-None-Match": etag}
+    request = make_mocked_request("GET", "/bundle.js", headers=headers)
+    response = await cache.serve(request, file_path)
+
+    # THEN it's not sent again, and caches still know it varies
+    assert response.status == 304
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+    # WHEN a client which doesn't accept gzip has that etag
+    request = make_mocked_request("GET", "/bundle.js", headers={"If-None-Match": etag})
+    response = await cache.serve(request, file_path)
+
+    # THEN the uncompressed file is sent, with an etag of its own
+    assert response.status == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] != etag
+
+    # WHEN the file changes
+    with open(file_path, "w") as file:
+        file.write("var x = 2;\n")
+    os.utime(file_path, ns=(0, 1_000_000_000))
+    response = await cache.serve(request, file_path)
+
+    # THEN the new contents are sent, uncompressed as the client doesn't accept it
+    assert response.status == 200
+    assert response.headers["ETag"] != etag
+    assert "Content-Encoding" not in response.headers
+    assert response.body == b"var x = 2;\n"
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_are_evicted(temp_dir: str):
+    """the cache is kept within its maximum size"""
+
+    # GIVEN a cache with room for two files
+    cache = AssetCache(max_size=2000)
+    paths = [ ]
+    for name in ("a.bin", "b.bin", "c.bin"):
+        paths.append(path.join(temp_dir, name))
+        with open(paths[-1], "wb") as file:
+            file.write(bytes(1000))
+
+    # WHEN a third is read
+    await cache.get(paths[0])
+    await cache.get(paths[1])
+    await cache.get(paths[0])
+    await cache.get(paths[2])
+
+    # THEN the least recently used is removed
+    assert paths[0] in cache
+    assert paths[1] not in cache
+    assert paths[2] in cache
+    assert cache.size == 2000
+
+    # AND missing files raise
+    with pytest.raises(FileNotFoundError):
+        await cache.get(path.join(temp_dir, "missing.bin"))
@@ -0,0 +1,147 @@
+"""Tests for computed columns."""
+
+import logging
+
+import numpy as np
+import pytest
+
+from jamovi.server.compute import Vectoriser
+from jamovi.server.instancemodel import InstanceModel
+from jamovi.server.dataset import ColumnType
+from jamovi.server.dataset import DataType
+from jamovi.server.dataset import MeasureType
+
+from .conftest import equals
+
+
+NAN = float("nan")
+NAN_INT = -2147483648
+
+
+@pytest.fixture
+def model(instance_model: InstanceModel) -> InstanceModel:
+    """a model with a decimal, an integer, and a text column"""
+    model = instance_model
+    model.set_log(logging.getLogger(__name__))
+    model.set_row_count(6)
+
+    x = model.append_column("x")
+    x.change(data_type=DataType.DECIMAL, measure_type=MeasureType.CONTINUOUS)
+    x.set_values(0, [1.5, -2.0, NAN, 0.0, 4.25, 8.0])
+
+    k = model.append_column("k")
+    k.change(data_type=DataType.INTEGER, measure_type=MeasureType.CONTINUOUS)
+    k.set_values(0, [3, 0, 1, NAN_INT, -4, 2])
+
+    t = model.append_column("t")
+    t.change(data_type=DataType.TEXT, measure_type=MeasureType.NOMINAL)
+    t.set_values(0, ["a", "b", "a", "", "b", "a"])
+
+    return model
+
+
+@pytest.mark.parametrize(
+    "formula",
+    [
+        "Z(x) + LN(x)",
+        "x * 2 - k",
+        "k // 2",
+        "k % 2",
+        "x / k",
+        "0 < x < 5",
+        "x > 0 and k",
+        "MEAN(x, k, ignore_missing=1)",
+        "SQRT(x) + EXP(k)",
+        "BOXCOX(x)",
+        "IF(x > 1, x, k)",
+        "OFFSET(x, 2)",
+        "VSTDEV(x, group_by=t)",
+        "IF(t == 'a', x, k)",
+        "RANK(x, group_by=t)",
+    ],
+)
+def test_vectorised_recalc(model: InstanceModel, formula: str):
+    """Evaluating a column at a time matches evaluating row by row"""
+
+    # GIVEN two computed columns with the same formula
+    vectorised, row_wise = computed(model, formula)
+
+    # WHEN one is evaluated a column at a time, and the other row by row
+    vectorised.recalc()
+    row_wise.recalc()
+
+    # THEN the values are the same
+    for row_no in range(model.row_count):
+        assert equals(vectorised.get_value(row_no), row_wise.get_value(row_no))
+
+
+def test_vectorised_recalc_missing_and_filtered(model: InstanceModel):
+    """Missing values and filtered rows are treated as they are row by row"""
+
+    # GIVEN a filter, and a column with missing values
+    filt = model.insert_column(0, "filter")
+    filt.column_type = ColumnType.FILTER
+    filt.formula = "x != 0"
+    filt.parse_formula()
+    filt.set_needs_recalc()
+    filt.recalc()
+    model["k"].set_missing_values(["== 3", "< 0"])
+
+    # WHEN formulas using them are evaluated both ways
+    vectorised, row_wise = computed(model, "k + VMEAN(x)")
+    vectorised.recalc()
+    row_wise.recalc()
+
+    # THEN the values are the same
+    expected = [ NAN, 2.9375, NAN, NAN, NAN, 4.9375 ]
+    for row_no in range(model.row_count):
+        assert equals(vectorised.get_value(row_no), expected[row_no])
+        assert equals(row_wise.get_value(row_no), expected[row_no])
+
+
+def test_vectorised_recalc_range(model: InstanceModel):
+    """Only the rows asked for are evaluated"""
+
+    # GIVEN a computed column, evaluated a column at a time
+    vectorised, _ = computed(model, "x * 2 + VSUM(k)")
+    vectorised.recalc()
+    before = [ vectorised.get_value(row_no) for row_no in range(model.row_count) ]
+
+    # WHEN its inputs change, and only some of its rows are evaluated
+    model["x"].set_values(0, [ 1.0 ] * model.row_count)
+    vectorised.set_needs_recalc()
+    vectorised.recalc(2, 4)
+
+    # THEN only those rows change
+    after = [ vectorised.get_value(row_no) for row_no in range(model.row_count) ]
+    assert equals(after[:2], before[:2])
+    assert equals(after[2:4], [ 4.0, 4.0 ])
+    assert equals(after[4:], before[4:])
+
+
+def test_vectorised_group_by_list(model: InstanceModel):
+    """Column functions giving a value per row can't be split by group"""
+
+    # GIVEN a column function with a group by, which gives a list
+    column, _ = computed(model, "RANK(x, group_by=t)")
+
+    # WHEN it's evaluated a column at a time
+    vectoriser = Vectoriser(model, model.row_count)
+    values, errors = vectoriser.evaluate(column._node, False)
+
+    # THEN the rows are errors, as they are row by row
+    assert errors.all()
+    assert np.isnan(values).all()
+
+
+def computed(model: InstanceModel, formula: str) -> tuple:
+    """two computed columns with the same formula, the second evaluated row by row"""
+    vectorised = model.append_column("vectorised")
+    row_wise = model.append_column("row_wise")
+    for column in (vectorised, row_wise):
+        column.column_type = ColumnType.COMPUTED
+        column.formula = formula
+        column.parse_formula()
+        column.set_needs_recalc()
+    row_wise._recalc_vectorised = lambda start, end: False
+    return vectorised, row_wise
@@ -0,0 +1,105 @@
+"""Tests for importing CSV files."""
+
+from os import path
+
+import pytest
+
+from jamovi.server.instancemodel import InstanceModel
+from jamovi.server.instance import Instance
+from jamovi.server.dataset import Store
+from jamovi.server.formatio import csv
+from jamovi.server.formatio.reader import Reader
+
+from .conftest import equals
+
+
+CONTENT = (
+    'num,euro,text,mixed,id\n'
+    '1,"1,5",a,1,x1\n'
+    '2,"-2,25","b, with a comma",2,x2\n'
+    'NA,,"c\n'
+    'over two lines",3,x3\n'
+    '4,"3,0",a,,x4\n'
+    '\n'
+    '5,"0,125","d ""quoted""",five,x5\n'
+    '6\n'
+    ',,,,\n'
+    '\n'
+)
+
+
+@pytest.fixture
+def csv_path(temp_dir: str) -> str:
+    """a csv file with quoted values, empty rows, and mixed columns"""
+    csv_path = path.join(temp_dir, "test.csv")
+    with open(csv_path, "w", encoding="utf-8", newline="") as file:
+        file.write(CONTENT)
+    return csv_path
+
+
+def test_chunked_read(
+    instance_model: InstanceModel,
+    instance: Instance,
+    shared_memory_store: Store,
+    csv_path: str,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """reading in chunks is the same as reading a row at a time"""
+
+    # GIVEN a csv file split into many small chunks
+    monkeypatch.setattr(csv, "CHUNK_SIZE", 8)
+    monkeypatch.setattr(csv.os, "cpu_count", lambda: 1)
+
+    # WHEN it is read in chunks, and a row at a time
+    chunked = instance_model
+    csv.read(chunked, csv_path, lambda p: None, settings={})
+
+    row_wise = InstanceModel(instance)
+    row_wise._dataset = shared_memory_store.create_dataset()
+    reader = csv.CSVReader({})
+    Reader.read_into(reader, row_wise, csv_path, lambda p: None)
+
+    # THEN the columns are the same
+    assert chunked.row_count == row_wise.row_count == 7
+    assert chunked.column_count == row_wise.column_count
+    for column in row_wise:
+        other = chunked[column.name]
+        assert other.data_type is column.data_type
+        assert other.measure_type is column.measure_type
+        assert other.dps == column.dps
+        assert other.levels == column.levels
+        for row_no in range(row_wise.row_count):
+            assert equals(other.get_value(row_no), column.get_value(row_no))
+
+
+def test_sampled_read(
+    instance_model: InstanceModel,
+    instance: Instance,
+    shared_memory_store: Store,
+    csv_path: str,
+):
+    """inferring types from a sample is the same as examining every row"""
+
+    # GIVEN a csv file where the later rows contradict the first rows
+
+    # WHEN it is read with a sample of two rows, and without sampling
+    sampled = instance_model
+    reader = csv.CSVReader({"importSampleSize": 2})
+    Reader.read_into(reader, sampled, csv_path, lambda p: None)
+
+    full = InstanceModel(instance)
+    full._dataset = shared_memory_store.create_dataset()
+    reader = csv.CSVReader({})
+    Reader.read_into(reader, full, csv_path, lambda p: None)
+
+    # THEN the columns are the same
+    assert sampled.row_count == full.row_count == 7
+    assert sampled.column_count == full.column_count
+    for column in full:
+        other = sampled[column.name]
+        assert other.data_type is column.data_type
+        assert other.measure_type is column.measure_type
+        assert other.dps == column.dps
+        assert other.levels == column.levels
+        for row_no in range(full.row_count):
+            assert equals(other.get_value(row_no), column.get_value(row_no))
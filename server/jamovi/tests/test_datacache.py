@@ -0,0 +1,69 @@
+"""Tests for the spreadsheet cell cache."""
+
+import pytest
+
+from jamovi.server.dataset.datacache import DataCache
+from jamovi.server.dataset.datacache import CellRange
+
+
+class Source:
+    """cell values derived from their position, counting the retrievals"""
+
+    def __init__(self):
+        self.retrievals = []
+        self.version = 0
+
+    def get_values(self, row_start, column_start, row_end, column_end):
+        self.retrievals.append((row_start, column_start, row_end, column_end))
+        return tuple(
+            tuple(
+                (row, column, self.version)
+                for column in range(column_start, column_end + 1)
+            )
+            for row in range(row_start, row_end + 1)
+        )
+
+
+@pytest.fixture
+def source() -> Source:
+    return Source()
+
+
+def test_invalidate_overlapping_tiles(source: Source):
+    """only the tiles overlapping a changed range are retrieved again"""
+
+    # GIVEN a cache holding four tiles
+    cache = DataCache(source.get_values, tile_rows=10, tile_columns=5, prefetch=False)
+    for row, column in ((0, 0), (0, 5), (10, 0), (10, 5)):
+        assert cache.get_value(row, column) == (row, column, 0)
+    assert len(source.retrievals) == 4
+
+    # WHEN a cell in one of them changes
+    source.version = 1
+    cache.invalidate(CellRange(12, 3, 12, 3))
+
+    # THEN only that tile is retrieved again
+    assert cache.get_value(12, 3) == (12, 3, 1)
+    assert cache.get_value(0, 0) == (0, 0, 0)
+    assert cache.get_value(0, 5) == (0, 5, 0)
+    assert cache.get_value(10, 5) == (10, 5, 0)
+    assert source.retrievals[4:] == [(10, 0, 19, 4)]
+
+
+def test_prefetch_when_scrolling(source: Source):
+    """scrolling into a tile retrieves the next tile along with it"""
+
+    # GIVEN a cache with the first tile retrieved
+    cache = DataCache(source.get_values, tile_rows=10, tile_columns=5)
+    assert cache.get_value(9, 0) == (9, 0, 0)
+
+    # WHEN scrolling down through the following tiles
+    for row in range(10, 40):
+        assert cache.get_value(row, 2) == (row, 2, 0)
+
+    # THEN the tiles are retrieved two at a time
+    assert source.retrievals == [
+        (0, 0, 9, 4),
+        (10, 0, 29, 4),
+        (30, 0, 49, 4),
+    ]
@@ -1,11 +1,17 @@
 """Tests for the dataset class."""
 
+import importlib.util
+from os import path
 import math
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pytest
 
 from jamovi.server.dataset import DataSet
 from jamovi.server.dataset import DataType
+from jamovi.server.dataset import MeasureType
+from jamovi.server.dataset import Store
 
 from .conftest import equals
 
@@ -133,3 +139,146 @@ def test_set_values(empty_dataset: DataSet):
         for row_index, expected_value in enumerate(expected_column_values):
             obs_value = ds[column_index].get_value(row_index)
             assert equals(obs_value, expected_value)
+
+
+@pytest.mark.parametrize(
+    ("data_type", "dtype"),
+    [
+        (DataType.INTEGER, np.int32),
+        (DataType.DECIMAL, np.float64),
+    ],
+)
+def test_raw_values(empty_dataset: DataSet, data_type: DataType, dtype):
+    """test set_raw_values() and get_raw_values() across blocks"""
+    ds = empty_dataset
+
+    # GIVEN a column spanning several blocks of storage
+    column = ds.append_column("fred")
+    column.set_data_type(data_type)
+    ds.set_row_count(20000)
+
+    # WHEN writing a run of values from a buffer
+    values = np.arange(19000, dtype=dtype) - 9000
+    values[5] = NAN_INT if data_type is DataType.INTEGER else NAN
+    column.set_raw_values(500, values)
+
+    # THEN they can be read back in bulk, and cell by cell
+    assert np.array_equal(column.get_raw_values(500, 19000), values, equal_nan=True)
+    assert column.get_raw_values(0, 1).dtype == dtype
+    for row_no in (500, 505, 8687, 8688, 19499):
+        assert equals(column.get_value(row_no), values[row_no - 500].item())
+
+    # AND reading or writing beyond the end of the column fails
+    with pytest.raises(IndexError):
+        column.get_raw_values(19999, 2)
+    with pytest.raises(IndexError):
+        column.set_raw_values(19999, values[:2])
+
+
+@pytest.mark.skipif(importlib.util.find_spec("duckdb") is None, reason="requires duckdb")
+def test_duckdb_set_values(duckdb_store: Store):
+    """setting a block of values in a duckdb data set"""
+    ds = duckdb_store.create_dataset()
+    ds.attach()
+    ds.set_row_count(5)
+
+    # GIVEN columns of each type
+    integers = ds.append_column("integers")
+    decimals = ds.append_column("decimals")
+    decimals.change(data_type=DataType.DECIMAL, measure_type=MeasureType.CONTINUOUS)
+    labels = ds.append_column("labels")
+    labels.change(data_type=DataType.TEXT, measure_type=MeasureType.NOMINAL)
+    ids = ds.append_column("ids")
+    ids.change(data_type=DataType.TEXT, measure_type=MeasureType.ID)
+
+    # WHEN setting a block of values in them
+    ds.set_values(
+        [0, 1, 2, 3],
+        1,
+        [
+            [3, NAN_INT, 7, 9],
+            np.array([1.5, NAN, -2.0, 0.25]),
+            ["b", "a", "", "b"],
+            ["x", "y", None, "z"],
+        ],
+    )
+
+    # THEN they are persisted, with new levels added
+    assert [integers.get_value(i) for i in range(5)] == [NAN_INT, 3, NAN_INT, 7, 9]
+    assert all(
+        equals(x, y)
+        for x, y in zip(decimals.get_values(1, 4), [1.5, NAN, -2.0, 0.25])
+    )
+    assert [level[1] for level in labels.levels] == ["b", "a"]
+    assert labels.get_values(1, 4) == ["b", "a", "", "b"]
+    assert ids.get_values(1, 4) == ["x", "y", "", "z"]
+
+    ds.detach()
+
+
+@pytest.mark.skipif(importlib.util.find_spec("duckdb") is None, reason="requires duckdb")
+def test_duckdb_read_from_thread(duckdb_store: Store):
+    """reading a duckdb data set from another thread, between attachments"""
+    ds = duckdb_store.create_dataset()
+    ds.attach()
+    ds.set_row_count(3)
+    ds.append_column("fred")
+    ds.set_values(0, 0, [[4, 5, 6]])
+    ds.detach()
+
+    # GIVEN the data set attached again
+    ds.attach()
+
+    # WHEN its values are read from another thread
+    with ThreadPoolExecutor(1) as executor:
+        values = executor.submit(ds.get_values, 0, 0, 2, 0).result()
+
+    # THEN the values written before detaching are read
+    assert [row[2] for row in values] == [4, 5, 6]
+
+    ds.detach()
+
+
+@pytest.mark.skipif(importlib.util.find_spec("duckdb") is None, reason="requires duckdb")
+def test_duckdb_cursors_are_released(duckdb_store: Store):
+    """the cursors of threads which have ended are closed"""
+    ds = duckdb_store.create_dataset()
+    ds.attach()
+    ds.set_row_count(3)
+    ds.append_column("fred")
+    ds.set_values(0, 0, [[4, 5, 6]])
+    ds.detach()
+    ds.attach()
+
+    # WHEN the data set is read from one thread after another
+    for _ in range(5):
+        with ThreadPoolExecutor(1) as executor:
+            values = executor.submit(ds.get_values, 0, 0, 2, 0).result()
+        assert [row[2] for row in values] == [4, 5, 6]
+
+    # THEN only the most recent thread's cursor is kept
+    assert len(duckdb_store._cursors) == 1
+
+    ds.detach()
+
+
+@pytest.mark.skipif(importlib.util.find_spec("duckdb") is None, reason="requires duckdb")
+def test_duckdb_checkpoint(duckdb_store: Store, temp_dir: str):
+    """checkpointing writes the changes in the log to the database file"""
+    ds = duckdb_store.create_dataset()
+    ds.attach()
+    ds.set_row_count(3)
+    ds.append_column("fred")
+    ds.set_values(0, 0, [[4, 5, 6]])
+    ds.detach()
+
+    # GIVEN changes in the write-ahead log
+    wal_path = path.join(temp_dir, "fred.duckdb.wal")
+    assert path.getsize(wal_path) > 0
+
+    # WHEN the store is checkpointed (from another thread, as after a save)
+    with ThreadPoolExecutor(1) as executor:
+        executor.submit(duckdb_store.checkpoint).result()
+
+    # THEN the log is emptied
+    assert not path.exists(wal_path) or path.getsize(wal_path) == 0
@@ -0,0 +1,82 @@
+"""Tests for the shared http client."""
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from jamovi.server import httpclient
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared():
+    """the client is shared, and replaced once closed"""
+
+    # GIVEN the shared client, and clients of their own for two instances
+    client = httpclient.get_client()
+    first = httpclient.create_client(block_local=True)
+    second = httpclient.create_client(block_local=True)
+
+    # THEN they share connections, and only those for users' files block the local network
+    assert httpclient.get_client() is client
+    assert first is not second
+    assert first.connector is second.connector
+    assert isinstance(first.connector, httpclient.BlockLocalConnector)
+    assert not isinstance(client.connector, httpclient.BlockLocalConnector)
+
+    # WHEN an instance's client is closed
+    await first.close()
+
+    # THEN the connections stay open for the others
+    assert not second.connector.closed
+
+    # WHEN they're closed
+    await second.close()
+    await httpclient.close()
+
+    # THEN new ones are made
+    assert client.closed
+    replacement = httpclient.get_client()
+    assert replacement is not client
+    await httpclient.close()
+
+
+def cookie_app() -> web.Application:
+    """a server which sets a cookie, and echoes the cookies sent to it"""
+
+    async def handler(request: web.Request) -> web.Response:
+        response = web.Response(text=request.headers.get("Cookie", ""))
+        response.set_cookie("session", "secret")
+        return response
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_cookies_are_not_shared():
+    """cookies set for one request aren't sent with the next"""
+
+    # GIVEN a server which sets a cookie
+    async with TestServer(cookie_app()) as server:
+        url = server.make_url("/").with_host("localhost")
+        client = httpclient.get_client()
+        instance_client = httpclient.create_client()
+
+        # WHEN it's requested twice, by the shared client and an instance's
+        async with client.get(url) as response:
+            assert "session" in response.cookies
+        async with client.get(url) as response:
+            shared = await response.text()
+        async with instance_client.get(url) as response:
+            first = await response.text()
+        async with instance_client.get(url) as response:
+            second = await response.text()
+
+        # THEN the shared client doesn't send the cookie back, and the instance's does
+        assert shared == ""
+        assert first == ""
+        assert second == "session=secret"
+
+    await instance_client.close()
+    await httpclient.close()
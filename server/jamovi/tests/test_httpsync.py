@@ -0,0 +1,73 @@
+"""Tests for reading files from http servers."""
+
+import pytest
+from aiohttp import web
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+from jamovi.server.syncs import http
+from jamovi.server.syncs.http import HttpSync
+
+CONTENT = bytes(range(256)) * 400
+ETAG = '"v1"'
+
+
+def make_app(requests: list) -> web.Application:
+    """a file server, supporting ranges, whose first range request fails part way"""
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        requests.append(request.headers.get("Range"))
+        headers = {"ETag": ETAG, "Accept-Ranges": "bytes"}
+        if request.headers.get("If-None-Match") == ETAG:
+            return web.Response(status=304, headers=headers)
+        range_header = request.headers.get("Range")
+        if range_header is None:
+            return web.Response(body=CONTENT, headers=headers)
+        start, end = map(int, range_header.removeprefix("bytes=").split("-"))
+        body = CONTENT[start:end + 1]
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(CONTENT)}"
+        response = web.StreamResponse(status=206, headers=headers)
+        response.content_length = len(body)
+        await response.prepare(request)
+        if len(requests) == 2:
+            # the connection drops
+            await response.write(body[:len(body) // 2])
+            request.transport.close()
+            return response
+        await response.write(body)
+        return response
+
+    app = web.Application()
+    app.router.add_get("/data.csv", handler)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_ranged_download(monkeypatch):
+    """files are read in ranges, resumed, and not downloaded twice"""
+
+    # GIVEN a server, and a file large enough to read in ranges
+    monkeypatch.setattr(http, "RANGE_MIN_SIZE", 1024)
+    monkeypatch.setattr(http, "_download_cache", http.DownloadCache())
+    requests: list = [ ]
+
+    async with TestServer(make_app(requests)) as server, ClientSession(raise_for_status=True) as client:
+        url = str(server.make_url("/data.csv"))
+
+        # WHEN it's read, and the connection drops during a range
+        info = await HttpSync(url, { }, client).read()
+
+        # THEN the file is complete, with the rest of the range requested again
+        with open(info.url, "rb") as file:
+            assert file.read() == CONTENT
+        assert len(requests) == http.RANGE_COUNT + 1
+
+        # WHEN it's read again
+        del requests[:]
+        info = await HttpSync(url, { }, client).read()
+
+        # THEN it isn't downloaded again
+        assert requests == [ None ]
+        with open(info.url, "rb") as file:
+            assert file.read() == CONTENT
+        assert info.filename == "data.csv"
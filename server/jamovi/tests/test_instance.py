@@ -0,0 +1,35 @@
+"""Tests for the instance."""
+
+import pytest
+
+from jamovi.server.analyses import Analysis
+from jamovi.server.analyses.analysis import AnalysisOutputs
+from jamovi.server.analyses.analysis import OptionOutputs
+from jamovi.server.analyses.analysis import Output
+from jamovi.server.dataset import ColumnType
+from jamovi.server.dataset import MeasureType
+from jamovi.server.instance import Instance
+from jamovi.server.options import Options
+
+
+@pytest.mark.asyncio
+async def test_outputs_without_data(instance: Instance, empty_dataset):
+    """outputs sent without their data still create and assign the columns"""
+
+    # GIVEN an analysis with an output option
+    model = instance._data
+    model._dataset = empty_dataset
+    model.set_row_count(3)
+    options = Options.create([{"name": "resids", "type": "Output"}])
+    options.set_value("resids", {"value": True, "vars": [], "synced": []})
+    analysis = Analysis(model, 1, "linreg", "jmv", options, None, True)
+
+    # WHEN its outputs arrive without their data (as in intermediate results)
+    output = Output("resids", "Residuals", "", MeasureType.CONTINUOUS, None, [])
+    outputs = AnalysisOutputs(1, [OptionOutputs("resids", [output])])
+    await instance._write_outputs(analysis, outputs)
+
+    # THEN the column is created, and assigned to the option
+    column = model["Residuals"]
+    assert column.column_type is ColumnType.OUTPUT
+    assert options.get_value("resids")["vars"] == ["Residuals"]
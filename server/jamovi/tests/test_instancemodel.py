@@ -0,0 +1,154 @@
+"""Tests for the instance model."""
+
+from os import path
+from types import SimpleNamespace
+
+import pytest
+
+from jamovi.server import instancemodel
+from jamovi.server.dataset import DataType
+from jamovi.server.dataset import MeasureType
+from jamovi.server.dataset import StoreFactory
+from jamovi.server.instance import Instance
+from jamovi.server.instancemodel import InstanceModel
+from jamovi.server import snapshots
+
+
+def write_buffer(model: InstanceModel, content: bytes):
+    """stands in for the data set's memory map"""
+    with open(model._instance.buffer_path, "wb") as file:
+        file.write(content)
+
+
+async def copied(model: InstanceModel, snapshot_id: int):
+    """waits for the snapshot to be copied"""
+    request = SimpleNamespace(instanceId=model._instance.id, snapshot=snapshot_id)
+    await snapshots.ready(request)
+    assert request.snapshot == snapshot_id
+
+
+def read_snapshot(model: InstanceModel, snapshot_id: int) -> bytes:
+    """the contents of a snapshot"""
+    with open(model._snapshot_path(snapshot_id), "rb") as file:
+        return file.read()
+
+
+@pytest.mark.asyncio
+async def test_snapshots(instance_model: InstanceModel):
+    """snapshots are copied once per version, and kept while they're read"""
+
+    # GIVEN a snapshot of the data set, read by two requests
+    model = instance_model
+    write_buffer(model, b"first")
+    first = model.acquire_snapshot()
+    assert model.acquire_snapshot() == first
+    await copied(model, first)
+
+    # WHEN the data set is edited
+    async with model.attach():
+        write_buffer(model, b"second")
+    second = model.acquire_snapshot()
+    await copied(model, second)
+
+    # THEN later requests read a new snapshot, and the first is unchanged
+    assert second != first
+    assert read_snapshot(model, first) == b"first"
+    assert read_snapshot(model, second) == b"second"
+
+    # WHEN the requests reading the first snapshot are done
+    model.release_snapshot(first)
+    assert path.exists(model._snapshot_path(first))
+    model.release_snapshot(first)
+
+    # THEN it's removed
+    assert not path.exists(model._snapshot_path(first))
+    assert path.exists(model._snapshot_path(second))
+
+
+@pytest.mark.asyncio
+async def test_edits_dont_wait_for_snapshot(instance_model: InstanceModel):
+    """a copy under way when the data set is edited is abandoned"""
+
+    # GIVEN a snapshot being copied
+    model = instance_model
+    write_buffer(model, b"before")
+    snapshot_id = model.acquire_snapshot()
+
+    # WHEN the data set is edited straight away
+    async with model.attach():
+        write_buffer(model, b"after")
+
+    # THEN the request reads the data set itself, and later requests a new copy
+    request = SimpleNamespace(instanceId=model._instance.id, snapshot=snapshot_id)
+    await snapshots.ready(request)
+    assert request.snapshot == 0
+    model.release_snapshot(snapshot_id)
+    assert not path.exists(model._snapshot_path(snapshot_id))
+
+    second = model.acquire_snapshot()
+    await copied(model, second)
+    assert read_snapshot(model, second) == b"after"
+    model.release_snapshot(second)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_during_edit(instance_model: InstanceModel):
+    """a snapshot requested during an edit is copied once it's done"""
+
+    # GIVEN an edit which leaves the data set as it was
+    model = instance_model
+    write_buffer(model, b"unchanged")
+    first = model.acquire_snapshot()
+    await copied(model, first)
+    async with model.attach(new_snapshot=False):
+        # WHEN a snapshot is requested part way through
+        during = model.acquire_snapshot()
+        write_buffer(model, b"unchanged")
+
+    # THEN it's the same version as before the edit
+    assert during == first
+    await copied(model, during)
+
+    # WHEN an edit changes the data set
+    async with model.attach():
+        during = model.acquire_snapshot()
+        write_buffer(model, b"changed")
+
+    # THEN the snapshot requested during it has the change
+    assert during != first
+    await copied(model, during)
+    assert read_snapshot(model, during) == b"changed"
+    model.release_snapshot(first)
+    model.release_snapshot(first)
+    model.release_snapshot(during)
+
+
+@pytest.mark.asyncio
+async def test_import_in_blocks(instance: Instance, instance_model: InstanceModel, temp_dir: str, monkeypatch):
+    """data sets are imported a block of rows at a time"""
+
+    # GIVEN a data set to import, longer than a block
+    monkeypatch.setattr(instancemodel, "IMPORT_BLOCK_SIZE", 4)
+    store = StoreFactory.create(path.join(temp_dir, "source.mm"), "shmem")
+    source = InstanceModel(instance)
+    source._dataset = store.create_dataset()
+    source._dataset.attach()
+    source.set_row_count(10)
+    column = source.append_column("x")
+    column.change(data_type=DataType.DECIMAL, measure_type=MeasureType.CONTINUOUS)
+    column.set_values(0, [ float(i) for i in range(10) ])
+
+    async def sources():
+        yield ("first", source)
+        yield ("second", source)
+
+    # WHEN it's imported twice
+    await instance_model.import_from(sources())
+
+    # THEN every row is copied, with the name of the data set it came from
+    assert instance_model.row_count == 20
+    assert instance_model["x"].get_values(0, 20) == [ float(i) for i in range(10) ] * 2
+    assert instance_model["source"].get_values(0, 20) == [ "first" ] * 10 + [ "second" ] * 10
+
+    source._dataset.detach()
+    store.close()
@@ -0,0 +1,41 @@
+"""Tests for the module definitions."""
+
+import os
+from os import path
+
+from jamovi.server.modules import modules
+from jamovi.server.modules.modules import DEFN_CACHE_NAME
+
+
+def write_defn(module_path: str, title: str):
+    """writes a module definition"""
+    with open(path.join(module_path, "jamovi-full.yaml"), "w") as file:
+        file.write(f"name: mod\ntitle: {title}\nversion: 1.0.0\n")
+
+
+def test_definitions_are_shared(temp_dir: str):
+    """definitions are parsed once, and reparsed when they change"""
+
+    # GIVEN a module definition, read once
+    module_path = path.join(temp_dir, "mod")
+    os.makedirs(module_path)
+    write_defn(module_path, "First")
+    meta_path = path.join(module_path, "jamovi-full.yaml")
+    first = modules._read_defn(meta_path)
+
+    # THEN later reads share it, and it's stored alongside the module
+    assert modules._read_defn(meta_path) is first
+    assert path.exists(path.join(module_path, DEFN_CACHE_NAME))
+
+    # WHEN another process reads it
+    modules._definitions.clear()
+
+    # THEN it's read from the stored copy
+    assert modules._read_defn(meta_path) == { "name": "mod", "title": "First", "version": "1.0.0" }
+
+    # WHEN the definition changes
+    write_defn(module_path, "Second")
+    os.utime(meta_path, ns=(0, 1_000_000_000))
+
+    # THEN it's parsed again
+    assert modules._read_defn(meta_path)["title"] == "Second"
@@ -0,0 +1,66 @@
+"""Tests for reading and writing .omv files."""
+
+from os import path
+
+import pytest
+
+from jamovi.server.instancemodel import InstanceModel
+from jamovi.server.instance import Instance
+from jamovi.server.dataset import DataType
+from jamovi.server.dataset import MeasureType
+from jamovi.server.dataset import Store
+from jamovi.server.formatio import omv
+
+from .conftest import equals
+
+
+NAN = float("nan")
+NAN_INT = -2147483648
+
+COLUMNS = [
+    ("x", DataType.DECIMAL, MeasureType.CONTINUOUS, [1.5, NAN, -2.25, 0.0, 1e300]),
+    ("k", DataType.INTEGER, MeasureType.CONTINUOUS, [3, NAN_INT, -4, 0, 2147483647]),
+    ("g", DataType.INTEGER, MeasureType.NOMINAL, [1, 2, NAN_INT, 2, 1]),
+    ("t", DataType.TEXT, MeasureType.NOMINAL, ["b", "a", "", "b", "c"]),
+    ("id", DataType.TEXT, MeasureType.ID, ["fred", "", "jim", "x" * 1000, "bob"]),
+]
+
+
+@pytest.fixture
+def model(instance_model: InstanceModel) -> InstanceModel:
+    """a model with a column of each type"""
+    model = instance_model
+    model.set_row_count(5)
+    for name, data_type, measure_type, values in COLUMNS:
+        column = model.append_column(name)
+        column.change(data_type=data_type, measure_type=measure_type)
+        column.set_values(0, values)
+    return model
+
+
+def test_round_trip(
+    model: InstanceModel,
+    instance: Instance,
+    shared_memory_store: Store,
+    temp_dir: str,
+):
+    """values survive being written to and read from an .omv file"""
+
+    # GIVEN a data set written to an .omv file
+    omv_path = path.join(temp_dir, "round_trip.omv")
+    omv.write(model, omv_path, lambda p: None)
+
+    # WHEN the file is read into another model
+    read = InstanceModel(instance)
+    read._dataset = shared_memory_store.create_dataset()
+    omv.read(read, omv_path, lambda p: None)
+
+    # THEN the columns, their values and levels are the same
+    assert read.row_count == 5
+    for name, data_type, measure_type, values in COLUMNS:
+        column = read[name]
+        assert column.data_type is data_type
+        assert column.measure_type is measure_type
+        for row_no, value in enumerate(values):
+            assert equals(column.get_value(row_no), value)
+        assert column.levels == model[name].levels
@@ -0,0 +1,36 @@
+"""Tests for the pool of analysis requests."""
+
+import pytest
+
+from jamovi.server.pool import Pool
+from jamovi.server.jamovi_pb2 import AnalysisRequest
+
+
+def request(analysis_id: int) -> AnalysisRequest:
+    """a request for an analysis"""
+    return AnalysisRequest(instanceId="instance", analysisId=analysis_id)
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    """requests are yielded in order of priority"""
+
+    # GIVEN requests queued with different priorities
+    pool = Pool(4)
+    pool.add(request(1), 2)
+    pool.add(request(2), 1)
+    pool.add(request(3), 2)
+
+    # WHEN the priority of a queued request changes
+    pool.set_priority(("instance", 3), 0)
+    pool.add(request(4), 1)
+
+    # THEN they're yielded by priority, the most recent first
+    stream = pool.stream()
+    yielded = [(await anext(stream))[0].analysisId for _ in range(4)]
+    assert yielded == [3, 4, 2, 1]
+
+    metrics = pool.metrics
+    assert metrics["dispatched"] == 4
+    assert metrics["queued"] == 0
+    assert metrics["running"] == 4
@@ -0,0 +1,58 @@
+"""Tests for the log of analysis requests."""
+
+from jamovi.server.requestlog import RequestLog
+from jamovi.server.jamovi_pb2 import AnalysisRequest
+from jamovi.server.jamovi_pb2 import AnalysisResponse
+from jamovi.server.jamovi_pb2 import AnalysisStatus
+
+
+def request(analysis_id: int, revision: int) -> AnalysisRequest:
+    """a request to run a descriptives analysis"""
+    req = AnalysisRequest()
+    req.instanceId = "instance"
+    req.analysisId = analysis_id
+    req.revision = revision
+    req.ns = "jmv"
+    req.name = "descriptives"
+    req.perform = AnalysisRequest.Perform.Value("RUN")
+    return req
+
+
+def test_requests_are_recorded():
+    """each request's sizes and status are recorded, and totalled by analysis"""
+
+    # GIVEN a request log
+    request_log = RequestLog(size=2)
+
+    # WHEN a request runs to completion, and another is cancelled
+    first = request(1, 1)
+    request_log.queued(first)
+    request_log.sent(first)
+    request_log.received(first, 100)
+    request_log.received(first, 50)
+    request_log.done(first, AnalysisResponse(status=AnalysisStatus.Value("ANALYSIS_COMPLETE")))
+
+    second = request(1, 2)
+    request_log.queued(second)
+    request_log.done(second)
+
+    # THEN both are recorded
+    completed, cancelled = request_log.records
+    assert completed["status"] == "complete"
+    assert completed["payload_size"] == 150
+    assert completed["first_result"] is not None
+    assert cancelled["status"] == "cancelled"
+    assert cancelled["duration"] is None
+
+    summary = request_log.summary()["jmv::descriptives"]
+    assert summary["requests"] == 2
+    assert summary["cancelled"] == 1
+    assert summary["payload_size"] == 150
+
+    # WHEN more requests are made than the log holds
+    third = request(2, 1)
+    request_log.queued(third)
+    request_log.done(third, AnalysisResponse(status=AnalysisStatus.Value("ANALYSIS_ERROR")))
+
+    # THEN the oldest is dropped
+    assert [r["status"] for r in request_log.records] == ["cancelled", "error"]
@@ -0,0 +1,141 @@
+"""Tests for the analysis results cache."""
+
+from os import path
+
+import pytest
+
+from jamovi.server.analyses import Analysis
+from jamovi.server.instancemodel import InstanceModel
+from jamovi.server.options import Options
+from jamovi.server.resultscache import ResultsCache
+from jamovi.server import resultscache
+from jamovi.server.resultscache import make_key
+from jamovi.server.jamovi_pb2 import AnalysisResponse
+from jamovi.server.jamovi_pb2 import AnalysisStatus
+from jamovi.server.dataset import DataType
+from jamovi.server.dataset import MeasureType
+
+
+def results(text: str) -> AnalysisResponse:
+    """complete results holding some text"""
+    response = AnalysisResponse()
+    response.status = AnalysisStatus.Value("ANALYSIS_COMPLETE")
+    response.results.preformatted = text
+    return response
+
+
+@pytest.fixture
+def analysis(instance_model: InstanceModel) -> Analysis:
+    """an analysis of one of two columns"""
+    model = instance_model
+    model.set_row_count(3)
+    for name in ("x", "y"):
+        column = model.append_column(name)
+        column.change(data_type=DataType.DECIMAL, measure_type=MeasureType.CONTINUOUS)
+        column.set_values(0, [1.0, 2.0, 3.0])
+
+    options = Options.create(
+        [
+            {"name": "vars", "type": "Variables"},
+            {"name": "mean", "type": "Bool", "default": False},
+        ]
+    )
+    options.set_value("vars", ["x"])
+    return Analysis(model, 1, "descriptives", "jmv", options, None, True)
+
+
+async def set_values(analysis: Analysis, name: str, values: list):
+    """edits a column, as the client does"""
+    async with analysis.dataset.attach():
+        analysis.dataset[name].set_values(0, values)
+
+
+@pytest.mark.asyncio
+async def test_key_follows_options_and_data(analysis: Analysis):
+    """the key changes with the options and the columns used, and only them"""
+
+    # GIVEN the key of an analysis
+    key = make_key(analysis, [1, 0, 0])
+
+    # WHEN a column it doesn't use changes
+    await set_values(analysis, "y", [4.0])
+
+    # THEN the key is the same
+    assert make_key(analysis, [1, 0, 0]) == key
+
+    # WHEN an option, or a column it uses changes
+    analysis.options.set_value("mean", True)
+    changed_options = make_key(analysis, [1, 0, 0])
+    await set_values(analysis, "x", [4.0])
+    changed_data = make_key(analysis, [1, 0, 0])
+
+    # THEN the key changes
+    assert len({key, changed_options, changed_data}) == 3
+
+    # WHEN they're changed back
+    analysis.options.set_value("mean", False)
+    await set_values(analysis, "x", [1.0])
+
+    # THEN the key is the original
+    assert make_key(analysis, [1, 0, 0]) == key
+
+    # ... unless the module has been updated
+    assert make_key(analysis, [1, 0, 1]) != key
+
+    # ... or the results are in another language
+    analysis.dataset.results_language = "de"
+    assert make_key(analysis, [1, 0, 0]) != key
+
+
+@pytest.mark.asyncio
+async def test_fingerprints_are_kept(analysis: Analysis, monkeypatch):
+    """columns are only fingerprinted again once the data set changes"""
+
+    # GIVEN the fingerprints taken
+    taken = [ ]
+    fingerprint = resultscache.fingerprint
+    monkeypatch.setattr(resultscache, "fingerprint", lambda column: taken.append(column.name) or fingerprint(column))
+
+    # WHEN the key is made again, with the data set as it was
+    key = make_key(analysis, [1, 0, 0])
+    analysis.options.set_value("mean", True)
+    make_key(analysis, [1, 0, 0])
+
+    # THEN the column is fingerprinted once
+    assert taken == [ "x" ]
+
+    # WHEN the data set is edited
+    await set_values(analysis, "y", [4.0])
+    analysis.options.set_value("mean", False)
+
+    # THEN it's fingerprinted again
+    assert make_key(analysis, [1, 0, 0]) == key
+    assert taken == [ "x", "x" ]
+
+
+def test_eviction_and_persistence(temp_dir: str):
+    """the least recently used results are evicted, and the rest persist"""
+
+    # GIVEN a cache with room for two results
+    cache_path = path.join(temp_dir, "results-cache")
+    size = len(results("a").SerializeToString())
+    cache = ResultsCache(cache_path, max_size=2 * size)
+
+    # WHEN three are added, having used the first since it was added
+    cache.put("a", results("a"))
+    cache.put("b", results("b"))
+    assert cache.get("a").results.preformatted == "a"
+    cache.put("c", results("c"))
+
+    # THEN the second is evicted
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.size == 2 * size
+
+    # WHEN the cache is reopened
+    cache = ResultsCache(cache_path, max_size=2 * size)
+
+    # THEN the remaining results are still there
+    assert cache.get("a").results.preformatted == "a"
+    assert cache.get("c").results.preformatted == "c"
+    assert len(cache) == 2
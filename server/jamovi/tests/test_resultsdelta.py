@@ -0,0 +1,45 @@
+"""Tests for the deltas of successive results."""
+
+from jamovi.server.resultsdelta import make_delta
+from jamovi.server.jamovi_pb2 import AnalysisResponse
+
+
+def results(*texts: str) -> AnalysisResponse:
+    """results with a table, and a group of preformatted elements"""
+    response = AnalysisResponse()
+    response.results.name = "root"
+    table = response.results.group.elements.add()
+    table.name = "table"
+    table.table.rowNames.append("row")
+    group = response.results.group.elements.add()
+    group.name = "group"
+    for index, text in enumerate(texts):
+        element = group.group.elements.add()
+        element.name = f"text{ index }"
+        element.preformatted = text
+    return response
+
+
+def test_only_changed_elements_are_sent():
+    """elements which are the same as in the base are marked unchanged"""
+
+    # GIVEN results, and the results which follow them
+    base = results("a", "b", "c")
+    later = results("a", "B", "c", "d")
+
+    # WHEN the delta is made
+    delta = make_delta(base, later)
+
+    # THEN the changed and added elements are sent in full, and the rest aren't
+    table, group = delta.results.group.elements
+    assert table.unchanged
+    assert not table.HasField("table")
+    assert [e.unchanged for e in group.group.elements] == [True, False, True, False]
+    assert [e.preformatted for e in group.group.elements] == ["", "B", "", "d"]
+
+    # WHEN nothing has changed
+    delta = make_delta(later, later)
+
+    # THEN the results are all unchanged
+    assert delta.results.unchanged
+    assert len(delta.results.group.elements) == 0
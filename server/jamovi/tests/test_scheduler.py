@@ -0,0 +1,118 @@
+"""Tests for the analysis scheduler."""
+
+import pytest
+
+from jamovi.server.enginemanager import EngineManager
+from jamovi.server.scheduler import Scheduler
+from jamovi.server.scheduler import EngineLimit
+from jamovi.server.session import Session
+
+
+class Analyses:
+    """stands in for the analyses of a session"""
+
+    def __init__(self):
+        self.listeners = [ ]
+        self.needs_init = [ ]
+        self.needs_op = [ ]
+        self.needs_run = [ ]
+
+    def add_options_changed_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_options_changed_listener(self, listener):
+        self.listeners.remove(listener)
+
+
+@pytest.mark.asyncio
+async def test_slots_are_released():
+    """stopped schedulers return their engines to the limit"""
+
+    # GIVEN a limit shared by sessions
+    limit = EngineLimit(8)
+
+    for _ in range(5):
+
+        # WHEN a session's scheduler starts, and grows
+        analyses = Analyses()
+        scheduler = Scheduler(1, 3, analyses, { }, limit=limit)
+        assert scheduler._add_run_slot()
+        assert limit.n_engines == 5
+
+        # AND stops
+        scheduler.stop()
+        scheduler.stop()
+
+        # THEN its engines are available to the next
+        assert limit.n_engines == 0
+        assert analyses.listeners == [ ]
+
+
+@pytest.mark.asyncio
+async def test_base_slots_count_against_limit():
+    """sessions get fewer slots when the limit is reached, and the rest later"""
+
+    # GIVEN a limit, mostly taken by one session
+    limit = EngineLimit(5)
+    first = Scheduler(1, 3, Analyses(), { }, limit=limit)
+    assert limit.n_engines == 4
+
+    # WHEN another session starts
+    second = Scheduler(1, 3, Analyses(), { }, limit=limit)
+
+    # THEN it gets what's left, and the limit isn't exceeded
+    assert second._n_slots == 1
+    assert second.queue.n_slots == 1
+    assert limit.n_engines == 5
+    assert not second._add_run_slot()
+
+    # WHEN the first session stops
+    first.stop()
+
+    # THEN the second takes up the rest of its slots
+    assert second._n_slots == 4
+    assert second.queue.n_slots == 4
+    assert limit.n_engines == 4
+
+    second.stop()
+    assert limit.n_engines == 0
+
+
+@pytest.mark.asyncio
+async def test_stops_with_session_analyses(session: Session):
+    """a scheduler stops cleanly with a session's analyses"""
+
+    # GIVEN a scheduler for a session's analyses
+    limit = EngineLimit(8)
+    scheduler = Scheduler(1, 3, session.analyses, { }, limit=limit)
+
+    # WHEN it's stopped
+    scheduler.stop()
+
+    # THEN it's no longer told of changes to the analyses
+    assert scheduler._send_next not in session._analysis_listeners
+    assert limit.n_engines == 0
+
+
+@pytest.mark.asyncio
+async def test_standby_engines_count_against_limit():
+    """standby engines take from the limit, and give back when stopped"""
+
+    # GIVEN a limit, mostly taken by a session's slots
+    limit = EngineLimit(5)
+    scheduler = Scheduler(1, 3, Analyses(), { }, limit=limit)
+
+    # WHEN its engines are created, asking for two standby engines
+    config = { "engine_standby_count": "2" }
+    engines = EngineManager("", scheduler.queue, config, limit=limit)
+
+    # THEN it gets only what's left of the limit
+    assert len(engines._standby) == 1
+    assert limit.n_engines == 5
+
+    # WHEN they're stopped
+    await engines.stop()
+    scheduler.stop()
+
+    # THEN they're all returned to the limit
+    assert limit.n_engines == 0
@@ -0,0 +1,158 @@
+"""Tests for the server's request handlers."""
+
+import json
+import os
+import tempfile
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestClient
+from aiohttp.test_utils import TestServer
+
+from jamovi.server import server
+from jamovi.server.server import _Handlers
+from jamovi.server.utils import conf
+
+BOUNDARY = "----jamovi"
+
+
+class Instance:
+    """stands in for an instance, recording what it's asked to open"""
+
+    id = "instance"
+
+    def __init__(self):
+        self.opened = None
+
+    async def open(self, path, *, title, is_temp, ext, options):
+        with open(path, "rb") as file:
+            self.opened = { "content": file.read(), "title": title, "options": options }
+        yield (1, 2)
+        yield (2, 2)
+
+
+class Session:
+    """stands in for a session"""
+
+    def __init__(self, session_path: str):
+        self.session_path = session_path
+        self.instance = Instance()
+
+    def set_language(self, language):
+        pass
+
+    async def create(self):
+        return self.instance
+
+
+def multipart(*parts: tuple) -> bytes:
+    """a multipart body, of (name, filename, content) parts"""
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode()
+        body += content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunked(body: bytes):
+    """sends the body without a content length"""
+    for start in range(0, len(body), 64 * 1024):
+        yield body[start:start + 64 * 1024]
+
+
+def messages(text: str) -> list:
+    return [ json.loads(line) for line in text.splitlines() ]
+
+
+@pytest.fixture
+def uploads(temp_dir: str) -> Session:
+    return Session(temp_dir)
+
+
+@pytest_asyncio.fixture
+async def client(uploads: Session, tmp_path, monkeypatch):
+    """a client of the open handler, with uploads limited to 1 MB"""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(server, "MAX_FIELD_SIZE", 1024)
+    access_key = conf.get("access_key", "")
+    conf.set("access_key", "")
+    conf.set("upload_size_limit", "1")
+    handlers = _Handlers(uploads, "", "", "", None, { }, None)
+    app = web.Application()
+    app.router.add_post("/open", handlers.open_post)
+    async with TestClient(TestServer(app)) as client:
+        yield client
+    conf.set("upload_size_limit", "0")
+    conf.set("access_key", access_key)
+
+
+HEADERS = { "Content-Type": f"multipart/form-data; boundary={BOUNDARY}" }
+
+
+@pytest.mark.asyncio
+async def test_upload(client: TestClient, uploads: Session):
+    """the file is opened with the options, whichever order they're sent in"""
+
+    # GIVEN a file, sent before the options
+    content = b"x\n" * 300_000
+    options = json.dumps({ "title": "ignored" }).encode()
+    body = multipart(("file", "data.csv", content), ("options", None, options))
+
+    # WHEN it's uploaded
+    response = await client.post("/open", data=body, headers=HEADERS)
+    sent = messages(await response.text())
+
+    # THEN its progress is the first half, and opening it the second
+    progress = [ (message["p"], message["n"]) for message in sent[:-1] ]
+    assert len(progress) > 2
+    uploading = [ p for p, n in progress[:-2] ]
+    assert uploading == sorted(uploading) and uploading[-1] <= 500
+    assert progress[-2:] == [ (750, 1000), (1000, 1000) ]
+    assert sent[-1] == { "status": "OK", "url": "instance/" }
+
+    # AND it's opened with the options
+    opened = uploads.instance.opened
+    assert opened["content"] == content
+    assert opened["title"] == "data"
+    assert opened["options"] == { "title": "ignored" }
+
+
+@pytest.mark.asyncio
+async def test_upload_too_large(client: TestClient, uploads: Session, tmp_path):
+    """uploads larger than the limit are refused"""
+
+    body = multipart(("file", "data.csv", b"x" * (2 * 1024 * 1024)))
+
+    # WHEN its content length is over the limit
+    response = await client.post("/open", data=body, headers=HEADERS)
+
+    # THEN it's refused straight away
+    assert response.status == 413
+
+    # WHEN it's sent without a content length
+    response = await client.post("/open", data=chunked(body), headers=HEADERS)
+    sent = messages(await response.text())
+
+    # THEN it's refused once it's over the limit, and what arrived is removed
+    assert sent[-1]["status"] == "error"
+    assert "too large" in sent[-1]["message"]
+    assert os.listdir(tmp_path) == [ ]
+    assert uploads.instance.opened is None
+
+
+@pytest.mark.asyncio
+async def test_field_too_large(client: TestClient):
+    """fields besides the file are limited in size"""
+
+    # GIVEN options larger than a field may be, without a content length
+    body = multipart(("options", None, b"x" * 4096))
+
+    # WHEN they're sent
+    response = await client.post("/open", data=chunked(body), headers=HEADERS)
+
+    # THEN they're refused
+    assert response.status == 413